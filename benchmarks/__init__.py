@@ -0,0 +1,7 @@
+"""Benchmarks of pipexl on generated workbooks of 1k to 1M rows. Run with, for
+example::
+
+    python -m benchmarks run --sizes 1000 100000 --output before.json
+    python -m benchmarks run --sizes 1000 100000 --output after.json
+    python -m benchmarks compare before.json after.json
+"""
@@ -0,0 +1,69 @@
+"""Command line interface for the benchmarks."""
+
+import argparse
+import json
+import sys
+from tempfile import TemporaryDirectory
+
+from .suite import BENCHMARKS, DEFAULT_SIZES, compare, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__)
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser(
+        'run', help='generate workbooks and run the benchmarks'
+    )
+    run_parser.add_argument('--sizes', type=int, nargs='+',
+                            default=DEFAULT_SIZES,
+                            help='numbers of records, e.g. 1000 1000000')
+    run_parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS,
+                            help='default all')
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--directory',
+                            help='where to keep the generated workbooks '
+                                 '(default a temporary directory)')
+    run_parser.add_argument('--output', help='JSON results file')
+    compare_parser = subparsers.add_parser(
+        'compare', help='compare two JSON results files'
+    )
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        results = run_command(args)
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+    elif args.command == 'compare':
+        print(f'{"benchmark":<20} {"rows":>9} {"time":>7} {"memory":>7}')
+        for name, rows, time_ratio, memory_ratio in compare(args.old,
+                                                            args.new):
+            print(f'{name:<20} {rows:>9} {format_ratio(time_ratio)} '
+                  f'{format_ratio(memory_ratio)}')
+    else:
+        parser.print_help()
+        return 2
+    return 0
+
+
+def run_command(args):
+    def report(result):
+        print(f'{result["benchmark"]:<20} {result["rows"]:>9} '
+              f'{result["seconds"]:10.4f}s {result["peak_bytes"]:>12,}B',
+              flush=True)
+    if args.directory:
+        return run(args.directory, args.sizes, args.benchmarks, args.repeat,
+                   report)
+    with TemporaryDirectory() as directory:
+        return run(directory, args.sizes, args.benchmarks, args.repeat,
+                   report)
+
+
+def format_ratio(value):
+    return f'{"-":>7}' if value is None else f'{value:7.2f}'
+
+
+if __name__ == '__main__':
+    sys.exit(main())
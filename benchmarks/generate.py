@@ -0,0 +1,87 @@
+"""Generate synthetic workbooks shaped like the ones pipexl is used on, at any
+size."""
+
+from datetime import datetime
+from pathlib import Path
+import random
+
+from openpyxl import Workbook
+
+from pipexl import InputTable, InputWorkbookModel
+
+WORKSHEET_NAME = 'data'
+TABLE_COUNT = 3
+MONTH_COUNT = 12
+FILTER_INTERVAL = 50  # A 'Total' row after every this many records
+KEY_FIELDS = ('Key A', 'Key B', 'Key C', 'Label')
+WORDS = ('agree million soon because week were help slowly crowd sound '
+         'rolled table taste strange written unit food held').split()
+
+
+class SyntheticWorkbook(InputWorkbookModel):
+    """Model for the workbooks from `generate_workbook`."""
+    name_pattern = 'synthetic.xlsx'
+
+    class FirstTable(InputTable):
+        worksheet_name = WORKSHEET_NAME
+        table_marker = 'table_1_marker'
+        normalize_fields = ('label',)
+        filters = dict(key_b='Total')
+
+    class SecondTable(InputTable):
+        worksheet_name = WORKSHEET_NAME
+        table_marker = 'table_2_marker'
+        normalize_fields = ('label',)
+        filters = dict(key_b='Total')
+
+    class ThirdTable(InputTable):
+        worksheet_name = WORKSHEET_NAME
+        table_marker = 'table_3_marker'
+        normalize_fields = ('label',)
+        filters = dict(key_b='Total')
+
+
+def generate_workbook(directory, row_count, seed=0):
+    """Write `synthetic.xlsx` in `directory` with `row_count` records split
+    between `TABLE_COUNT` tables, stacked on one worksheet and separated by
+    blank rows. Each table has a marker, a header with a date for each month,
+    and a filtered 'Total' row every `FILTER_INTERVAL` records. Return the
+    path of the workbook."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / SyntheticWorkbook.name_pattern
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(WORKSHEET_NAME)
+    months = [datetime(2019 + m // 12, m % 12 + 1, 1)
+              for m in range(MONTH_COUNT)]
+    sheet.append([])
+    for table_number in range(1, TABLE_COUNT + 1):
+        sheet.append([None, f'table_{table_number}_marker'])
+        sheet.append([None] + list(KEY_FIELDS) + months)
+        table_rows = (row_count * table_number // TABLE_COUNT
+                      - row_count * (table_number - 1) // TABLE_COUNT)
+        for i in range(table_rows):
+            sheet.append(make_row(rng, i))
+            if (i + 1) % FILTER_INTERVAL == 0:
+                sheet.append([None, 'Total', 'Total']
+                             + [None] * (len(KEY_FIELDS) - 2)
+                             + [rng.random()] * MONTH_COUNT)
+        sheet.append([])
+        sheet.append([])
+    workbook.save(path)
+    return path
+
+
+def make_row(rng, i):
+    """Return the values of a data row, with a leading blank column. Some of
+    the month values are blank, but not the last: a write-only workbook has
+    no dimension, so readers cannot pad trailing blanks."""
+    months = [None if rng.random() < 0.1 else round(rng.random() * 100, 2)
+              for _ in range(MONTH_COUNT - 1)]
+    return ([None,
+             f'{rng.choice(WORDS)} {i % 97}',
+             rng.choice(WORDS),
+             rng.choice(WORDS).upper(),
+             f' {rng.choice(WORDS)} {rng.choice(WORDS)}? ']
+            + months + [round(rng.random() * 100, 2)])
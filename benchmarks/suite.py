@@ -0,0 +1,153 @@
+"""Time and memory benchmarks of loading and processing generated
+workbooks."""
+
+import json
+from pathlib import Path
+import platform
+import random
+import subprocess
+from time import perf_counter
+import tracemalloc
+
+from pipexl import RecordSet, XmlReader
+from pipexl.util import normalize_name
+
+from .generate import SyntheticWorkbook, generate_workbook, make_row
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+class XmlSyntheticWorkbook(SyntheticWorkbook):
+    """`SyntheticWorkbook` read with `XmlReader`."""
+    reader_class = XmlReader
+    FirstTable = SyntheticWorkbook.FirstTable
+    SecondTable = SyntheticWorkbook.SecondTable
+    ThirdTable = SyntheticWorkbook.ThirdTable
+
+
+class Context:
+    """Inputs shared by the benchmarks for one generated workbook."""
+    def __init__(self, directory):
+        self.config = dict(SyntheticWorkbook=str(directory),
+                           XmlSyntheticWorkbook=str(directory))
+        self.records = SyntheticWorkbook(self.config).first_table
+        self.tuples = self.records.astuples()
+        rng = random.Random(0)
+        self.labels = [make_row(rng, i)[4] for i in range(len(self.tuples))]
+        self.record_type_name = self.records.record_class.__name__
+
+
+def bench_load_workbook(context):
+    SyntheticWorkbook(context.config)
+
+
+def bench_load_workbook_xml(context):
+    XmlSyntheticWorkbook(context.config)
+
+
+def bench_record_set(context):
+    RecordSet(context.record_type_name, context.records.fields,
+              context.tuples)
+
+
+def bench_grand_total(context):
+    context.records._compute_grand_total()
+
+
+def bench_sum_by(context):
+    context.records.sum_by('key_b', 'key_c')
+
+
+def bench_make_index(context):
+    context.records.make_index('key_a')
+
+
+def bench_normalize_name(context):
+    if hasattr(normalize_name, 'cache_clear'):  # Start each run cold.
+        normalize_name.cache_clear()
+    for label in context.labels:
+        normalize_name(label)
+
+
+BENCHMARKS = {
+    name[len('bench_'):]: function
+    for name, function in list(globals().items())
+    if name.startswith('bench_')
+}
+
+
+def measure(function, context, repeat):
+    """Return the best time in seconds over `repeat` runs of
+    `function(context)` and the peak memory in bytes allocated by one
+    more run."""
+    seconds = None
+    for _ in range(repeat):
+        start = perf_counter()
+        function(context)
+        elapsed = perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    tracemalloc.start()
+    try:
+        function(context)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def run(directory, sizes=DEFAULT_SIZES, names=None, repeat=3, report=None):
+    """Generate a workbook for each of `sizes` (record counts) below
+    `directory` and run the benchmarks in `names` (default all) on each.
+    Call `report(result)` after each measurement if given. Return the results
+    as a dict suitable for `json.dump`."""
+    results = []
+    for size in sizes:
+        size_directory = Path(directory) / str(size)
+        generate_workbook(size_directory, size)
+        context = Context(size_directory)
+        for name in names or BENCHMARKS:
+            seconds, peak_bytes = measure(BENCHMARKS[name], context, repeat)
+            result = dict(benchmark=name, rows=size, seconds=seconds,
+                          peak_bytes=peak_bytes)
+            if report:
+                report(result)
+            results.append(result)
+    return dict(commit=git_commit(), python=platform.python_version(),
+                platform=platform.platform(), repeat=repeat,
+                results=results)
+
+
+def git_commit():
+    """Return the hash of the checked out commit, or None outside of a git
+    working tree."""
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.decode().strip()
+
+
+def compare(old_path, new_path):
+    """Return a list of (benchmark, rows, time ratio, memory ratio) tuples
+    for the measurements in both results files, where a ratio below 1 means
+    the new results are better."""
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    old_results = {(r['benchmark'], r['rows']): r for r in old['results']}
+    comparison = []
+    for result in new['results']:
+        key = (result['benchmark'], result['rows'])
+        if key in old_results:
+            before = old_results[key]
+            comparison.append(key + (
+                ratio(result['seconds'], before['seconds']),
+                ratio(result['peak_bytes'], before['peak_bytes']),
+            ))
+    return comparison
+
+
+def ratio(new, old):
+    return new / old if old else None
@@ -1,7 +1,7 @@
 # Connect to the technology we will be using:
 from pipexl import (InputWorkbookModel, InputTable,
                     OutputWorkbookModel, OutputTable,
-                    find_duplicates, load_config)
+                    load_config)
 
 # Define the important columns.
 key_columns = ('key_1', 'key_2', 'key_3')  # First two shared between two tables
@@ -41,42 +41,41 @@ table_b = input_workbook.table_b
 # first two key columns: record -> (key_1_value, key_2_value)
 key_getter = attrgetter(*key_columns[:2])
 
-# Make a note of the combinations of keys used in both tables.
-table_a_keys = tuple(key_getter(record) for record in table_a)
-table_b_keys = tuple(key_getter(record) for record in table_b)
-
 # Define the empty output workbook.
 # An output workbook records metadata about the input sources and also
 # any errors or warnings.
 with ExampleOutputWorkbook(config, table_a, table_b) as output_workbook:
     # Verify that each key (conmbination) in table A is unique.
-    duplicate_keys = find_duplicates(table_a_keys)
+    # Each reported record has the key values and its worksheet row.
+    duplicate_keys = table_a.find_duplicates(*key_columns[:2])
     if duplicate_keys:
         output_workbook.record_error(
-            f'duplicate keys in table_a: {duplicate_keys}'
+            f'duplicate keys in table_a: {list(duplicate_keys)}'
         )
         # There will be "duplicate" rows in the output. These rows will have
         # the same key combinations but may possess different month values.
 
     # Verify that the keys in table A are a subset of table B.
-    bad_keys = set(table_a_keys) - set(table_b_keys)
+    bad_keys = table_a.anti_join_keys(table_b, *key_columns[:2])
     if bad_keys:
-        output_workbook.fail(f'extra keys in table_a: {sorted(bad_keys)}')
+        output_workbook.fail(f'extra keys in table_a: {list(bad_keys)}')
         # Processing stops here.
         # An alternative approach would be to delete the bad keys and keep
         # going. To enable this code, remove the line right above these
         # comments (the line that says "fail").
         output_workbook.record_error(
-            f'extra keys in table_a: {sorted(bad_keys)}'
+            f'extra keys in table_a: {list(bad_keys)}'
         )
-        table_a_keys = tuple(key for key in table_a_keys
-                             if key not in bad_keys)
+        bad_key_set = {key_getter(record) for record in bad_keys}
+        table_a = table_a.where(
+            lambda record: key_getter(record) not in bad_key_set
+        ).collect()
 
     # Check for keys in table B that are not used in table A:
-    unused_keys = set(table_b_keys) - set(table_a_keys)
+    unused_keys = table_b.anti_join_keys(table_a, *key_columns[:2])
     if unused_keys:
         output_workbook.record_warning(
-            f'extra keys in table_a: {sorted(unused_keys)}'
+            f'extra keys in table_b: {list(unused_keys)}'
         )
         # Those key combinations will not appear in the final output.
 
@@ -1,6 +1,17 @@
 """Code for constructing data pipelines that involve tables inside
 workbooks."""
 
-from .recordset import RecordSet
+from .cache import TableCache
+from .columnar import ColumnarRecordSet
+from .diff import RecordSetDelta
+from .instrument import Profile
+from .layout import LayoutIndex
+from .output import OutputTable, OutputWorkbookModel, PipelineFailure
+from .parallel import aload_models, load_models
+from .partitioned import PartitionedRecordSet
+from .recordset import Query, RecordSet
+from .schema import SchemaError
+from .streaming import RecordStream
 from .version import __version__
-from .workbook import InputTable, InputWorkbookModel
+from .workbook import InputTable, InputWorkbookModel, OpenpyxlReader
+from .xmlreader import XmlReader
@@ -0,0 +1,147 @@
+"""Persistent on-disk cache of tables loaded from workbooks."""
+
+from hashlib import sha256
+import os
+from pathlib import Path
+import pickle
+from tempfile import NamedTemporaryFile
+
+from .version import __version__
+
+CACHE_SUFFIX = '.pipexl-cache'
+
+
+class TableCache:
+    """A directory of pickled table data. Each entry is keyed on the workbook
+    path, its mtime and size (or a hash of its contents if `hash_contents`),
+    the definition of the table, and the pipexl version. When the directory
+    grows past `max_bytes`, the least recently used entries are deleted.
+
+    To use, set the `cache` class attribute of an `InputWorkbookModel`
+    subclass to an instance of this class."""
+    def __init__(self, directory, max_bytes=2**30, hash_contents=False):
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+
+    def get(self, workbook_path, table):
+        """Return the cached RecordSet for `table` in the workbook, or None
+        if there is no entry. Updates start_row, start_col, stop_col,
+        end_row, header_fields, and filtered_rows of `table`."""
+        entry_path = self.entry_path(workbook_path, table)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                entry = pickle.load(entry_file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError):  # Damaged entry
+            remove_entry(entry_path)
+            return None
+        try:
+            os.utime(entry_path)  # Mark as recently used.
+        except FileNotFoundError:  # Evicted by another process
+            pass
+        table.start_row, table.start_col, table.stop_col = entry['position']
+        table.end_row = entry.get('end_row')
+        table.header_fields = entry.get('header_fields')
+        table.filtered_rows = entry.get('filtered_rows')
+        # The values were normalized before they were stored.
+        data = table.record_set_class(
+            table.name, entry['fields'], entry['tuples'],
+            intern_fields=table.intern_fields,
+            normalizers=table.normalizers,
+            schema=table.declared_schema(entry['fields'])
+        )
+        data.normalize_fields = table.normalize_fields
+        data.source = table
+        return data
+
+    def put(self, workbook_path, table, data):
+        """Store `data`, the RecordSet loaded for `table`, then evict old
+        entries as needed. Tables that cannot be cached are skipped."""
+        entry_path = self.entry_path(workbook_path, table)
+        if entry_path is None:
+            return
+        entry = dict(
+            fields=data.fields,
+            tuples=data.astuples(),
+            position=(table.start_row, table.start_col, table.stop_col),
+            end_row=table.end_row,
+            header_fields=table.header_fields,
+            filtered_rows=table.filtered_rows,
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=self.directory, delete=False) as temp:
+            pickle.dump(entry, temp, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp.name, entry_path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the total size is no
+        more than `max_bytes`. Entries that other processes delete meanwhile
+        are skipped."""
+        entries = []
+        for entry_path in self.directory.glob('*' + CACHE_SUFFIX):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            remove_entry(entry_path)
+            total -= size
+
+    def clear(self):
+        """Delete every entry."""
+        for entry_path in self.directory.glob('*' + CACHE_SUFFIX):
+            remove_entry(entry_path)
+
+    def entry_path(self, workbook_path, table):
+        """Return the path of the entry for `table` in the workbook, or None
+        if the table has no definition (see `InputTable.definition`)."""
+        definition = table.definition()
+        if definition is None:
+            return None
+        key = repr((
+            self.workbook_signature(workbook_path),
+            definition,
+            __version__,
+        ))
+        digest = sha256(key.encode()).hexdigest()
+        return self.directory / (digest + CACHE_SUFFIX)
+
+    def workbook_signature(self, workbook_path):
+        """Return a value that changes whenever the workbook changes."""
+        return workbook_signature(workbook_path, self.hash_contents)
+
+
+def remove_entry(entry_path):
+    """Delete the entry file, unless another process already has."""
+    try:
+        entry_path.unlink()
+    except FileNotFoundError:  # unlink(missing_ok=True) needs Python 3.8
+        pass
+
+
+def workbook_signature(workbook_path, hash_contents=False):
+    """Return the resolved path of the workbook with its mtime and size, or
+    with a hash of its contents if `hash_contents`."""
+    workbook_path = Path(workbook_path).resolve()
+    if hash_contents:
+        return str(workbook_path), file_digest(workbook_path)
+    stat = workbook_path.stat()
+    return str(workbook_path), stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path, chunk_size=2**20):
+    """Return the SHA-256 hex digest of the contents of the file."""
+    result = sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            result.update(chunk)
+    return result.hexdigest()
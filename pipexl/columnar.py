@@ -0,0 +1,319 @@
+"""Column-oriented storage for large record sets. Each field is kept as a
+typed array (NumPy when it is installed, otherwise the standard `array`
+module) and records are only constructed on demand."""
+
+from array import array
+from collections import defaultdict
+from collections.abc import Sequence
+from time import perf_counter
+
+from .recordset import (RecordSetMixin, emit_built, emit_sum_by, factorize,
+                        iter_valid_tuples, make_record_class)
+from .schema import infer_schema
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional.
+    numpy = None
+
+
+class ColumnarRecordSet(RecordSetMixin, Sequence):
+    """A collection of records that are all of the same type, stored as one
+    column per field. Supports the same constructor and methods as
+    `RecordSet`; `sum_by`, `grand_total`, and `make_index` operate on whole
+    columns at once.
+
+    A column of strings with at most `category_ratio` distinct values per
+    row is dictionary-encoded: each distinct value is stored once, and rows
+    hold small integer codes, which `sum_by` and `make_index` group on
+    instead of hashing the values. Set `category_ratio` to 0 to disable."""
+    category_ratio = 0.5
+
+    def __init__(self, record_type_name, fields, tuple_iter,
+                 normalize_fields=(), filters=None, intern_fields=(),
+                 normalizers=None, schema=None):
+        """See `RecordSet`."""
+        start = perf_counter()
+        tuples = list(iter_valid_tuples(tuple_iter, fields, normalize_fields,
+                                        filters, intern_fields, normalizers))
+        length = len(tuples)
+        raw_columns = list(zip(*tuples)) if tuples else [()] * len(fields)
+        del tuples
+        self._set_columns(record_type_name, fields, raw_columns, length,
+                          schema, start)
+        self.normalize_fields = normalize_fields
+
+    @classmethod
+    def from_columns(cls, record_type_name, fields, columns, schema=None):
+        """Return a ColumnarRecordSet with `columns`, a sequence of the
+        values of each of `fields`, without building a tuple per record."""
+        result = cls.__new__(cls)
+        columns = [list(column) for column in columns]
+        length = len(columns[0]) if columns else 0
+        assert all(len(column) == length for column in columns)
+        result._set_columns(record_type_name, fields, columns, length, schema,
+                            perf_counter())
+        result.normalize_fields = ()
+        return result
+
+    def _set_columns(self, record_type_name, fields, raw_columns, length,
+                     schema, start):
+        """Infer the schema, store `raw_columns` as typed columns, and compute
+        the grand total."""
+        self.source = None
+        self.fields = fields
+        self.record_class = make_record_class(record_type_name, self.fields)
+        self._length = length
+        type_sets = [set(map(type, values)) for values in raw_columns]
+        self.schema = infer_schema(fields, raw_columns.__getitem__, schema,
+                                   record_type_name, type_sets)
+        self._columns = {
+            field: make_column(values, self.category_ratio, types)
+            for field, values, types in zip(fields, raw_columns, type_sets)
+        }
+        built = perf_counter()
+        self._compute_grand_total()  # Sets grand_total
+        emit_built(self, start, built)
+
+    def _from_columns(self, record_type_name, fields, columns):
+        return self.from_columns(record_type_name, fields, columns)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('record index out of range')
+        return self.record_class._make(self._columns[f][index]
+                                       for f in self.fields)
+
+    def __iter__(self):
+        return map(self.record_class._make,
+                   zip(*self._column_lists(self.fields)))
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} '
+                f'{self.record_class.__name__}: {self._length} records>')
+
+    def astuples(self):
+        """Return a `list` of the records as tuples of values."""
+        return list(zip(*self._column_lists(self.fields)))
+
+    def column(self, field):
+        """Return a `list` of the values of `field`."""
+        return self._columns[field].tolist()
+
+    def sum_by(self, *key_fields):
+        """Aggregate by the specified key fields, returting a new
+        ColumnarRecordSet of the corresponding subtotals"""
+        start = perf_counter()
+        result_class_name, fields, summed_fields = self._sum_by_layout(
+            key_fields
+        )
+        codes, keys = self._factorize(key_fields)
+        sums = [self._columns[f].group_sums(codes, len(keys))
+                for f in summed_fields]
+        tuples = sorted(key + value
+                        for key, value in zip(keys, zip(*sums)))
+        result = self._derive(result_class_name, fields, tuples)
+        emit_sum_by(self, key_fields, result, start)
+        return result
+
+    def grouping_sets(self, *groupings):
+        """See `RecordSet.grouping_sets`. Each grouping is aggregated a column
+        at a time, which is faster than a pass that constructs records."""
+        return [self.sum_by(*((grouping,) if isinstance(grouping, str)
+                              else grouping))
+                for grouping in groupings]
+
+    def make_index(self, *key_fields):
+        codes, keys = self._factorize(key_fields)
+        if len(key_fields) == 1:
+            keys = [key for key, in keys]
+        if not isinstance(codes, list):
+            codes = codes.tolist()
+        result = defaultdict(list)
+        for code, record in zip(codes, self):
+            result[keys[code]].append(record)
+        return result
+
+    def _iter_column(self, field):
+        return iter(self.column(field))
+
+    def _iter_tuples(self):
+        return zip(*self._column_lists(self.fields))
+
+    def _column_lists(self, fields):
+        return [self.column(f) for f in fields]
+
+    def _factorize(self, key_fields):
+        """Return a group code for each record and the list of distinct key
+        tuples they refer to, for grouping by `key_fields`. If the key
+        columns are dictionary-encoded, their codes are combined instead of
+        hashing the values."""
+        columns = [self._columns[f] for f in key_fields]
+        if not all(isinstance(c, CategoricalColumn) for c in columns):
+            return factorize(zip(*self._column_lists(key_fields)))
+        if len(columns) == 1:
+            return columns[0].codes, [(v,) for v in columns[0].categories]
+        code_count = 1
+        for column in columns:
+            code_count *= len(column.categories)
+        if numpy is not None and code_count < 2**62:
+            combined = numpy.zeros(self._length, dtype=numpy.int64)
+            for column in columns:
+                combined *= len(column.categories)
+                combined += column.codes
+            unique, codes = numpy.unique(combined, return_inverse=True)
+            code_keys = []
+            for column in reversed(columns):
+                unique, column_codes = numpy.divmod(unique,
+                                                    len(column.categories))
+                code_keys.append(column_codes.tolist())
+            code_keys = zip(*reversed(code_keys))
+        else:
+            codes, code_keys = factorize(zip(*(c.codes for c in columns)))
+        keys = [tuple(column.categories[code]
+                      for column, code in zip(columns, code_key))
+                for code_key in code_keys]
+        return codes, keys
+
+    def _compute_grand_total(self):
+        self._make_grand_total({field: self._columns[field].total()
+                                for field in self.schema.summable_fields})
+
+
+def make_column(values, category_ratio=0, types=None):
+    """Return a `NumericColumn` if all of `values` are int or None, or all
+    are float or None; a column mixing the two is kept as an `ObjectColumn`
+    so that its values keep their types. Otherwise return a
+    `CategoricalColumn` if they are strings (or None) with at most
+    `category_ratio` distinct values per value, or else an `ObjectColumn`.
+    `types`, the set of the types of `values`, is computed if not given."""
+    values = list(values)
+    kinds = set(map(type, values)) if types is None else set(types)
+    kinds.discard(type(None))
+    if kinds in ({int}, {float}):
+        try:
+            return NumericColumn(values, is_int=(kinds == {int}))
+        except OverflowError:  # Too big for a fixed-width integer.
+            pass
+    if kinds == {str} and category_ratio:
+        codes, categories = factorize(values)
+        if len(categories) <= category_ratio * len(values):
+            return CategoricalColumn(codes, categories)
+    return ObjectColumn(values)
+
+
+class ObjectColumn(list):
+    """A column of arbitrary Python values."""
+    def tolist(self):
+        return list(self)
+
+    def total(self):
+        """Return the sum of the column, treating None as 0. The column must
+        be summable according to the schema."""
+        return sum(filter(None, self))
+
+    def group_sums(self, codes, group_count):
+        """Return a `list` of per-group sums, where `codes` assigns each
+        row to a group."""
+        result = [0] * group_count
+        for code, value in zip(codes, self):
+            if value is not None:
+                result[code] += value
+        return result
+
+
+class CategoricalColumn:
+    """A dictionary-encoded column of strings: `categories` is the list of
+    distinct values (including None if present), each stored once, and
+    `codes` holds the position in `categories` of each row's value."""
+    def __init__(self, codes, categories):
+        self.categories = categories
+        if numpy is not None:
+            self.codes = numpy.array(codes, dtype=numpy.int32)
+        else:
+            self.codes = array('l', codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.categories[self.codes[index]]
+
+    def tolist(self):
+        categories = self.categories
+        return [categories[code] for code in self.codes.tolist()]
+
+
+class NumericColumn:
+    """A column of numbers stored in a typed array. Blank cells (None) are
+    stored as 0 and tracked in `nulls`, the set of their row positions."""
+    def __init__(self, values, is_int):
+        self.is_int = is_int
+        self.nulls = {i for i, value in enumerate(values) if value is None}
+        filled = [0 if value is None else value for value in values]
+        if numpy is not None:
+            dtype = numpy.int64 if is_int else numpy.float64
+            self.data = numpy.array(filled, dtype=dtype)
+        else:
+            self.data = array('q' if is_int else 'd', filled)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if index in self.nulls:
+            return None
+        value = self.data[index]
+        return value.item() if numpy is not None else value
+
+    def tolist(self):
+        result = self.data.tolist()
+        for i in self.nulls:
+            result[i] = None
+        return result
+
+    def total(self):
+        """Return the sum of the column, treating None as 0."""
+        if numpy is not None:
+            if self._may_overflow():
+                return sum(self.data.tolist())
+            return self.data.sum().item()
+        return sum(self.data)
+
+    def group_sums(self, codes, group_count):
+        """Return a `list` of per-group sums, where `codes` assigns each
+        row to a group."""
+        if numpy is not None and not self._may_overflow():
+            codes = numpy.asarray(codes, dtype=numpy.intp)
+            if self.is_int:
+                result = numpy.zeros(group_count, dtype=numpy.int64)
+                numpy.add.at(result, codes, self.data)
+            else:
+                result = numpy.bincount(codes, weights=self.data,
+                                        minlength=group_count)
+            return result.tolist()
+        result = [0] * group_count
+        data = self.data.tolist() if numpy is not None else self.data
+        for code, value in zip(codes, data):
+            result[code] += value
+        return result
+
+    def _may_overflow(self):
+        """Return whether a sum of the column in a NumPy int64 could
+        overflow, in which case Python ints are summed instead."""
+        if not (self.is_int and len(self.data)):
+            return False
+        bound = max(-int(self.data.min()), int(self.data.max()))
+        return bound * len(self.data) >= 2 ** 63
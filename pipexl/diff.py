@@ -0,0 +1,120 @@
+"""Code for finding what changed between two versions of a table."""
+
+from itertools import compress, count
+from operator import ne, not_
+
+from .recordset import make_key_function
+from .util import gc_paused
+
+
+class RecordSetDelta:
+    """The differences between `old` and `new`, two versions of a record set
+    with the same fields, such as the same InputTable loaded from last
+    month's and this month's workbook. Records are matched by their values
+    of `key_fields`, which must be unique in each version, and compared by
+    their values, where NaN is the same as NaN.
+
+    `added` holds the records of `new` whose keys are not in `old`,
+    `removed` the records of `old` whose keys are not in `new`, and
+    `changed_to` the records of `new` whose values differ from those of the
+    record of `old` with the same key, which are in `changed_from`. Each is
+    a record set of the same type and storage class as `new`, in the order
+    of the version it comes from."""
+    def __init__(self, old, new, *key_fields):
+        assert key_fields
+        assert tuple(old.fields) == tuple(new.fields), (old.fields,
+                                                        new.fields)
+        self.old = old
+        self.new = new
+        self.key_fields = key_fields
+        old_keys, old_counts = unique_keys(old, key_fields)
+        new_keys, new_counts = unique_keys(new, key_fields)
+        with gc_paused():  # The tuples may be new, for a ColumnarRecordSet.
+            old_values = dict(zip(old_keys, old._iter_tuples()))
+        added = compress(count(), map(not_, map(old_values.__contains__,
+                                                new_keys)))
+        removed = compress(count(), map(not_, map(new_counts.__contains__,
+                                                  old_keys)))
+        # Records with keys not in old are compared with themselves.
+        changed = [position for position in compress(count(), map(
+            ne, map(old_values.get, new_keys, new._iter_tuples()),
+            new._iter_tuples()
+        )) if not same_values(old_values[new_keys[position]], new[position])]
+        self.added = self._select(new, added)
+        self.removed = self._select(old, removed)
+        self.changed_from = self.new._derive(
+            self.new.record_class.__name__, self.new.fields,
+            [old_values[new_keys[position]] for position in changed]
+        )
+        self.changed_to = self._select(new, changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed_to)
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} '
+                f'{self.new.record_class.__name__}: {len(self.added)} '
+                f'added, {len(self.removed)} removed, '
+                f'{len(self.changed_to)} changed>')
+
+    def update_sum_by(self, subtotals, *key_fields):
+        """Return the result of `new.sum_by(*key_fields)` given `subtotals`,
+        the result of `old.sum_by(*key_fields)`, by subtracting the values
+        of the removed and changed records and adding those of the added and
+        changed records. Sums of floats may differ from a full recomputation
+        in the last digits. If the summed fields have changed, for example
+        because a column is no longer numeric, `new` is summed in full."""
+        result_class_name, fields, summed_fields = self.new._sum_by_layout(
+            key_fields
+        )
+        if tuple(subtotals.fields) != fields:
+            return self.new.sum_by(*key_fields)
+        key_count = len(key_fields)
+        totals = {record[:key_count]: list(record[key_count:])
+                  for record in subtotals}
+        key_function = make_key_function(key_fields)
+        data_function = make_key_function(summed_fields)
+        for records, sign in ((self.removed, -1), (self.changed_from, -1),
+                              (self.added, 1), (self.changed_to, 1)):
+            for record in records:
+                key = key_function(record)
+                sums = totals.get(key)
+                if sums is None:
+                    sums = totals[key] = [0] * len(summed_fields)
+                for i, value in enumerate(data_function(record)):
+                    if value is not None:
+                        sums[i] += sign * value
+        _, new_counts = self.new._cached_keys(key_fields)
+        if key_count == 1:
+            tuples = [key + tuple(sums) for key, sums in totals.items()
+                      if key[0] in new_counts]
+        else:
+            tuples = [key + tuple(sums) for key, sums in totals.items()
+                      if key in new_counts]
+        return self.new._derive(result_class_name, fields, sorted(tuples))
+
+    def _select(self, records, positions):
+        """Return a record set like `new` of the records at `positions`."""
+        return self.new._derive(self.new.record_class.__name__,
+                                self.new.fields,
+                                (records[position] for position in positions))
+
+
+def same_values(values_1, values_2):
+    """Return whether two tuples of the same length hold the same values,
+    taking NaN to be the same as NaN."""
+    return all(value_1 == value_2 or (value_1 != value_1
+                                      and value_2 != value_2)
+               for value_1, value_2 in zip(values_1, values_2))
+
+
+def unique_keys(records, key_fields):
+    """Return the keys and key counts of `records` from `_cached_keys`.
+    Raise ValueError if a key is not unique."""
+    keys, counts = records._cached_keys(key_fields)
+    if len(counts) != len(keys):
+        duplicates = records.find_duplicates(*key_fields)
+        raise ValueError(f'{len(duplicates)} records of '
+                         f'{records.record_class.__name__} have duplicate '
+                         f'keys: {list(duplicates)[:10]}')
+    return keys, counts
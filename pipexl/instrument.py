@@ -0,0 +1,109 @@
+"""Timing and counter events emitted while loading and transforming tables.
+
+Register a hook, a callable that takes an event `dict`, with `add_hook`. Each
+event has an `event` name, such as 'table_loaded', and other items that
+depend on the event. Timings are in seconds. While `tracemalloc` is tracing,
+each event also has `peak_bytes`. When no hook is registered, events are not
+built at all. Events from worker processes are not collected.
+
+`Profile` is a hook that keeps the events of a run and saves them as JSON::
+
+    with Profile(trace_memory=True) as profile:
+        workbook = MyWorkbook(config)
+        workbook.my_table.sum_by('key')
+    profile.save('profile.json')
+"""
+
+import json
+from time import perf_counter, time
+import tracemalloc
+
+HOOKS = []
+
+
+def add_hook(hook):
+    """Register `hook` to be called with each event."""
+    HOOKS.append(hook)
+
+
+def remove_hook(hook):
+    """Unregister `hook`."""
+    HOOKS.remove(hook)
+
+
+def emit(event, **data):
+    """Call each registered hook with the event `dict`. Callers that need
+    extra work to gather `data` should check `HOOKS` first."""
+    if not HOOKS:
+        return
+    data['event'] = event
+    if tracemalloc.is_tracing():
+        data['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    for hook in list(HOOKS):
+        hook(data)
+
+
+def timed(iterable, timings):
+    """Generate the items of `iterable`, adding the time spent producing them
+    to `timings['seconds']`."""
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings['seconds'] += perf_counter() - start
+            return
+        timings['seconds'] += perf_counter() - start
+        yield item
+
+
+class Profile:
+    """A hook that records the events emitted while it is active, with the
+    time since it was started. Use it as a context manager. With
+    `trace_memory`, runs `tracemalloc` while active, so events report peak
+    memory (this slows everything down)."""
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.events = []
+        self.started = self.start = None
+        self._tracing = False
+
+    def __enter__(self):
+        self.started = time()
+        self.start = perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def __call__(self, event):
+        event['at'] = perf_counter() - self.start
+        self.events.append(event)
+
+    def summary(self):
+        """Return a dict mapping each event name to its count and total
+        seconds."""
+        result = {}
+        for event in self.events:
+            totals = result.setdefault(event['event'],
+                                       dict(count=0, seconds=0))
+            totals['count'] += 1
+            totals['seconds'] += event.get('seconds', 0)
+        return result
+
+    def asdict(self):
+        return dict(started=self.started, events=self.events,
+                    summary=self.summary())
+
+    def save(self, path):
+        """Write the profile to `path` as JSON."""
+        with open(path, 'w') as profile_file:
+            json.dump(self.asdict(), profile_file, indent=2, default=str)
@@ -0,0 +1,109 @@
+"""Persistent index of where tables are found in workbooks."""
+
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from .cache import workbook_signature
+from .version import __version__
+
+LAYOUT_SUFFIX = '.pipexl-layout'
+
+
+class LayoutIndex:
+    """A directory of JSON files, one per workbook, recording the marker row
+    and column, the columns and header fields, and the end-of-data row of
+    each table found in each worksheet. Entries are keyed on the workbook
+    signature, as for `TableCache`, so a changed workbook is indexed afresh.
+
+    To use, set the `layout_index` class attribute of an `InputWorkbookModel`
+    subclass to an instance of this class. Once a table has been found, later
+    loads read its worksheet only from the first marker to the last
+    end-of-data row of the tables being loaded. The index also makes
+    `InputWorkbookModel.describe` quick."""
+    def __init__(self, directory, hash_contents=False):
+        self.directory = Path(directory).expanduser()
+        self.hash_contents = hash_contents
+
+    def get(self, workbook_path):
+        """Return the layout of the workbook: a dict mapping worksheet names
+        to dicts mapping table markers to positions. Empty if the workbook
+        has not been indexed."""
+        try:
+            with open(self.entry_path(workbook_path)) as entry_file:
+                return json.load(entry_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:  # Damaged entry
+            self.entry_path(workbook_path).unlink()
+            return {}
+
+    def update(self, workbook_path, tables):
+        """Record the positions of `tables`, which have been found in the
+        workbook."""
+        layout = self.get(workbook_path)
+        changed = False
+        for table in tables:
+            if table.start_row is None:
+                continue
+            position = table_position(table)
+            sheet_layout = layout.setdefault(table.worksheet_name, {})
+            if sheet_layout.get(table.table_marker) != position:
+                sheet_layout[table.table_marker] = position
+                changed = True
+        if changed:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile('w', dir=self.directory,
+                                    delete=False) as temp:
+                json.dump(layout, temp)
+            os.replace(temp.name, self.entry_path(workbook_path))
+
+    def clear(self):
+        """Delete every entry."""
+        for entry_path in self.directory.glob('*' + LAYOUT_SUFFIX):
+            entry_path.unlink()
+
+    def entry_path(self, workbook_path):
+        """Return the path of the entry for the workbook."""
+        key = repr((workbook_signature(workbook_path, self.hash_contents),
+                    __version__))
+        digest = sha256(key.encode()).hexdigest()
+        return self.directory / (digest + LAYOUT_SUFFIX)
+
+
+def table_position(table):
+    """Return the position of `table`, which has been found, as stored in a
+    layout."""
+    return dict(marker_row=table.start_row - 1, marker_col=table.start_col,
+                stop_col=table.stop_col, end_row=table.end_row,
+                header_fields=list(table.header_fields))
+
+
+def restore_position(layout, table):
+    """Set the position of `table` from `layout`. Return False if the layout
+    does not have it."""
+    position = layout.get(table.worksheet_name, {}).get(table.table_marker)
+    if position is None:
+        return False
+    table.start_row = position['marker_row'] + 1
+    table.start_col = position['marker_col']
+    table.stop_col = position['stop_col']
+    table.end_row = position['end_row']
+    table.header_fields = tuple(position['header_fields'])
+    return True
+
+
+def row_range(layout, tables):
+    """Return the first and last rows of the worksheet holding `tables` that
+    need to be read, according to `layout`. The last row is None if a table
+    runs to the end of the worksheet. Return (1, None), meaning the whole
+    worksheet, if any of the tables is not in the layout."""
+    positions = [layout.get(table.worksheet_name, {}).get(table.table_marker)
+                 for table in tables]
+    if not all(positions):
+        return 1, None
+    end_rows = [position['end_row'] for position in positions]
+    return (min(position['marker_row'] for position in positions),
+            None if None in end_rows else max(end_rows))
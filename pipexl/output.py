@@ -0,0 +1,207 @@
+"""Code for writing tables to new workbooks. Rows are streamed to disk through
+openpyxl's write-only mode, so memory use does not grow with the size of the
+output."""
+
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from .workbook import default_table_name
+
+SOURCE_FIELDS = ('name', 'records', 'worksheet', 'table_marker', 'start_row')
+OUTPUT_FIELDS = ('name', 'worksheet', 'records')
+MESSAGE_FIELDS = ('level', 'message')
+
+
+class PipelineFailure(Exception):
+    """Raised by `OutputWorkbookModel.fail` to stop processing."""
+
+
+class OutputWorkbookModel:
+    """Encapsulates a list of OutputTable subclasses with a naming pattern for
+    the workbook. Subclasses should nest subclasses of `OutputTable` and
+    define the class attribute `name_pattern`, which may contain a `{num}`
+    field: the first number giving a new file is used. Use the model as a
+    context manager; the workbook is saved on exit.
+
+    The input record sets passed to the constructor, and the errors and
+    warnings recorded along the way, are written to the worksheet named
+    `metadata_worksheet_name` on exit, unless it is None. The metadata is
+    written even if processing stops with an exception."""
+    name_pattern = None  # subclasses should override
+    metadata_worksheet_name = 'metadata'
+
+    def __init__(self, config=None, *sources):
+        """The `config` parameter should contain a key matching
+        `self.__class__.__name__` with the directory path for the workbook.
+        `sources` are the input record sets."""
+        assert self.name_pattern
+        config = config or {}
+        directory_path = Path(config.get(self.__class__.__name__, '.'))
+        self.workbook_path = str(next_workbook_path(directory_path,
+                                                    self.name_pattern))
+        self.sources = sources
+        self.errors = []
+        self.warnings = []
+        self.tables = {}
+        self.created = datetime.now()
+        self._workbook = Workbook(write_only=True)
+        for table_class in self.table_classes():
+            self.add_table(table_class())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None and not isinstance(exc, PipelineFailure):
+            self.record_error(f'{exc_type.__name__}: {exc}')
+        self.close()
+
+    @classmethod
+    def table_classes(cls):
+        """Return the list of OutputTable subclasses nested in this class."""
+        return [value for value in cls.__dict__.values()
+                if isinstance(value, type) and issubclass(value, OutputTable)]
+
+    def add_table(self, table):
+        """Add the OutputTable `table` in a new worksheet and make it
+        available as an attribute named after the table. Return it."""
+        assert table.name not in self.tables, table.name
+        table.open(self._workbook)
+        self.tables[table.name] = table
+        setattr(self, table.name, table)
+        return table
+
+    def write_records(self, records, worksheet_name=None, table_marker=None):
+        """Write the records of `records`, such as a RecordSet, to a new
+        worksheet, which by default is named after the record type. Return
+        the OutputTable."""
+        name = records.record_class.__name__
+        table = self.add_table(OutputTable(
+            name=name, worksheet_name=worksheet_name or name,
+            fields=records.fields, table_marker=table_marker
+        ))
+        table.add_records(records)
+        return table
+
+    def record_error(self, message):
+        self.errors.append(message)
+
+    def record_warning(self, message):
+        self.warnings.append(message)
+
+    def fail(self, message):
+        """Record the error `message` and stop processing by raising
+        PipelineFailure."""
+        self.record_error(message)
+        raise PipelineFailure(message)
+
+    def close(self):
+        """Write the metadata and save the workbook. Called on exit from the
+        context manager."""
+        if self._workbook is None:
+            return
+        if self.metadata_worksheet_name:
+            self.write_metadata(
+                self._workbook.create_sheet(self.metadata_worksheet_name)
+            )
+        self._workbook.save(self.workbook_path)
+        self._workbook = None
+
+    def write_metadata(self, worksheet):
+        """Write tables of the sources, the output tables, and the errors and
+        warnings to `worksheet`. Each table has a marker, so the metadata can
+        be read back with InputTables."""
+        worksheet.append(['created', self.created])
+        worksheet.append([])
+        worksheet.append(['sources'])
+        worksheet.append(SOURCE_FIELDS)
+        for records in self.sources:
+            worksheet.append(describe_source(records))
+        worksheet.append([])
+        worksheet.append(['outputs'])
+        worksheet.append(OUTPUT_FIELDS)
+        for table in self.tables.values():
+            worksheet.append((table.name, table.worksheet_name,
+                              table.row_count))
+        worksheet.append([])
+        worksheet.append(['messages'])
+        worksheet.append(MESSAGE_FIELDS)
+        for level, messages in (('error', self.errors),
+                                ('warning', self.warnings)):
+            for message in messages:
+                worksheet.append((level, message))
+
+
+class OutputTable:
+    """Definition of a table written to its own worksheet: an optional
+    `table_marker` row, so that the table can be read back with an
+    InputTable, a header row of `fields`, then a row for each tuple added.
+    Each row is appended to the write-only worksheet as it is added. Class
+    attributes may be overridden by keyword arguments to the constructor."""
+    name = worksheet_name = fields = table_marker = None
+
+    def __init__(self, **attributes):
+        for attribute, value in attributes.items():
+            assert hasattr(self.__class__, attribute), attribute
+            setattr(self, attribute, value)
+        if not self.name:
+            self.name = default_table_name(self.__class__.__name__)
+        assert self.worksheet_name
+        assert self.fields
+        self.fields = tuple(self.fields)
+        self.row_count = 0
+        self._worksheet = None
+
+    def open(self, workbook):
+        """Create the worksheet in the write-only `workbook` and write the
+        marker and header."""
+        self._worksheet = workbook.create_sheet(self.worksheet_name)
+        if self.table_marker:
+            self._worksheet.append([self.table_marker])
+        self._worksheet.append(self.fields)
+
+    def add_tuple(self, values):
+        """Add a row. `values` must have one value per field."""
+        if len(values) != len(self.fields):
+            raise ValueError(f'expected {len(self.fields)} values for '
+                             f'{self.name}, got {values}')
+        self._worksheet.append(values)
+        self.row_count += 1
+
+    def add_tuples(self, tuple_iter):
+        """Add a row for each item of `tuple_iter`."""
+        for values in tuple_iter:
+            self.add_tuple(values)
+
+    def add_records(self, records):
+        """Add a row for each record of `records`, such as a RecordSet or a
+        RecordStream, which must have the fields of this table."""
+        assert tuple(records.fields) == self.fields, records.fields
+        self.add_tuples(records)
+
+
+def next_workbook_path(directory_path, name_pattern):
+    """Return the path in `directory_path` given by `name_pattern`. If the
+    pattern has a `{num}` field, use the first number from 1 that gives a
+    path that does not exist yet."""
+    directory_path.mkdir(parents=True, exist_ok=True)
+    if '{' not in name_pattern:
+        return directory_path / name_pattern
+    for num in count(1):
+        path = directory_path / name_pattern.format(num=num)
+        if not path.exists():
+            return path
+
+
+def describe_source(records):
+    """Return a row of SOURCE_FIELDS for the input `records`."""
+    source = getattr(records, 'source', None)
+    record_count = (len(records) if hasattr(records, '__len__')
+                    else records.record_count)  # A RecordStream
+    if source is None:
+        return (records.record_class.__name__, record_count)
+    return (source.name, record_count, source.worksheet_name,
+            source.table_marker, source.start_row)
@@ -0,0 +1,59 @@
+"""Code for loading several workbook models at once in a process pool, or
+without blocking an asyncio event loop."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+
+def load_models(model_classes, config=None, max_workers=None):
+    """Construct an instance of each InputWorkbookModel subclass in
+    `model_classes` using `config`, each in a separate worker process (see
+    `InputWorkbookModel.build_in_worker`). Return the list of models in the
+    same order as `model_classes`. The classes must be importable by the
+    workers, i.e. defined at module level."""
+    with ProcessPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(model_class.build_in_worker, config)
+                   for model_class in model_classes]
+        return [future.result() for future in futures]
+
+
+async def aload_models(model_classes, config=None, executor=None,
+                       max_concurrency=None, timeout=None,
+                       return_exceptions=False):
+    """Construct an instance of each InputWorkbookModel subclass in
+    `model_classes` using `config` without blocking the event loop, and
+    return the list of models in the same order, like `asyncio.gather`.
+
+    Each model is built by `executor`, a `ThreadPoolExecutor` or a
+    `ProcessPoolExecutor` (for which the classes must be defined at module
+    level), by default the event loop's default executor. At most
+    `max_concurrency` models are built at once. If building a model takes
+    more than `timeout` seconds, `asyncio.TimeoutError` is raised, or is
+    returned in place of the model if `return_exceptions` is true, so that
+    one huge workbook does not hold up the others.
+
+    On a timeout or cancellation, models not yet started are never built,
+    but a build that has already started runs to completion in the executor
+    and its result is discarded."""
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    return await asyncio.gather(
+        *(aload_model(model_class, config, executor, timeout, semaphore)
+          for model_class in model_classes),
+        return_exceptions=return_exceptions
+    )
+
+
+async def aload_model(model_class, config, executor, timeout, semaphore):
+    """Build one model for `aload_models`, waiting for `semaphore` if it is
+    not None. The timeout starts once the build is allowed to start."""
+    if semaphore is not None:
+        async with semaphore:
+            return await aload_model(model_class, config, executor, timeout,
+                                     None)
+    loop = asyncio.get_event_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        build = model_class.build_in_worker
+    else:
+        build = model_class
+    future = loop.run_in_executor(executor, build, config)
+    return await asyncio.wait_for(future, timeout)
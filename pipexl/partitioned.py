@@ -0,0 +1,143 @@
+"""Code for treating several record sets with the same fields, such as the
+same table loaded from a series of monthly workbooks, as one."""
+
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Sequence
+from itertools import accumulate, chain
+from time import perf_counter
+
+from .recordset import RecordSetMixin, add_tuples, emit_sum_by
+from .schema import merge_schemas
+
+
+class PartitionedRecordSet(RecordSetMixin, Sequence):
+    """A read-only sequence of the records of several RecordSets (the
+    partitions) with the same fields. The partitions are not copied.
+    `partition_names` labels each partition, e.g. with the path of its
+    workbook; `locate` maps a position to its partition."""
+    def __init__(self, partitions, partition_names=None):
+        self.partitions = list(partitions)
+        assert self.partitions
+        self.partition_names = list(partition_names
+                                    or range(len(self.partitions)))
+        assert len(self.partition_names) == len(self.partitions)
+        first = self.partitions[0]
+        self.source = None
+        self.fields = first.fields
+        self.normalize_fields = first.normalize_fields
+        self.record_class = first.record_class
+        for partition in self.partitions:
+            assert partition.fields == self.fields, partition.fields
+        self._offsets = list(accumulate(len(p) for p in self.partitions))
+        self.schema = merge_schemas(p.schema for p in self.partitions)
+        self._compute_grand_total()  # Sets grand_total
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+        partition_number, partition_index = self.locate(index)
+        return self.partitions[partition_number][partition_index]
+
+    def __iter__(self):
+        return chain.from_iterable(self.partitions)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} {self.record_class.__name__}: '
+                f'{len(self)} records in {len(self.partitions)} partitions>')
+
+    def __reduce__(self):
+        return (self.__class__, (self.partitions, self.partition_names))
+
+    @property
+    def sources(self):
+        """Return the list of the sources of the partitions."""
+        return [partition.source for partition in self.partitions]
+
+    def locate(self, index):
+        """Return the partition number of the record at `index` and its index
+        within that partition."""
+        partition_number = bisect_right(self._offsets, index)
+        start = self._offsets[partition_number - 1] if partition_number else 0
+        return partition_number, index - start
+
+    def source_rows(self, positions):
+        """Return the worksheet row of the record at each of `positions` in
+        the workbook of its partition, or None if not known."""
+        located = [self.locate(position) for position in positions]
+        by_partition = defaultdict(list)
+        for partition_number, index in located:
+            by_partition[partition_number].append(index)
+        rows = {}
+        for partition_number, indexes in by_partition.items():
+            partition = self.partitions[partition_number]
+            rows.update(((partition_number, index), row) for index, row
+                        in zip(indexes, partition.source_rows(indexes)))
+        return [rows[location] for location in located]
+
+    def iter_with_partition(self):
+        """Generate (partition_number, record) pairs."""
+        for partition_number, partition in enumerate(self.partitions):
+            for record in partition:
+                yield partition_number, record
+
+    def astuples(self):
+        """Return a `list` of the records as tuples of values."""
+        return list(chain.from_iterable(p.astuples()
+                                        for p in self.partitions))
+
+    def sum_by(self, *key_fields):
+        """Aggregate by the specified key fields across all partitions,
+        returning a RecordSet of the same type as the partitions. Each
+        partition is aggregated separately and the subtotals are merged."""
+        start = perf_counter()
+        result_class_name, fields, summed_fields = self._sum_by_layout(
+            key_fields
+        )
+        key_count = len(key_fields)
+        totals = {}
+        for partition in self.partitions:
+            subtotals = partition.sum_by(*key_fields)
+            indexes = [subtotals.fields.index(f) for f in summed_fields]
+            for values in subtotals.astuples():
+                key = values[:key_count]
+                data = tuple(values[i] for i in indexes)
+                if key in totals:
+                    data = add_tuples(totals[key], data)
+                totals[key] = data
+        tuples = sorted(key + value for key, value in totals.items())
+        result = self._derive(result_class_name, fields, tuples)
+        emit_sum_by(self, key_fields, result, start)
+        return result
+
+    def make_index(self, *key_fields):
+        result = defaultdict(list)
+        for partition in self.partitions:
+            for key, records in partition.make_index(*key_fields).items():
+                result[key].extend(records)
+        return result
+
+    def _derive(self, record_type_name, fields, tuple_iter):
+        """Return a new record set of the storage class of the partitions."""
+        return type(self.partitions[0])(record_type_name, fields, tuple_iter)
+
+    def _compute_grand_total(self):
+        totals = [dict(zip(p.grand_total.fields, p.grand_total.astuple))
+                  for p in self.partitions]
+        grand_total_dict = {
+            field: sum(total[field] for total in totals)
+            for field in self.schema.summable_fields
+        }
+        self._make_grand_total(grand_total_dict)
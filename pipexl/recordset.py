@@ -1,65 +1,249 @@
 """Code for collections of generic records."""
 
-from collections import defaultdict
-from dataclasses import make_dataclass, astuple, replace
-from dataclasses import fields as get_fields
-from numbers import Number
-from operator import attrgetter
+from collections import Counter, defaultdict
+from functools import lru_cache, partial
+from itertools import chain, compress, count, repeat
+from operator import attrgetter, eq, itemgetter, not_
+from time import perf_counter
 
-from .util import normalize_name
+from .instrument import HOOKS, emit
+from .schema import infer_schema
+from .util import (date_field_name, gc_paused, normalize_name,
+                   parse_date_field, tuple_getter)
 
 
-class RecordSet(list):
-    """A collection of records that are all of the same type. Constructed
-    from a `list` where each item is an instance of a custom data class."""
-    def __init__(self, record_type_name, fields, tuple_iter,
-                 normalize_fields=(), filters=None):
-        """`tuple_iter` must be an iterable of star-compatible items, where
-        each item has the same length as `fields`. `normalize_fields` has an
-        empty default and denotes the subset of field whose values should be
-        normalized."""
-        self.source = None
-        self.fields = fields
-        self.normalize_fields = normalize_fields
-        self.record_class = make_record_class(record_type_name, self.fields)
-        record_iter = iter_records(tuple_iter, self.record_class,
-                                   normalize_fields, filters)
-        super().__init__(record_iter)
-        self._compute_grand_total()  # Sets grand_total
+class RecordSetMixin:
+    """Methods shared by the record set storage classes. Subclasses provide
+    `fields`, `record_class`, `grand_total`, iteration over records, and a
+    constructor with the same signature as `RecordSet`."""
+    _version = 0  # Changed by each change to the records of a mutable set
 
     def sum_by(self, *key_fields):
         """Aggregate by the specified key fields, returting a new RecordSet
         of the corresponding subtotals"""
-        result_class_name = (self.record_class.__name__
-                             + '_by_' + '_'.join(key_fields))
-        summed_fields = tuple(field for field in self.grand_total.fields
-                              if field not in key_fields)
-        fields = key_fields + summed_fields
+        start = perf_counter()
+        result_class_name, fields, summed_fields = self._sum_by_layout(
+            key_fields
+        )
         key_function = make_key_function(key_fields)
         data_function = make_key_function(summed_fields)
         aggregation = aggregate(self, key_function, data_function)
         tuples = sorted(key + value for key, value in aggregation.items())
-        return self.__class__(result_class_name, fields, tuples)
+        result = self._derive(result_class_name, fields, tuples)
+        emit_sum_by(self, key_fields, result, start)
+        return result
 
-    def _compute_grand_total(self):
-        record_type_name = self.record_class.__name__
-        grand_total_dict = {n: 0 for n in self.fields}
+    def grouping_sets(self, *groupings):
+        """Aggregate by each of several groupings at once. Each grouping is a
+        key field or a tuple of key fields. Return a `list` with one record
+        set per grouping, equal to the result of `sum_by(*grouping)`. All of
+        the subtotals are accumulated in a single pass over the records."""
+        groupings = [(grouping,) if isinstance(grouping, str)
+                     else tuple(grouping) for grouping in groupings]
+        summable_fields = self.grand_total.fields
+        summed_indexes = [self.fields.index(f) for f in summable_fields]
+        key_functions = [make_key_function(g) for g in groupings]
+        subtotals = [{} for _ in groupings]
+        width = len(summed_indexes)
         for record in self:
-            for field in list(grand_total_dict):
-                value = record[field]
-                if value is None:
-                    value = 0
-                if isinstance(value, Number):
-                    grand_total_dict[field] += value
-                else:  # This column is not summable.
-                    del grand_total_dict[field]
-        grand_total_fields = [field for field in self.fields
-                              if field in grand_total_dict]
-        grand_total_class = make_record_class(
-            record_type_name + '_grand_total',
-            grand_total_fields
+            values = [record[i] for i in summed_indexes]
+            for key_function, accumulators in zip(key_functions, subtotals):
+                key = key_function(record)
+                accumulator = accumulators.get(key)
+                if accumulator is None:
+                    accumulator = accumulators[key] = [0] * width
+                for i, value in enumerate(values):
+                    if value is not None:
+                        accumulator[i] += value
+        result = []
+        for grouping, accumulators in zip(groupings, subtotals):
+            result_class_name, fields, summed_fields = self._sum_by_layout(
+                grouping
+            )
+            indexes = [summable_fields.index(f) for f in summed_fields]
+            tuples = sorted(key + tuple(sums[i] for i in indexes)
+                            for key, sums in accumulators.items())
+            result.append(self._derive(result_class_name, fields, tuples))
+        return result
+
+    def rollup(self, *key_fields):
+        """Return the subtotals by each leading subset of `key_fields`, e.g.
+        by (a,), (a, b) and (a, b, c) for `rollup('a', 'b', 'c')`, as a `list`
+        of record sets. See `grouping_sets`."""
+        return self.grouping_sets(*(key_fields[:n]
+                                    for n in range(1, len(key_fields) + 1)))
+
+    def join(self, other, on, how='inner', suffix='_2'):
+        """Join with the record set `other` on the key field or tuple of key
+        fields `on`, which both must have. Return a new record set with the
+        fields of this one followed by the other fields of `other`; where
+        these clash, `suffix` is appended. `how` is 'inner', 'left' (records
+        without a match get None for the fields of `other`) or 'anti' (only
+        the records without a match, with the fields of this one). Records
+        stay in the order of this record set.
+
+        The hash table is built on the smaller side and cached on that record
+        set per tuple of key fields, so repeated joins against the same lookup
+        table do not rehash it."""
+        assert how in ('inner', 'left', 'anti'), how
+        key_fields = (on,) if isinstance(on, str) else tuple(on)
+        assert key_fields
+        key_function = make_key_function(key_fields)
+        if len(other) <= len(self):
+            index = other._cached_index(key_fields)
+            matches = ((record, [match for _, match
+                                 in index.get(key_function(record), ())])
+                       for record in self)
+        else:
+            index = self._cached_index(key_fields)
+            found = defaultdict(list)
+            for record in other:
+                for position, _ in index.get(key_function(record), ()):
+                    found[position].append(record)
+            matches = ((record, found.get(position, ()))
+                       for position, record in enumerate(self))
+        name = self.record_class.__name__
+        other_name = other.record_class.__name__
+        if how == 'anti':
+            tuples = (record for record, found in matches if not found)
+            return self._derive(name + '_without_' + other_name, self.fields,
+                                tuples)
+        extra_fields = tuple(field for field in other.fields
+                             if field not in key_fields)
+        fields = self.fields + tuple(
+            field + suffix if field in self.fields else field
+            for field in extra_fields
         )
-        self.grand_total = grand_total_class(**grand_total_dict)
+        tuples = iter_joined(matches, extra_fields, how == 'left')
+        return self._derive(name + '_join_' + other_name, fields, tuples)
+
+    def melt(self, id_fields, value_fields=None, variable_field='variable',
+             value_field='value', date_format=None):
+        """Unpivot: return a record set with the `id_fields` followed by
+        `variable_field`, the name of one of `value_fields` (by default all
+        fields other than `id_fields`), and `value_field`, its value. There
+        is a record for each value field and each record, grouped by value
+        field. With `date_format`, such as the `header_date_format` of the
+        InputTable, names that `parse_date_field` can parse become datetimes.
+        The result is built a column at a time."""
+        id_fields = as_fields(id_fields)
+        if value_fields is None:
+            value_fields = [f for f in self.fields if f not in id_fields]
+        variables = [parse_date_field(field, date_format) if date_format
+                     else field for field in value_fields]
+        columns = [list(self._iter_column(field)) * len(value_fields)
+                   for field in id_fields]
+        columns.append(list(chain.from_iterable(
+            repeat(variable, len(self)) for variable in variables
+        )))
+        columns.append(list(chain.from_iterable(
+            self._iter_column(field) for field in value_fields
+        )))
+        return self._from_columns(
+            self.record_class.__name__ + '_melt',
+            id_fields + (variable_field, value_field),
+            columns
+        )
+
+    def pivot(self, index_fields, column_field, value_field,
+              date_format='%b-%y'):
+        """Return a record set with a record for each distinct key of
+        `index_fields` and a field for each distinct value of
+        `column_field`, both in order of first appearance, holding the values
+        of `value_field`. This reverses `melt`. Values for the same key and
+        column are added, ignoring None, and missing ones are None. Fields
+        are named after the column values as InputTable names header fields,
+        so that dates are formatted with `date_format` (see
+        `date_field_name`)."""
+        index_fields = as_fields(index_fields)
+        index_codes, keys = factorize(zip(*(self._iter_column(field)
+                                            for field in index_fields)))
+        column_codes, names = factorize(self._iter_column(column_field))
+        width = len(names)
+        cells = [None] * (len(keys) * width)
+        for index_code, column_code, value in zip(
+                index_codes, column_codes, self._iter_column(value_field)):
+            if value is not None:
+                cell = index_code * width + column_code
+                total = cells[cell]
+                cells[cell] = value if total is None else total + value
+        fields = index_fields + tuple(date_field_name(name, date_format)
+                                      for name in names)
+        assert len(set(fields)) == len(fields), fields
+        columns = [list(column) for column in zip(*keys)] or [
+            [] for _ in index_fields
+        ]
+        columns.extend(cells[i::width] for i in range(width))
+        return self._from_columns(
+            self.record_class.__name__ + '_pivot_' + column_field, fields,
+            columns
+        )
+
+    def find_duplicates(self, *key_fields):
+        """Return a record set of the records that share the values of
+        `key_fields` with another record: the key fields followed by the
+        `position` of the record and its worksheet `row` (see
+        `source_rows`). Records with the same key are together, in order of
+        first appearance."""
+        keys, counts = self._cached_keys(key_fields)
+        duplicate_keys = {key for key, count in counts.items() if count > 1}
+        groups = {}
+        for position in compress(count(), map(duplicate_keys.__contains__,
+                                              keys)):
+            groups.setdefault(keys[position], []).append(position)
+        return self._key_report(
+            self.record_class.__name__ + '_duplicate_keys', key_fields,
+            [(key, position)
+             for key, positions in groups.items() for position in positions]
+        )
+
+    def anti_join_keys(self, other, *key_fields):
+        """Return a record set, like that of `find_duplicates`, of the records
+        whose values of `key_fields` do not occur in the record set `other`,
+        in order. The keys of both record sets are cached, so checking keys
+        between two tables in both directions reads each table once."""
+        keys, _ = self._cached_keys(key_fields)
+        _, other_counts = other._cached_keys(key_fields)
+        return self._key_report(
+            self.record_class.__name__ + '_keys_not_in_'
+            + other.record_class.__name__,
+            key_fields,
+            [(keys[position], position) for position in compress(
+                count(), map(not_, map(other_counts.__contains__, keys))
+            )]
+        )
+
+    def source_rows(self, positions):
+        """Return the worksheet row of the record at each of `positions`, or
+        None for each if the rows are not known, as for a derived record
+        set."""
+        source = self.source
+        if getattr(source, 'filtered_rows', None) is None:
+            return [None] * len(positions)
+        return source.sheet_rows(positions)
+
+    def where(self, predicate=None, **conditions):
+        """Return a lazy `Query` of the records that meet the conditions. See
+        `Query.where`."""
+        return Query(self).where(predicate, **conditions)
+
+    def select(self, *fields):
+        """Return a lazy `Query` of the records with only `fields`."""
+        return Query(self).select(*fields)
+
+    def __reduce__(self):
+        """Records are instances of generated classes, which cannot be
+        pickled by reference, so pickle the values and rebuild."""
+        state = dict(source=self.source,
+                     normalize_fields=self.normalize_fields,
+                     schema=self.schema, grand_total=self.grand_total)
+        return (self.__class__,
+                (self.record_class.__name__, self.fields, self.astuples()),
+                state)
+
+    def astuples(self):
+        """Return a `list` of the records as tuples of values."""
+        return [record.astuple for record in self]
 
     def make_index(self, *key_fields):
         key_function = attrgetter(*key_fields)
@@ -68,52 +252,521 @@ class RecordSet(list):
             result[key_function(record)].append(record)
         return result
 
+    def _cached_index(self, key_fields):
+        """Return a dict mapping key tuples to lists of (position, record)
+        pairs, cached per tuple of key fields. An index is rebuilt if the
+        records have changed since it was built."""
+        indexes = getattr(self, '_join_indexes', None)
+        if indexes is None:
+            indexes = self._join_indexes = {}
+        version, index = indexes.get(key_fields, (None, None))
+        if version != (self._version, len(self)):
+            key_function = make_key_function(key_fields)
+            index = defaultdict(list)
+            for position, record in enumerate(self):
+                index[key_function(record)].append((position, record))
+            index = dict(index)
+            indexes[key_fields] = (self._version, len(self)), index
+        return index
+
+    def _cached_keys(self, key_fields):
+        """Return the list of the keys of the records for `key_fields`, where
+        a key is a value for one field or else a tuple of values, and a dict
+        counting the records with each key. Both are cached per tuple of key
+        fields and rebuilt if the records have changed."""
+        assert key_fields
+        key_columns = getattr(self, '_key_columns', None)
+        if key_columns is None:
+            key_columns = self._key_columns = {}
+        version, keys, counts = key_columns.get(key_fields, (None, None, None))
+        if version != (self._version, len(self)):
+            columns = [self._iter_column(field) for field in key_fields]
+            keys = list(columns[0] if len(columns) == 1 else zip(*columns))
+            counts = Counter(keys)
+            key_columns[key_fields] = (self._version, len(self)), keys, counts
+        return keys, counts
+
+    def _iter_column(self, field):
+        """Generate the values of `field`."""
+        return iter_column(self, self.fields.index(field))
+
+    def _iter_tuples(self):
+        """Generate the values of each record as a tuple, which may be the
+        record itself."""
+        return iter(self)
+
+    def _key_report(self, record_type_name, key_fields, keyed_positions):
+        """Return a record set of the key fields, `position`, and `row` for
+        each (key, position) pair of `keyed_positions`, where keys are as
+        from `_cached_keys`."""
+        rows = self.source_rows([position for _, position in keyed_positions])
+        if len(key_fields) == 1:
+            keyed_positions = [((key,), position)
+                               for key, position in keyed_positions]
+        return self._derive(
+            record_type_name, tuple(key_fields) + ('position', 'row'),
+            (key + (position, row)
+             for (key, position), row in zip(keyed_positions, rows))
+        )
+
+    def _from_columns(self, record_type_name, fields, columns):
+        """Return a new record set, like `_derive`, from a list of the values
+        of each of `fields`."""
+        return self._derive(record_type_name, fields, zip(*columns))
+
+    def _derive(self, record_type_name, fields, tuple_iter):
+        """Return a new record set of the same storage class."""
+        return self.__class__(record_type_name, fields, tuple_iter)
+
+    def _sum_by_layout(self, key_fields):
+        return sum_by_layout(self.record_class.__name__,
+                             self.grand_total.fields, key_fields)
+
+    def _make_grand_total(self, grand_total_dict):
+        """Set `grand_total` from a dict of the summable fields."""
+        grand_total_fields = [field for field in self.fields
+                              if field in grand_total_dict]
+        grand_total_class = make_record_class(
+            self.record_class.__name__ + '_grand_total',
+            grand_total_fields
+        )
+        self.grand_total = grand_total_class(**grand_total_dict)
+
+
+def changing(method):
+    """Return a version of the `list` method `method` that also increments
+    `_version`, for methods that change the records of a RecordSet."""
+    def result(self, *args, **kwargs):
+        self._version += 1
+        return method(self, *args, **kwargs)
+    result.__name__ = method.__name__
+    result.__doc__ = method.__doc__
+    return result
+
 
-def iter_records(tuple_iter, record_class, normalize_fields, filters):
+class RecordSet(RecordSetMixin, list):
+    """A collection of records that are all of the same type. Constructed
+    from a `list` where each item is an instance of a record class from
+    `make_record_class`."""
+    def __init__(self, record_type_name, fields, tuple_iter,
+                 normalize_fields=(), filters=None, intern_fields=(),
+                 normalizers=None, schema=None):
+        """`tuple_iter` must be an iterable of star-compatible items, where
+        each item has the same length as `fields`. `normalize_fields` has an
+        empty default and denotes the subset of field whose values should be
+        normalized, by `normalize_name` or by the function for the field in
+        the dict `normalizers`. Equal strings of `intern_fields` share one
+        object, which saves memory and speeds up hashing when values
+        repeat. `schema`, a dict, may declare the kinds of some fields (see
+        `infer_schema`); the schema of the others is inferred."""
+        self.source = None
+        self.fields = fields
+        self.normalize_fields = normalize_fields
+        self.record_class = make_record_class(record_type_name, self.fields)
+        start = perf_counter()
+        record_iter = iter_records(tuple_iter, self.record_class,
+                                   normalize_fields, filters, intern_fields,
+                                   normalizers)
+        super().__init__(record_iter)
+        self._finish(schema, start)
+
+    @classmethod
+    def from_columns(cls, record_type_name, fields, columns, schema=None):
+        """Return a RecordSet from `columns`, a sequence of the values of
+        each of `fields`, all of the same length. Records are built straight
+        from the values, without the checks of the constructor."""
+        result = cls.__new__(cls)
+        result.source = None
+        result.fields = fields
+        result.normalize_fields = ()
+        result.record_class = make_record_class(record_type_name, fields)
+        start = perf_counter()
+        columns = list(columns)
+        assert len(set(map(len, columns))) <= 1
+        with gc_paused():
+            list.__init__(result, map(partial(tuple.__new__,
+                                              result.record_class),
+                                      zip(*columns)))
+        result._finish(schema, start)
+        return result
+
+    def _from_columns(self, record_type_name, fields, columns):
+        return self.from_columns(record_type_name, fields, columns)
+
+    # The list methods that change the records invalidate cached indexes.
+    __setitem__ = changing(list.__setitem__)
+    __delitem__ = changing(list.__delitem__)
+    __iadd__ = changing(list.__iadd__)
+    __imul__ = changing(list.__imul__)
+    append = changing(list.append)
+    extend = changing(list.extend)
+    insert = changing(list.insert)
+    pop = changing(list.pop)
+    remove = changing(list.remove)
+    clear = changing(list.clear)
+    sort = changing(list.sort)
+    reverse = changing(list.reverse)
+
+    def _finish(self, schema, start):
+        """Infer the schema and compute the grand total of the records, built
+        since `start`."""
+        built = perf_counter()
+        self.schema = infer_schema(
+            self.fields, lambda i: iter_column(self, i), schema,
+            self.record_class.__name__
+        )
+        self._compute_grand_total()  # Sets grand_total
+        emit_built(self, start, built)
+
+    def _compute_grand_total(self):
+        """Sum the summable columns of the schema, so no value needs to be
+        checked."""
+        summable_fields = self.schema.summable_fields
+        self._make_grand_total({
+            field: sum(filter(None, iter_column(self, i)))
+            for i, field in enumerate(self.fields)
+            if field in summable_fields
+        })
+
+
+class Query:
+    """A lazy plan of `where` and `select` steps over the records of `source`,
+    a record set or a source that loads one, such as the `TableSource` of a
+    lazy model. Each step returns a new Query and nothing is read until the
+    query is iterated, collected, or summed. Then the steps run together as
+    chained generators in a single pass over the records, without building a
+    record set for each step."""
+    def __init__(self, source, steps=()):
+        self.source = source
+        self.steps = tuple(steps)
+
+    def where(self, predicate=None, **conditions):
+        """Keep the records that meet every one of `conditions` and for which
+        `predicate`, if given, returns True. Each keyword argument names a
+        field and gives either the value to match or a function that returns
+        True for the values to keep."""
+        step = ('where', FieldConditions(conditions), predicate)
+        return Query(self.source, self.steps + (step,))
+
+    def select(self, *fields):
+        """Keep only `fields`, in that order."""
+        assert fields
+        return Query(self.source, self.steps + (('select', fields),))
+
+    def __iter__(self):
+        record_set, fields, tuple_iter = self._run()
+        if tuple_iter is None:
+            return iter(record_set)
+        record_class = make_record_class(record_set.record_class.__name__,
+                                         fields)
+        return map(record_class._make, tuple_iter)
+
+    def collect(self):
+        """Run the plan and return the result as a record set of the same
+        storage class as the source."""
+        record_set, fields, tuple_iter = self._run()
+        if tuple_iter is None:
+            return record_set
+        return record_set._derive(record_set.record_class.__name__, fields,
+                                  tuple_iter)
+
+    def sum_by(self, *key_fields):
+        """Run the plan and return the subtotals by `key_fields`, like
+        `collect().sum_by(*key_fields)`. The summed fields are those of the
+        result that are summable in the schema of the source. The subtotals
+        are accumulated as the records pass, without collecting them."""
+        record_set, fields, tuple_iter = self._run()
+        if tuple_iter is None:
+            return record_set.sum_by(*key_fields)
+        key_function = tuple_getter([fields.index(f) for f in key_fields])
+        summable_fields = set(record_set.schema.summable_fields)
+        summable = tuple(i for i, field in enumerate(fields)
+                         if field in summable_fields)
+        subtotals = {}
+        for values in tuple_iter:
+            key = key_function(values)
+            accumulator = subtotals.get(key)
+            if accumulator is None:
+                accumulator = subtotals[key] = [0] * len(fields)
+            for i in summable:
+                value = values[i]
+                if value is not None:
+                    accumulator[i] += value
+        result_class_name, result_fields, summed_fields = sum_by_layout(
+            record_set.record_class.__name__,
+            [fields[i] for i in summable],
+            key_fields
+        )
+        summed_indexes = [fields.index(f) for f in summed_fields]
+        tuples = sorted(key + tuple(sums[i] for i in summed_indexes)
+                        for key, sums in subtotals.items())
+        return record_set._derive(result_class_name, result_fields, tuples)
+
+    def _run(self):
+        """Return the record set to read, the fields of the result, and an
+        iterator of the tuples of the result. The iterator is None if the
+        record set, loaded by the source, is the result."""
+        steps = self.steps
+        if hasattr(self.source, 'load_steps'):
+            record_set, steps = self.source.load_steps(steps)
+            if not steps:
+                return record_set, record_set.fields, None
+        else:
+            record_set = self.source
+        fields = tuple(record_set.fields)
+        tuple_iter = iter(record_set)
+        for step in steps:
+            if step[0] == 'select':
+                tuple_iter = map(
+                    tuple_getter([fields.index(f) for f in step[1]]),
+                    tuple_iter
+                )
+                fields = tuple(step[1])
+                continue
+            _, conditions, predicate = step
+            if conditions:
+                tuple_iter = conditions.filter(fields, tuple_iter)
+            if predicate:
+                record_class = make_record_class(
+                    record_set.record_class.__name__, fields
+                )
+                tuple_iter = iter_accepted(tuple_iter, record_class,
+                                           predicate)
+        return record_set, fields, tuple_iter
+
+
+class FieldConditions:
+    """A predicate that is called with the values of the fields named by the
+    keys of `conditions`, a dict, and returns True if each value equals its
+    condition or, where the condition is a function, if the function returns
+    True for the value. `signature_value` identifies the conditions, so that
+    a table loaded with them as its `predicate` gets its own `TableCache`
+    entry."""
+    def __init__(self, conditions):
+        self.conditions = conditions
+        self.fields = tuple(conditions)
+        self._tests = tuple(value if callable(value) else partial(eq, value)
+                            for value in conditions.values())
+
+    def __bool__(self):
+        return bool(self.conditions)
+
+    def __call__(self, *values):
+        for test, value in zip(self._tests, values):
+            if not test(value):
+                return False
+        return True
+
+    def __repr__(self):
+        conditions = [(field, getattr(value, '__qualname__', value)
+                       if callable(value) else value)
+                      for field, value in self.conditions.items()]
+        return f'{self.__class__.__name__}({conditions!r})'
+
+    def signature_value(self):
+        """Return the value that stands for these conditions in
+        `function_signature`."""
+        return (self.__class__.__name__, self.conditions)
+
+    def filter(self, fields, tuple_iter):
+        """Generate the items of `tuple_iter`, tuples of values of `fields`,
+        that meet the conditions."""
+        get_values = tuple_getter([fields.index(f) for f in self.fields])
+        for values in tuple_iter:
+            if self(*get_values(values)):
+                yield values
+
+
+def emit_built(record_set, start, built):
+    """Emit a 'record_set_built' event for `record_set`, whose construction
+    started at `start` and whose records were built by `built`, both from
+    `perf_counter`, and whose grand total has just been computed."""
+    if HOOKS:
+        end = perf_counter()
+        emit('record_set_built', record_type=record_set.record_class.__name__,
+             storage=record_set.__class__.__name__, records=len(record_set),
+             seconds=end - start, records_seconds=built - start,
+             grand_total_seconds=end - built)
+
+
+def emit_sum_by(record_set, key_fields, result, start):
+    """Emit a 'sum_by' event for `result`, the subtotals of `record_set`
+    computed since `start`, from `perf_counter`."""
+    if HOOKS:
+        emit('sum_by', record_type=record_set.record_class.__name__,
+             key_fields=list(key_fields), records=len(record_set),
+             groups=len(result), seconds=perf_counter() - start)
+
+
+def sum_by_layout(record_type_name, summable_fields, key_fields):
+    """Return the record type name, fields, and summed fields of the result
+    of aggregating by `key_fields`."""
+    result_class_name = record_type_name + '_by_' + '_'.join(key_fields)
+    summed_fields = tuple(field for field in summable_fields
+                          if field not in key_fields)
+    return result_class_name, key_fields + summed_fields, summed_fields
+
+
+def iter_joined(matches, extra_fields, keep_unmatched):
+    """Generate the joined tuples from (record, matching records) pairs.
+    Unmatched records are kept, padded with None, if `keep_unmatched`."""
+    extra_function = make_key_function(extra_fields) if extra_fields else None
+    padding = (None,) * len(extra_fields)
+    for record, found in matches:
+        values = tuple(record)
+        for match in found:
+            yield values + (extra_function(match) if extra_function else ())
+        if keep_unmatched and not found:
+            yield values + padding
+
+
+def iter_accepted(tuple_iter, record_class, predicate):
+    """Generate the tuples of `tuple_iter` for which `predicate` returns True
+    when called with the tuple as a record of `record_class`."""
+    make = record_class._make
+    for values in tuple_iter:
+        if predicate(make(values)):
+            yield values
+
+
+def iter_records(tuple_iter, record_class, normalize_fields, filters,
+                 intern_fields=(), normalizers=None):
     """Generate records from an iterator of tuples. Exclude rows that are
     missing key values or are hit by `filters`."""
+    return map(record_class._make,
+               iter_valid_tuples(tuple_iter, record_class._fields,
+                                 normalize_fields, filters, intern_fields,
+                                 normalizers))
+
+
+def iter_valid_tuples(tuple_iter, fields, normalize_fields, filters,
+                      intern_fields=(), normalizers=None):
+    """Generate the tuples from `tuple_iter` that are not hit by `filters`,
+    with the values of `normalize_fields` normalized and equal strings of
+    `intern_fields` replaced by the first of them. Other values are kept as
+    they are, since 1, 1.0 and True are equal. Rows are checked before any
+    record is constructed. Each distinct value of a field is normalized
+    only once; see `RecordSet` for `normalizers`."""
     filters = filters or {}
-    filter_tuples = tuple((k, v) for k, v in filters.items())
+    normalizers = normalizers or {}
+    filter_tuples = tuple((fields.index(k), v) for k, v in filters.items())
+    normalize_steps = tuple(
+        (fields.index(f), normalizers.get(f, normalize_name), {})
+        for f in normalize_fields
+    )  # (index, normalizer, dict of normalized values) for each field
+    intern_indexes = tuple(fields.index(f) for f in intern_fields)
+    pool = {}  # Maps each interned string to itself
     for values in tuple_iter:
-        record = record_class(*values)
-        valid = check_valid(record, filter_tuples)
+        valid = check_valid(values, filter_tuples)
         if valid:
-            changes = {field_name: normalize_name(record[field_name])
-                       for field_name in normalize_fields}
-            if changes:
-                record = replace(record, **changes)
-            yield record
+            if normalize_steps or intern_indexes:
+                values = list(values)
+                for i, normalizer, normalized in normalize_steps:
+                    value = values[i]
+                    try:
+                        values[i] = normalized[value]
+                    except KeyError:
+                        values[i] = normalized[value] = normalizer(value)
+                for i in intern_indexes:
+                    value = values[i]
+                    if type(value) is str:
+                        values[i] = pool.setdefault(value, value)
+            yield values
 
 
-def check_valid(record, filter_tuples):
-    """Verify that a record is not the result of a dummy row in the middle
+def check_valid(values, filter_tuples):
+    """Verify that a row is not the result of a dummy row in the middle
     of a table. A dummy row will either be missing key fields or have some
-    signature value in a particular field."""
-    filters_triggered = any((record[field] == filter_value)
-                            for field, filter_value in filter_tuples)
+    signature value in a particular field. `filter_tuples` holds
+    (index, value) pairs."""
+    filters_triggered = any((values[i] == filter_value)
+                            for i, filter_value in filter_tuples)
     return not filters_triggered
 
 
+def iter_column(records, index):
+    """Generate the value at `index` of each of `records`. Reading the tuples
+    directly avoids the `__getitem__` of the record classes."""
+    return map(tuple.__getitem__, records, repeat(index))
+
+
 def make_record_class(cls_name, field_names):
     """Return a class for holding table rows as records. The data can be
-    accessed using either attribute or dictionary syntax."""
-    return make_dataclass(cls_name,
-                          field_names,
-                          bases=(RecordAttributeMixin,),
-                          frozen=True)
+    accessed using either attribute or dictionary syntax. Records are
+    immutable tuples, so they are compact and quick to construct. Classes are
+    cached, so the same name and fields always give the same class."""
+    return cached_record_class(cls_name, tuple(field_names))
+
+
+@lru_cache(maxsize=None)
+def cached_record_class(cls_name, field_names):
+    """Build the record class for `make_record_class`."""
+    arguments = ', '.join(field_names)
+    values = arguments + ',' if field_names else ''
+    namespace = dict(
+        __slots__=(),
+        _fields=field_names,
+        _indexes={name: i for i, name in enumerate(field_names)},
+        __new__=eval(f'lambda _cls, {arguments}: _tuple_new(_cls, ({values}))',
+                     dict(_tuple_new=tuple.__new__)),
+    )
+    for i, name in enumerate(field_names):
+        namespace[name] = property(itemgetter(i))
+    return type(cls_name, (RecordAttributeMixin, tuple), namespace)
+
+
+def make_record(cls_name, field_names, values):
+    """Return a record of the class from `make_record_class`. Used to unpickle
+    records."""
+    return make_record_class(cls_name, field_names)._make(values)
 
 
 class RecordAttributeMixin:
-    """Mixin class adds record methods to generated dataclass."""
-    astuple = property(astuple)
+    """Mixin class adds record methods to generated record classes, which
+    are subclasses of `tuple`."""
+    __slots__ = ()
+    _fields = ()
+    _indexes = {}  # Field name -> index
+
+    @classmethod
+    def _make(cls, values):
+        """Return a record from an iterable of values, one per field."""
+        result = tuple.__new__(cls, values)
+        if len(result) != len(cls._fields):
+            raise TypeError(f'expected {len(cls._fields)} values, '
+                            f'got {len(result)}')
+        return result
+
+    @property
+    def astuple(self):
+        """Return a plain `tuple` of the values."""
+        return tuple(self)
 
     @property
     def fields(self):
         """Return `tuple` of the field names."""
-        return tuple(f.name for f in get_fields(self))
+        return self._fields
+
+    @property
+    def __dict__(self):
+        """Return a `dict` mapping field names to values, for `vars`."""
+        return dict(zip(self._fields, self))
 
     def __getitem__(self, name):
-        return self.__dict__[name]
+        """Return the value of the field `name`, or index the tuple if
+        `name` is not a `str`. Raise KeyError for an unknown field."""
+        if isinstance(name, str):
+            return tuple.__getitem__(self, self._indexes[name])
+        return tuple.__getitem__(self, name)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}'
+                           for name, value in zip(self._fields, self))
+        return f'{self.__class__.__name__}({values})'
+
+    def __reduce__(self):
+        return (make_record,
+                (self.__class__.__name__, self._fields, tuple(self)))
 
 
 def make_key_function(attributes):
@@ -142,6 +795,20 @@ def aggregate(objects, key_function, data_function):
     return result
 
 
+def factorize(key_iter):
+    """Assign a small integer code to each distinct key. Return the `list`
+    of codes, one per key, and the `list` of distinct keys in order of first
+    appearance."""
+    key_codes = {}
+    codes = [key_codes.setdefault(key, len(key_codes)) for key in key_iter]
+    return codes, list(key_codes)
+
+
+def as_fields(fields):
+    """Return a tuple of field names given one name or a sequence."""
+    return (fields,) if isinstance(fields, str) else tuple(fields)
+
+
 def add_tuples(tuple_1, tuple_2):
     """Assuming the tuples of the same length and contain numbers. Create a new
     tuple that is the result of pairwise addition."""
@@ -0,0 +1,137 @@
+"""Column types of record sets, inferred from the values or declared."""
+
+from datetime import date, time
+from numbers import Number
+
+NUMERIC = 'numeric'
+TEXT = 'text'
+DATE = 'date'
+BOOLEAN = 'boolean'
+EMPTY = 'empty'  # Only blanks
+MIXED = 'mixed'  # Values of more than one kind
+KIND_TYPES = {  # The kinds that may be declared
+    NUMERIC: Number,
+    TEXT: str,
+    DATE: (date, time),
+    BOOLEAN: bool,
+}
+SUMMABLE_KINDS = (NUMERIC, BOOLEAN, EMPTY)
+NONE_TYPE = type(None)
+
+
+class SchemaError(ValueError):
+    """Raised when values do not match the declared kinds of their fields.
+    `violations` is the list of (field, position, value) tuples for every
+    such value, where position is the index of the record."""
+    def __init__(self, record_type_name, violations):
+        self.violations = violations
+        details = ', '.join(f'{field}[{position}]={value!r}'
+                            for field, position, value in violations[:10])
+        more = len(violations) - 10
+        super().__init__(f'{len(violations)} values of {record_type_name} '
+                         f'do not match the schema: {details}'
+                         + (f' and {more} more' if more > 0 else ''))
+
+
+class Schema:
+    """The kind of each field of a record set: `kinds` maps each field to
+    one of the keys of KIND_TYPES, or to EMPTY or MIXED, and `nullable` is
+    the set of fields that have blanks (None)."""
+    def __init__(self, kinds, nullable=()):
+        self.kinds = dict(kinds)
+        self.nullable = frozenset(nullable)
+
+    def __eq__(self, other):
+        if isinstance(other, Schema):
+            return (self.kinds, self.nullable) == (other.kinds,
+                                                   other.nullable)
+        return NotImplemented
+
+    def __repr__(self):
+        kinds = ', '.join(f'{field}={kind}'
+                          + ('?' if field in self.nullable else '')
+                          for field, kind in self.kinds.items())
+        return f'{self.__class__.__name__}({kinds})'
+
+    @property
+    def summable_fields(self):
+        """Return the tuple of fields whose values can be summed."""
+        return tuple(field for field, kind in self.kinds.items()
+                     if kind in SUMMABLE_KINDS)
+
+
+def infer_schema(fields, column, declared=None, record_type_name=None,
+                 type_sets=None):
+    """Return the Schema of the values of `fields`, where `column(i)` returns
+    an iterable of the values of the field at index `i`. Each column is
+    read once, unless `type_sets`, the set of the types of the values of
+    each field, is given. `declared`, a dict, may give the kind of some of
+    the fields; values that do not match it raise SchemaError, which lists
+    all of them."""
+    if type_sets is None:
+        type_sets = [set(map(type, column(i))) for i in range(len(fields))]
+    schema = schema_from_types(fields, type_sets)
+    violations = []
+    for field, kind in (declared or {}).items():
+        assert kind in KIND_TYPES, kind
+        if schema.kinds[field] not in (kind, EMPTY):
+            violations.extend(find_violations(
+                field, column(fields.index(field)), KIND_TYPES[kind]
+            ))
+        schema.kinds[field] = kind
+    if violations:
+        raise SchemaError(record_type_name, violations)
+    return schema
+
+
+def schema_from_types(fields, type_sets):
+    """Return the Schema given the set of the types of the values of each of
+    `fields`."""
+    kinds = {}
+    nullable = set()
+    for field, types in zip(fields, type_sets):
+        if NONE_TYPE in types:
+            nullable.add(field)
+            types = types - {NONE_TYPE}
+        kinds[field] = kind_of_types(types)
+    return Schema(kinds, nullable)
+
+
+def kind_of_types(types):
+    """Return the kind of a column whose values (other than None) have
+    `types`."""
+    if not types:
+        return EMPTY
+    for kind in (BOOLEAN, NUMERIC, TEXT, DATE):
+        if all(issubclass(t, KIND_TYPES[kind]) for t in types):
+            return kind
+    return MIXED
+
+
+def merge_schemas(schemas):
+    """Return the Schema of the concatenation of record sets with the same
+    fields and `schemas`."""
+    schemas = list(schemas)
+    kinds = {}
+    for schema in schemas:
+        for field, kind in schema.kinds.items():
+            kinds[field] = merge_kinds(kinds.get(field, EMPTY), kind)
+    nullable = set().union(*(schema.nullable for schema in schemas))
+    return Schema(kinds, nullable)
+
+
+def merge_kinds(kind_1, kind_2):
+    if kind_1 == kind_2 or kind_2 == EMPTY:
+        return kind_1
+    if kind_1 == EMPTY:
+        return kind_2
+    if {kind_1, kind_2} == {NUMERIC, BOOLEAN}:
+        return NUMERIC
+    return MIXED
+
+
+def find_violations(field, values, value_types):
+    """Return a (field, position, value) tuple for each value that is not
+    None and not an instance of `value_types`."""
+    return [(field, position, value) for position, value in enumerate(values)
+            if value is not None and not isinstance(value, value_types)]
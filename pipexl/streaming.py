@@ -0,0 +1,143 @@
+"""Code for processing records one at a time with bounded memory."""
+
+from numbers import Number
+
+from .recordset import (RecordSet, iter_valid_tuples, make_record_class,
+                        sum_by_layout)
+from .schema import KIND_TYPES, SUMMABLE_KINDS, SchemaError
+
+
+class RecordStream:
+    """A single-pass iterable of records that are all of the same type.
+    Records are handed to the consumer as they are produced and are not kept.
+    While iterating, `grand_total` and the subtotals for each key tuple in
+    `sum_by` are accumulated, so they are complete once the stream has been
+    exhausted. The constructor is like that of `RecordSet`."""
+    def __init__(self, record_type_name, fields, tuple_iter,
+                 normalize_fields=(), filters=None, sum_by=(),
+                 normalizers=None, schema=None):
+        """`sum_by` is a sequence of tuples of key fields. The corresponding
+        subtotals are available from `subtotals`. `schema`, a dict, may
+        declare the kinds of some fields, as for `RecordSet`: fields of
+        summable kinds are summed, and fields of other kinds are not. Values
+        that do not match their declared kind are skipped and raise
+        SchemaError, listing all of them, once the stream is exhausted.
+        Other fields are summed as long as their values are numbers."""
+        self.source = None
+        self.fields = fields
+        self.normalize_fields = normalize_fields
+        self.record_class = make_record_class(record_type_name, self.fields)
+        self.record_count = 0
+        self._tuple_iter = iter_valid_tuples(tuple_iter, fields,
+                                             normalize_fields, filters,
+                                             normalizers=normalizers)
+        schema = schema or {}
+        assert all(kind in KIND_TYPES for kind in schema.values()), schema
+        # (index, value types, violations) for each declared field
+        checks = [(fields.index(field), KIND_TYPES[kind], [])
+                  for field, kind in schema.items()]
+        self._checks = tuple(checks)
+        summable = [kind in SUMMABLE_KINDS for kind in schema.values()]
+        self._declared = tuple(check for check, is_summable
+                               in zip(checks, summable) if is_summable)
+        self._checked = tuple(check for check, is_summable
+                              in zip(checks, summable) if not is_summable)
+        self._summable = tuple(i for i, field in enumerate(fields)
+                               if field not in schema)  # Checked by value
+        self._totals = [0] * len(fields)
+        self._accumulators = {
+            tuple(key_fields): (tuple(fields.index(f) for f in key_fields),
+                                {})
+            for key_fields in sum_by
+        }
+
+    def __iter__(self):
+        record_class = self.record_class
+        for values in self._tuple_iter:
+            self.accumulate(values)
+            yield record_class._make(values)
+        self.check_schema()
+
+    def consume(self):
+        """Exhaust the stream, discarding the records. Return self."""
+        for values in self._tuple_iter:
+            self.accumulate(values)
+        self.check_schema()
+        return self
+
+    def check_schema(self):
+        """Raise SchemaError if any value produced so far does not match
+        the declared kind of its field."""
+        violations = [violation for _, _, field_violations in self._checks
+                      for violation in field_violations]
+        if violations:
+            raise SchemaError(self.record_class.__name__, violations)
+
+    def accumulate(self, values):
+        """Add one tuple of values to the totals."""
+        self.record_count += 1
+        totals = self._totals
+        accumulators = []
+        for key_indexes, subtotals in self._accumulators.values():
+            key = tuple(values[i] for i in key_indexes)
+            accumulator = subtotals.get(key)
+            if accumulator is None:
+                accumulator = subtotals[key] = [0] * len(values)
+            accumulators.append(accumulator)
+        for i, value_types, violations in self._declared:
+            value = values[i]
+            if value is None:
+                continue
+            if not isinstance(value, value_types):
+                violations.append((self.fields[i], self.record_count - 1,
+                                   value))
+                continue
+            totals[i] += value
+            for accumulator in accumulators:
+                accumulator[i] += value
+        for i, value_types, violations in self._checked:
+            value = values[i]
+            if value is not None and not isinstance(value, value_types):
+                violations.append((self.fields[i], self.record_count - 1,
+                                   value))
+        for i in self._summable:
+            value = values[i]
+            if value is None:
+                continue
+            if isinstance(value, Number):
+                totals[i] += value
+                for accumulator in accumulators:
+                    accumulator[i] += value
+            else:  # This column is not summable.
+                self._summable = tuple(j for j in self._summable if j != i)
+
+    @property
+    def grand_total(self):
+        """Return the grand total record of the records produced so far."""
+        grand_total_class = make_record_class(
+            self.record_class.__name__ + '_grand_total',
+            [self.fields[i] for i in self.summed_indexes]
+        )
+        return grand_total_class(*(self._totals[i]
+                                   for i in self.summed_indexes))
+
+    @property
+    def summed_indexes(self):
+        """Return the indexes of the fields that are summed, in order."""
+        return sorted([i for i, _, _ in self._declared] +
+                      list(self._summable))
+
+    def subtotals(self, *key_fields):
+        """Return the subtotals of the records produced so far, as a
+        RecordSet equal to the result of `RecordSet.sum_by(*key_fields)`.
+        `key_fields` must be one of the tuples passed as `sum_by`."""
+        key_indexes, subtotals = self._accumulators[key_fields]
+        result_class_name, fields, summed_fields = sum_by_layout(
+            self.record_class.__name__,
+            [self.fields[i] for i in self.summed_indexes],
+            key_fields
+        )
+        summed_indexes = [self.fields.index(f) for f in summed_fields]
+        tuples = sorted(key + tuple(sums[i] for i in summed_indexes)
+                        for key, sums in subtotals.items())
+        return RecordSet(result_class_name, fields, tuples)
@@ -1,6 +1,29 @@
 """Low-level utilities or primitives."""
 
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+import gc
+from operator import itemgetter
 import re
+from types import BuiltinFunctionType, CodeType, FunctionType, ModuleType
+
+NAME_FIXES = tuple((re.compile(pattern), replacement)
+                   for pattern, replacement in (
+                       (r'/', '_per_'),
+                       (r'%', '_pct_'),
+                       (r'\W', '_'),
+                       (r'_+$', ''),
+                       (r'__+', '_'),
+                   ))
+IS_PREFIX = re.compile(r'is[_\W]')
+DATE_FORMAT_FIXES = re.compile(r'(%.)|\W')  # Directives are kept
+NORMALIZE_CACHE_SIZE = 2**16  # Raw strings whose normalized names are kept
+STABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, date,
+                datetime, time, timedelta)
+BUILTIN_TYPES = (BuiltinFunctionType, type(str.upper),  # Method descriptor
+                 type(object.__init__), type)  # Wrapper descriptor
+PATTERN_TYPE = type(re.compile(''))  # re.Pattern needs Python 3.7
 
 
 def camel_to_snake(name):
@@ -10,20 +33,138 @@ def camel_to_snake(name):
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', sub_1).lower()
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_name(field_name):
-    """lowercase with underscores, etc"""
-    fixes = (
-        (r'/', '_per_'),
-        (r'%', '_pct_'),
-        (r'\W', '_'),
-        (r'_+$', ''),
-        (r'__+', '_'),
-    )
+    """lowercase with underscores, etc. Results are cached, keyed on the raw
+    string."""
     result = field_name.strip().lower() or None
     if result:
         if result.endswith('?'):
-            if not re.match(r'is[_\W]', result):
+            if not IS_PREFIX.match(result):
                 result = 'is_' + result
-        for pattern, replacement in fixes:
-            result = re.sub(pattern, replacement, result)
+        for pattern, replacement in NAME_FIXES:
+            result = pattern.sub(replacement, result)
+    return result
+
+
+def tuple_getter(indexes):
+    """Return a function that picks the items at `indexes` out of a sequence
+    and returns them as a tuple."""
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda values: (values[index],)
+    if not indexes:
+        return lambda values: ()
+    return itemgetter(*indexes)
+
+
+def function_signature(function):
+    """Return a value that identifies `function` and changes when its code
+    changes, or when the constants, defaults, closure variables or globals
+    that it uses change, so that it is the same in every run. Return None if
+    `function` is None. Raise TypeError if the function uses a value that
+    has no such signature (see `value_signature`)."""
+    if function is None:
+        return None
+    return value_signature(function, set())
+
+
+def value_signature(value, seen):
+    """Return a value to stand for `value` in `function_signature`, or raise
+    TypeError. Plain values and containers of them stand for themselves;
+    functions stand for their code and the values they use; modules,
+    classes and builtin functions stand for their names; and objects with a
+    `signature_value` method, such as `FieldConditions`, stand for the value
+    it returns. `seen` holds the ids of the functions being visited, to stop
+    at recursion."""
+    if isinstance(value, STABLE_TYPES):
+        return value
+    if isinstance(value, (tuple, list)):
+        return tuple(value_signature(item, seen) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((value_signature(item, seen) for item in value),
+                            key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted(((value_signature(k, seen),
+                              value_signature(v, seen))
+                             for k, v in value.items()), key=repr))
+    if isinstance(value, PATTERN_TYPE):
+        return ('re', value.pattern, value.flags)
+    if isinstance(value, CodeType):
+        return ('code', value.co_code, value.co_names,
+                value_signature(value.co_consts, seen))
+    if isinstance(value, ModuleType):
+        return ('module', value.__name__)
+    if isinstance(value, BUILTIN_TYPES):
+        return ('builtin', getattr(value, '__module__', None),
+                value.__qualname__)
+    if hasattr(value, 'signature_value'):
+        return value_signature(value.signature_value(), seen)
+    if hasattr(value, '__wrapped__'):  # Such as an lru_cache wrapper
+        return value_signature(value.__wrapped__, seen)
+    if not isinstance(value, FunctionType):
+        raise TypeError(f'no stable signature for {value!r}')
+    if id(value) in seen:
+        return ('recursive', value.__qualname__)
+    seen = seen | {id(value)}
+    code = value.__code__
+    global_names = code_names(code) & set(value.__globals__)
+    return (
+        value.__qualname__,
+        value_signature(code, seen),
+        value_signature(value.__defaults__, seen),
+        value_signature(value.__kwdefaults__, seen),
+        tuple(value_signature(cell.cell_contents, seen)
+              for cell in value.__closure__ or ()),
+        tuple((name, value_signature(value.__globals__[name], seen))
+              for name in sorted(global_names)),
+    )
+
+
+def code_names(code):
+    """Return the set of the names used by `code` and the code nested in it,
+    which include the globals it reads."""
+    result = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            result |= code_names(const)
     return result
+
+
+def convert_date(value, datetime_format):
+    """If value has strftime (date or datetime), convert to string using
+    strftime format. Otherwise return value unchanged."""
+    if hasattr(value, 'strftime'):
+        value = value.strftime(datetime_format)
+    return value
+
+
+def date_field_name(value, datetime_format):
+    """Return the field name that a header cell holding `value` gets: dates
+    are converted by `convert_date`, then `normalize_name` applies."""
+    return normalize_name(str(convert_date(value, datetime_format)))
+
+
+def parse_date_field(field_name, datetime_format):
+    """Return the datetime whose `date_field_name` is `field_name`, or
+    `field_name` itself if there is none."""
+    field_format = DATE_FORMAT_FIXES.sub(lambda match: match.group(1) or '_',
+                                         datetime_format)
+    try:
+        return datetime.strptime(field_name, field_format)
+    except ValueError:
+        return field_name
+
+
+@contextmanager
+def gc_paused():
+    """Disable the cyclic garbage collector while building many tuples of
+    values, which cannot form cycles but trigger repeated collections that
+    each scan every object built so far."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -1,79 +1,663 @@
 """Code for extracting RecordSet objects from Excel worksheets."""
 
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import os
 from pathlib import Path
 import re
+from time import perf_counter, sleep
+from zipfile import BadZipFile
 
 from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
 
-from .recordset import RecordSet
-from .util import camel_to_snake, normalize_name
+from .cache import workbook_signature
+from .instrument import HOOKS, emit, timed
+from .layout import restore_position, row_range
+from .parallel import aload_models
+from .partitioned import PartitionedRecordSet
+from .recordset import FieldConditions, Query, RecordSet
+from .streaming import RecordStream
+from .util import (camel_to_snake, convert_date, function_signature,
+                   normalize_name, tuple_getter)
+from .xmlreader import XmlReader
+
+
+class OpenpyxlReader:
+    """Reads worksheets using openpyxl in read-only mode. A reader provides
+    `iter_rows(worksheet_name)`, which generates a tuple of values for every
+    row starting with row 1, and `close()`."""
+    def __init__(self, workbook_path):
+        self.workbook = load_workbook(workbook_path,
+                                      read_only=True,
+                                      data_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.workbook.close()
+
+    def iter_rows(self, worksheet_name, min_row=1, max_row=None):
+        """Generate a tuple of values for every row of the worksheet from
+        `min_row` to `max_row` (by default the last)."""
+        return self.workbook[worksheet_name].iter_rows(
+            min_row=min_row, max_row=max_row, values_only=True
+        )
 
 
 class InputWorkbookModel:
     """Encapsulates a list of InputTable subclasses with a naming
     pattern for the workbook. Subclasses should nest subclasses of `InputTable`
-    and define the classes attribute `name_pattern` as a glob."""
+    and define the classes attribute `name_pattern` as a glob. Subclasses may
+    set `cache` to a `TableCache` to reuse tables loaded by earlier runs, and
+    `reader_class` to choose how worksheets are read (for example,
+    `XmlReader`).
+
+    If a subclass sets `lazy` to True, each table is loaded on first access
+    instead of in `__init__`. The workbook stays open between loads until
+    `close()` is called, or the model is used as a context manager.
+
+    If a subclass sets `max_workers` greater than 1, worksheets are parsed in
+    parallel by a pool of that many processes. See also `load_models`.
+
+    If a subclass sets `partitioned` to True, every workbook matching
+    `name_pattern` is loaded, not just the highest, and each table becomes a
+    `PartitionedRecordSet` with one partition per workbook. The workbooks
+    must share the same layout. With `max_workers` greater than 1, each
+    workbook is loaded in a separate process.
+
+    Subclasses may set `layout_index` to a `LayoutIndex` to remember where
+    the tables are, so that later loads read only the rows holding them.
+
+    A long-running process can call `reload`, or iterate over `watch`, to
+    pick up new or changed workbooks: only the tables whose worksheets
+    changed are read again."""
     name_pattern = None  # subclasses should override
+    cache = None
+    layout_index = None
+    reader_class = OpenpyxlReader
+    lazy = False
+    max_workers = 1
+    partitioned = False
+    _reader = None  # Open reader of a lazy model
+    _reader_signature = None  # Signature of the workbook it has open
+    _serial = False  # Whether the model is being built in a worker process
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for table_class in cls.table_classes():
+            setattr(cls, table_class.default_name(), LazyTable(table_class))
 
     def __init__(self, config=None):
         """The `config` parameter should contain a key matching
         `self.__class__.__name__` with the directory path to search for the
         workbook."""
-        assert self.name_pattern
-        config = config or {}
-        directory_path = Path(config.get(self.__class__.__name__, '.'))
-        hits = sorted(directory_path.glob(self.name_pattern))
+        hits = self.find_workbooks(config)
+        self.workbook_path = hits[-1]  # taking the highest as most recent
+        if self.partitioned:
+            self.workbook_paths = hits
+        if self.lazy:
+            return  # LazyTable loads each table on first access.
+        for name, data in self.load_table_classes(
+                self.table_classes()).items():
+            setattr(self, name, data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the workbook if a lazy model left it open. Tables accessed
+        later reopen it."""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    @classmethod
+    def build_in_worker(cls, config=None):
+        """Return a new instance built from `config` in a worker process of
+        `load_models`, reading its worksheets and workbooks one after
+        another instead of starting a pool of its own."""
+        model = cls.__new__(cls)
+        model._serial = True
+        model.__init__(config)
+        del model._serial  # Later loads are in the process it returns to.
+        return model
+
+    @classmethod
+    async def aload(cls, config=None, executor=None, timeout=None):
+        """Return a new instance built from `config` by `executor` (by
+        default the event loop's default executor) without blocking the event
+        loop. Raise `asyncio.TimeoutError` if building takes more than
+        `timeout` seconds. See `aload_models`."""
+        models = await aload_models([cls], config, executor, timeout=timeout)
+        return models[0]
+
+    @classmethod
+    def find_workbooks(cls, config=None):
+        """Return the sorted list of the paths of the workbooks matching
+        `name_pattern` in the directory given by `config` (see
+        `__init__`)."""
+        hits = cls.glob_workbooks(config)
         assert hits
-        hit = hits[-1]  # taking the highest as most recent
-        table_classes = [v for v in self.__class__.__dict__.values()
-                         if isinstance(v, type) and issubclass(v, InputTable)]
-        self.workbook_path = str(hit)
-        workbook = load_workbook(self.workbook_path,
-                                 read_only=True,
-                                 data_only=True)
-        for table_class in table_classes:
-            table = table_class()
-            setattr(self, table.name, table.load(workbook))
-        workbook.close()
+        return hits
+
+    @classmethod
+    def glob_workbooks(cls, config=None):
+        """Return the sorted list of the paths of the workbooks matching
+        `name_pattern`, as for `find_workbooks`, which may be empty."""
+        assert cls.name_pattern
+        config = config or {}
+        directory_path = Path(config.get(cls.__name__, '.'))
+        return [str(hit)
+                for hit in sorted(directory_path.glob(cls.name_pattern))]
+
+    @classmethod
+    def describe(cls, config=None):
+        """Return a list of dicts describing where each table is in the
+        workbook that would be loaded (every matching workbook if
+        `partitioned`), without loading any records. Uses and updates
+        `layout_index` if it is set."""
+        hits = cls.find_workbooks(config)
+        result = []
+        for workbook_path in hits if cls.partitioned else hits[-1:]:
+            tables = [table_class() for table_class in cls.table_classes()]
+            layout = (cls.layout_index.get(workbook_path)
+                      if cls.layout_index else {})
+            missing = [table for table in tables
+                       if not restore_position(layout, table)]
+            if missing:
+                with cls.reader_class(workbook_path) as reader:
+                    for worksheet_name, sheet_tables in group_by_worksheet(
+                            missing).items():
+                        locate_tables(reader.iter_rows(worksheet_name),
+                                      sheet_tables)
+                if cls.layout_index:
+                    cls.layout_index.update(workbook_path, missing)
+            result.extend(table.describe(workbook_path) for table in tables)
+        return result
+
+    @classmethod
+    def table_classes(cls):
+        """Return the list of InputTable subclasses nested in this class."""
+        result = []
+        for value in cls.__dict__.values():
+            if isinstance(value, LazyTable):
+                value = value.table_class
+            if isinstance(value, type) and issubclass(value, InputTable):
+                if value not in result:
+                    result.append(value)
+        return result
+
+    def load_table_classes(self, table_classes):
+        """Return a dict mapping the name of each table in `table_classes` to
+        its RecordSet, or to a PartitionedRecordSet if the model is
+        partitioned."""
+        if not self.partitioned:
+            tables = [table_class() for table_class in table_classes]
+            return {table.name: data
+                    for table, data in self.load_tables(tables).items()}
+        partitions = self.load_partitions(table_classes)
+        return {
+            record_sets[0].source.name: PartitionedRecordSet(
+                record_sets, self.workbook_paths
+            )
+            for record_sets in zip(*partitions)
+        }
+
+    def query(self, table_name):
+        """Return a `Query` of the table named `table_name`. On a lazy model,
+        a table that has not been loaded yet is loaded by the query itself,
+        with the leading conditions and projection of the query pushed into
+        the reading of rows, and the result is not kept on the model."""
+        if (self.lazy and not self.partitioned
+                and table_name not in vars(self)):
+            table_class = getattr(self.__class__, table_name)
+            return Query(TableSource(self, table_class))
+        return Query(getattr(self, table_name))
+
+    def reload(self, config=None):
+        """Find the workbooks matching `name_pattern` again and read again
+        the loaded tables whose worksheets changed. A table is unchanged if
+        the mtime and size of its workbook are, or else if its worksheet has
+        the same signature (see `XmlReader.worksheet_signatures`), even in a
+        new workbook. The new RecordSets, or PartitionedRecordSets with the
+        unchanged partitions reused, are swapped in together once all of
+        them have loaded, so a failed reload leaves the model as it was.
+        Tables of a lazy model that have not been loaded yet are loaded from
+        the new workbook on first access. Return the list of the names of
+        the tables read again."""
+        start = perf_counter()
+        hits = self.find_workbooks(config)
+        signatures = {}  # Cache for table_changed
+        if self.partitioned:
+            updates = self.reload_partitions(hits, signatures)
+            names = list(updates)
+            updates['workbook_paths'] = hits
+        else:
+            workbook_path = hits[-1]
+            tables = [table_class() for table_class, data in self.loaded()
+                      if table_changed(data.source, workbook_path, signatures)]
+            record_sets = (self.load_workbook_tables(
+                workbook_path, tables, serial=self._serial
+            ) if tables else {})
+            updates = {table.name: data
+                       for table, data in record_sets.items()}
+            names = list(updates)
+            if (self._reader is not None and self._reader_signature
+                    != workbook_signature(workbook_path)):
+                self.close()
+        updates['workbook_path'] = hits[-1]
+        vars(self).update(updates)
+        if HOOKS:
+            emit('model_reloaded', model=self.__class__.__name__,
+                 tables=names, seconds=perf_counter() - start)
+        return names
+
+    def watch(self, config=None, interval=5):
+        """Poll the workbooks matching `name_pattern` every `interval`
+        seconds and generate the list of the names of the tables read again
+        each time `reload` finds changes. Workbooks are only read once their
+        mtimes and sizes have not changed for one interval, so that files
+        still being copied in are left alone. While no workbook matches,
+        for example while one is being replaced, the model is left as it
+        is."""
+        previous = reloaded = None
+        while True:
+            current = []
+            for path in self.glob_workbooks(config):
+                try:
+                    current.append(workbook_signature(path))
+                except FileNotFoundError:  # Removed since the glob
+                    pass
+            if current and current == previous and current != reloaded:
+                try:
+                    names = self.reload(config)
+                except FileNotFoundError:  # Removed since the last poll
+                    names = None
+                else:
+                    reloaded = current
+                if names:
+                    yield names
+            previous = current
+            sleep(interval)
+
+    def loaded(self):
+        """Return a list of (table class, data) for each table of the model
+        that has been loaded, which is every table unless the model is
+        lazy."""
+        result = []
+        for table_class in self.table_classes():
+            data = vars(self).get(table_class().name)
+            if data is not None:
+                result.append((table_class, data))
+        return result
+
+    def reload_partitions(self, hits, signatures):
+        """Return a dict mapping the name of each loaded table that has
+        changed to a new PartitionedRecordSet of the workbooks `hits`, for
+        `reload`."""
+        loaded = self.loaded()
+        partitions = {}  # (table class, path) -> RecordSet
+        missing = defaultdict(list)  # path -> table classes to load
+        for table_class, data in loaded:
+            old = dict(zip(data.partition_names, data.partitions))
+            for path in hits:
+                if path not in old or table_changed(old[path].source, path,
+                                                    signatures):
+                    missing[path].append(table_class)
+                else:
+                    partitions[table_class, path] = old[path]
+        for path, table_classes in missing.items():
+            partitions.update(zip(
+                ((table_class, path) for table_class in table_classes),
+                self.load_partition(path, table_classes, self._serial)
+            ))
+        return {
+            table_class().name: PartitionedRecordSet(
+                [partitions[table_class, path] for path in hits], hits
+            )
+            for table_class, data in loaded
+            if data.partition_names != hits
+            or any(table_class in missing.get(path, ()) for path in hits)
+        }
+
+    def load_partitions(self, table_classes):
+        """Load `table_classes` from every workbook in `workbook_paths`, in
+        parallel if `max_workers` is greater than 1. Return a list with the
+        list of RecordSets for each workbook."""
+        paths = self.workbook_paths
+        if self.max_workers > 1 and len(paths) > 1 and not self._serial:
+            with ProcessPoolExecutor(self.max_workers) as executor:
+                futures = [executor.submit(self.__class__.load_partition,
+                                           path, table_classes, True)
+                           for path in paths]
+                return [future.result() for future in futures]
+        return [self.load_partition(path, table_classes, self._serial)
+                for path in paths]
+
+    @classmethod
+    def load_partition(cls, workbook_path, table_classes, serial=False):
+        """Load `table_classes` from one workbook. Return the list of
+        RecordSets in the same order. If `serial`, as in a worker process,
+        the worksheets are read one after another."""
+        tables = [table_class() for table_class in table_classes]
+        record_sets = cls.load_workbook_tables(workbook_path, tables,
+                                               serial=serial)
+        return [record_sets[table] for table in tables]
+
+    def load_tables(self, tables):
+        """Return a dict mapping each of `tables` to its RecordSet, loaded
+        from `workbook_path`."""
+        open_reader = self.open_reader if self.lazy else None
+        return self.load_workbook_tables(self.workbook_path, tables,
+                                         open_reader, self._serial)
+
+    def open_reader(self):
+        """Return the reader kept open by a lazy model, opening it if
+        needed."""
+        if self._reader is None:
+            self._reader_signature = workbook_signature(self.workbook_path)
+            self._reader = self.reader_class(self.workbook_path)
+        return self._reader
+
+    @classmethod
+    def load_workbook_tables(cls, workbook_path, tables, open_reader=None,
+                             serial=False):
+        """Return a dict mapping each of `tables` to its RecordSet, using the
+        cache when possible. If given, `open_reader` is called to get an open
+        reader for the workbook. See `read_tables` for `serial`."""
+        start = perf_counter()
+        signature, sheet_signatures = workbook_signatures(workbook_path)
+        layout = (cls.layout_index.get(workbook_path)
+                  if cls.layout_index else {})
+        record_sets = {}
+        if cls.cache:
+            for table in tables:
+                data = cls.cache.get(workbook_path, table)
+                if data is not None:
+                    record_sets[table] = data
+        missing = [table for table in tables if table not in record_sets]
+        if missing:
+            if open_reader:
+                loaded = read_workbook_tables(open_reader(), missing, layout)
+            else:
+                loaded = cls.read_tables(workbook_path, missing, layout,
+                                         serial)
+            if cls.layout_index:
+                cls.layout_index.update(workbook_path, missing)
+            if cls.cache:
+                for table, data in loaded.items():
+                    cls.cache.put(workbook_path, table, data)
+            record_sets.update(loaded)
+        if HOOKS:
+            emit('workbook_loaded', workbook=str(workbook_path),
+                 tables=[table.name for table in tables],
+                 cached=[table.name for table in tables
+                         if table not in missing],
+                 bytes_read=os.path.getsize(workbook_path) if missing else 0,
+                 seconds=perf_counter() - start)
+        for table in tables:
+            table.workbook_signature = signature
+            table.sheet_signature = sheet_signatures.get(table.worksheet_name)
+        return {table: record_sets[table] for table in tables}
+
+    @classmethod
+    def read_tables(cls, workbook_path, tables, layout=None, serial=False):
+        """Read `tables` from the workbook, using the `layout` of the workbook
+        from a LayoutIndex if given. Return a dict mapping each table to its
+        RecordSet. The worksheets are read in parallel if `max_workers` is
+        greater than 1, unless `serial`, which workers set so as not to
+        start a pool of their own."""
+        groups = group_by_worksheet(tables)
+        if cls.max_workers > 1 and len(groups) > 1 and not serial:
+            return cls.read_tables_in_parallel(workbook_path, groups, layout)
+        with cls.reader_class(workbook_path) as reader:
+            return read_workbook_tables(reader, tables, layout)
+
+    @classmethod
+    def read_tables_in_parallel(cls, workbook_path, groups, layout=None):
+        """Read each group of tables from `groups`, a dict mapping worksheet
+        names to lists of tables, in a separate process. Return a dict mapping
+        each table to its RecordSet."""
+        result = {}
+        with ProcessPoolExecutor(cls.max_workers) as executor:
+            futures = [
+                (sheet_tables, executor.submit(read_worksheet_tables,
+                                               cls.reader_class,
+                                               workbook_path,
+                                               worksheet_name,
+                                               sheet_tables,
+                                               layout))
+                for worksheet_name, sheet_tables in groups.items()
+            ]
+            for sheet_tables, future in futures:
+                for table, data in zip(sheet_tables, future.result()):
+                    # data.source is the copy of table used by the worker.
+                    table.__dict__.update(data.source.__dict__)
+                    data.source = table
+                    result[table] = data
+        return result
+
+
+class LazyTable:
+    """Descriptor installed on InputWorkbookModel subclasses under the name of
+    each nested table. On first access from a lazy model, loads the RecordSet
+    and stores it on the instance, which hides the descriptor afterwards.
+    Access from the class returns the InputTable subclass."""
+    def __init__(self, table_class):
+        self.table_class = table_class
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.table_class
+        for name, data in instance.load_table_classes(
+                [self.table_class]).items():
+            setattr(instance, name, data)
+        return data
+
+
+class TableSource:
+    """The source of a `Query` of a table of a lazy model that has not been
+    loaded yet."""
+    def __init__(self, model, table_class):
+        self.model = model
+        self.table_class = table_class
+
+    def load_steps(self, steps):
+        """Load the table, applying the leading `steps` of a query while rows
+        are read where possible: `select` steps become `required_fields` and
+        `where` conditions become the `predicate`. Conditions on normalized
+        fields, which the predicate would see before normalization, and
+        `where` steps with a predicate of records are not pushed down, nor is
+        anything after them. Return the RecordSet and the remaining steps."""
+        table = self.table_class()
+        conditions = {}
+        fields = None
+        pushed = 0
+        for step in steps:
+            if step[0] == 'select':
+                fields = step[1]
+            elif (step[2] is None and table.predicate is None
+                  and not set(step[1].fields) & (
+                      set(conditions) | set(table.normalize_fields))
+                  and (fields is None
+                       or set(step[1].fields) <= set(fields))):
+                conditions.update(step[1].conditions)
+            else:
+                break
+            pushed += 1
+        remaining = steps[pushed:]
+        if conditions:
+            table.predicate = FieldConditions(conditions)
+            table.predicate_fields = tuple(conditions)
+        if fields is not None:
+            # Fields that are normalized or interned must be loaded.
+            extra = tuple(field for field in (tuple(table.normalize_fields)
+                                              + tuple(table.intern_fields))
+                          if field not in fields)
+            table.required_fields = tuple(fields) + tuple(dict.fromkeys(extra))
+            if extra:
+                remaining = (('select', fields),) + remaining
+        return self.model.load_tables([table])[table], remaining
 
 
 class InputTable:
     """A table in a worksheet. Subclasses should override class attributes
     `name`, `worksheet_name`, `table_marker`, and `normalize_fields` (list).
-    Optional class attributes include `filters` and `header_date_format`."""
-    name = worksheet_name = table_marker = filters = None
-    normalize_fields = ()
+    Optional class attributes include `filters`, `header_date_format`,
+    `record_set_class` (for example, `ColumnarRecordSet` for large tables),
+    and `intern_fields`, fields such as keys whose repeated strings should
+    share one object. Values of `normalize_fields` are normalized by
+    `normalize_name` unless `normalizers`, a dict, maps the field to another
+    function of one value. `schema`, a dict, may declare the kind of some
+    fields, such as 'numeric' or 'text' (see `infer_schema`); values of
+    another kind raise SchemaError, listing all of them, when the table is
+    loaded.
+
+    To load only some of the columns, set `required_fields` to the tuple of
+    fields to keep. To keep only some of the rows, set `predicate` to a
+    staticmethod that is called with the values of `predicate_fields` and
+    returns True for rows to keep. Filters and the predicate may use any
+    column and are checked against the raw row values before any record is
+    built."""
+    name = worksheet_name = table_marker = filters = normalizers = None
+    schema = None
+    required_fields = predicate = None
+    normalize_fields = predicate_fields = intern_fields = ()
     header_date_format = '%b-%y'  # Jul-18 -> jul_18
+    record_set_class = RecordSet
 
     def __init__(self):
         if not self.name:
-            name = camel_to_snake(self.__class__.__name__)
-            name = re.sub(r'^table_', '', name)
-            name = re.sub(r'_table$', '', name)
-            self.name = name + '_table'
+            self.name = self.default_name()
         assert self.worksheet_name
         assert self.table_marker
         self.start_row = self.start_col = self.stop_col = None
+        self.end_row = self.header_fields = self.filtered_rows = None
+        # Set when the table is loaded from a workbook, for reloading
+        self.workbook_signature = self.sheet_signature = None
 
     def load(self, workbook):
         """Load the data into a RecordSet. Set the source attribute of the
-        result to self. Update start_row, start_col, and stop_col."""
-        worksheet = workbook[self.worksheet_name]
-        row_iter = worksheet.rows
-        # Find cell with table marker.
-        cell = None
-        for row in row_iter:
-            # Find first non-blank cell in this row.
-            for cell in row:
-                if cell.value:
-                    break
-            if cell.value == self.table_marker:
+        result to self. Update start_row, start_col, and stop_col. The
+        `workbook` may be an openpyxl workbook or a reader such as
+        `XmlReader`."""
+        return load_worksheet_tables(self.iter_rows(workbook), [self])[self]
+
+    def stream(self, workbook, sum_by=()):
+        """Return a RecordStream of the data that reads rows from `workbook`
+        (as for `load`) only as the stream is consumed, so that memory use
+        does not grow with the size of the table. Totals for `sum_by` are
+        accumulated along the way. The workbook must stay open until the
+        stream is exhausted."""
+        row_iter = iter(self.iter_rows(workbook))
+        marker = None
+        for row_number, row in enumerate(row_iter, 1):
+            col = first_non_blank(row)
+            if col is not None and row[col] == self.table_marker:
+                marker = row_number, col
                 break
-        assert cell and cell.value == self.table_marker, cell
-        self.start_row = cell.row + 1  # Row of first record
-        # Load header.
-        self.start_col = cell.column - 1
-        raw_header = [n.value for n in next(row_iter)[self.start_col:]]
+        assert marker, self.table_marker
+        fields = self.read_header(*marker, next(row_iter))
+        selected = map(self.select_values,
+                       iter_tuples(row_iter, self.start_col, self.stop_col))
+        data = RecordStream(
+            self.name, fields,
+            (values for values in selected if values is not None),
+            self.normalize_fields,
+            sum_by=sum_by,
+            normalizers=self.normalizers,
+            schema=self.declared_schema(fields)
+        )
+        data.source = self
+        return data
+
+    def iter_rows(self, workbook):
+        """Return an iterator of the row value tuples of this table's
+        worksheet in `workbook`, an openpyxl workbook or a reader."""
+        if hasattr(workbook, 'iter_rows'):  # a reader
+            return workbook.iter_rows(self.worksheet_name)
+        return workbook[self.worksheet_name].iter_rows(values_only=True)
+
+    def describe(self, workbook_path):
+        """Return a dict describing where the table was found in the
+        workbook: the rows of its marker, header, and end of data (None if
+        the data runs to the end of the worksheet), its columns as letters,
+        and its header fields."""
+        marker_row = self.start_row - 1
+        return dict(
+            workbook=str(workbook_path), table=self.name,
+            worksheet=self.worksheet_name, table_marker=self.table_marker,
+            marker_row=marker_row, header_row=marker_row + 1,
+            end_row=self.end_row,
+            columns=(get_column_letter(self.start_col + 1)
+                     + ':' + get_column_letter(self.stop_col)),
+            header_fields=self.header_fields,
+        )
+
+    def sheet_rows(self, positions):
+        """Return the worksheet row of the record at each of `positions` in
+        the loaded RecordSet, allowing for the rows dropped by `filters` or
+        `predicate`, which are listed in `filtered_rows`."""
+        filtered = self.filtered_rows
+        rows = {}
+        skipped = 0
+        for position in sorted(set(positions)):
+            row = self.start_row + 1 + position + skipped
+            while skipped < len(filtered) and filtered[skipped] <= row:
+                skipped += 1
+                row += 1
+            rows[position] = row
+        return [rows[position] for position in positions]
+
+    @classmethod
+    def default_name(cls):
+        """Return `name` if set, otherwise a name derived from the class
+        name."""
+        if cls.name:
+            return cls.name
+        return default_table_name(cls.__name__)
+
+    def definition(self):
+        """Return a tuple of the attributes that determine the loaded data.
+        Used as part of the key for `TableCache`. Return None if a predicate
+        or normalizer has no signature that is the same in every run (see
+        `function_signature`), so the table cannot be cached."""
+        try:
+            return self._definition()
+        except TypeError:
+            return None
+
+    def _definition(self):
+        return (
+            self.name,
+            self.worksheet_name,
+            self.table_marker,
+            sorted((self.filters or {}).items()),
+            tuple(self.normalize_fields),
+            sorted((field, function_signature(normalizer))
+                   for field, normalizer in (self.normalizers or {}).items()),
+            self.header_date_format,
+            tuple(self.required_fields or ()),
+            tuple(self.predicate_fields),
+            function_signature(self.predicate),
+            sorted((self.schema or {}).items()),
+        )
+
+    def read_header(self, marker_row, marker_col, header_row):
+        """Return the tuple of normalized field names from the row following
+        the table marker, which is at 1-based row `marker_row` and 0-based
+        column `marker_col`. Update start_row, start_col, and stop_col."""
+        self.start_row = marker_row + 1  # Row of first record
+        self.start_col = marker_col
+        raw_header = list(header_row[self.start_col:])
         limit = None
         for i, name in enumerate(raw_header):
             if name in ('', 'sep', 'separator', None):
@@ -83,35 +667,254 @@ class InputTable:
             limit = len(raw_header)
         converted_header = [convert_date(n, self.header_date_format)
                             for n in raw_header]
-        fields = tuple(normalize_name(n)
-                       for n in converted_header[:limit])
-        assert set(self.normalize_fields) <= set(fields)
+        header_fields = tuple(normalize_name(n)
+                              for n in converted_header[:limit])
+        self.header_fields = header_fields
         self.stop_col = self.start_col + limit
-        # Load data.
-        data = RecordSet(
+        fields = tuple(self.required_fields or header_fields)
+        assert set(fields) <= set(header_fields), fields
+        assert set(self.normalize_fields) <= set(fields)
+        assert set(self.intern_fields) <= set(fields)
+        assert set(self.normalizers or ()) <= set(self.normalize_fields)
+        assert set(self.schema or ()) <= set(header_fields), self.schema
+        self.select_values = self.make_selector(header_fields, fields)
+        return fields
+
+    def declared_schema(self, fields):
+        """Return the part of the declared `schema` for `fields`, the fields
+        loaded, which may leave out some of the header fields."""
+        return {field: kind for field, kind in (self.schema or {}).items()
+                if field in fields}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('select_values', None)  # A closure; rebuilt by read_header
+        return state
+
+    def make_selector(self, header_fields, fields):
+        """Return a function that maps the raw values of a row (one per header
+        field) to the tuple of values of `fields`, or to None if the row is
+        hit by `filters` or rejected by `predicate`."""
+        filter_tuples = tuple((header_fields.index(k), v)
+                              for k, v in (self.filters or {}).items())
+        project = tuple_getter([header_fields.index(f) for f in fields])
+        predicate = self.predicate
+        predicate_values = tuple_getter([header_fields.index(f)
+                                         for f in self.predicate_fields])
+
+        def select_values(values):
+            for i, filter_value in filter_tuples:
+                if values[i] == filter_value:
+                    return None
+            if predicate and not predicate(*predicate_values(values)):
+                return None
+            return project(values)
+        return select_values
+
+    def make_record_set(self, fields, tuple_iter):
+        """Return a RecordSet of the data with its source attribute set to
+        self."""
+        data = self.record_set_class(
             self.name, fields,
-            iter_tuples(row_iter, self.start_col, self.stop_col),
+            tuple_iter,
             self.normalize_fields,
-            self.filters
+            intern_fields=self.intern_fields,
+            normalizers=self.normalizers,
+            schema=self.declared_schema(fields)
         )
         data.source = self
         return data
 
 
+def workbook_signatures(workbook_path):
+    """Return the signature of the workbook file, which changes whenever the
+    file does (see `workbook_signature`), and a dict mapping the name of each
+    worksheet to its signature, which is empty if the file is not an xlsx
+    archive."""
+    signature = workbook_signature(workbook_path)
+    try:
+        with XmlReader(workbook_path) as reader:
+            return signature, reader.worksheet_signatures()
+    except (BadZipFile, KeyError):
+        return signature, {}
+
+
+def table_changed(source, workbook_path, signatures):
+    """Return whether the worksheet that `source`, an InputTable, was loaded
+    from may differ from the same worksheet of the workbook at
+    `workbook_path`. The worksheet signatures are only read if the workbook
+    file has changed. `signatures` caches them for each workbook."""
+    if workbook_path not in signatures:
+        signatures[workbook_path] = [workbook_signature(workbook_path), None]
+    entry = signatures[workbook_path]
+    if source.workbook_signature == entry[0]:
+        return False
+    if entry[1] is None:
+        entry[:] = workbook_signatures(workbook_path)
+    sheet_signature = entry[1].get(source.worksheet_name)
+    if sheet_signature is None or sheet_signature != source.sheet_signature:
+        return True
+    source.workbook_signature = entry[0]  # Skip reading signatures next time
+    return False
+
+
+def read_worksheet_tables(reader_class, workbook_path, worksheet_name,
+                          tables, layout=None):
+    """Open the workbook and load `tables`, which are all on the same
+    worksheet. Return the list of RecordSets in the same order as `tables`.
+    Used as the task of a worker process, so the worksheet is read in that
+    process without starting another pool."""
+    with reader_class(workbook_path) as reader:
+        record_sets = read_workbook_tables(reader, tables, layout)
+    return [record_sets[table] for table in tables]
+
+
+def read_workbook_tables(reader, tables, layout=None):
+    """Read `tables` using `reader`, scanning each worksheet once. If the
+    `layout` of the workbook from a LayoutIndex has all of the tables on a
+    worksheet, read only the rows holding them. Return a dict mapping each
+    table to its RecordSet."""
+    result = {}
+    for worksheet_name, sheet_tables in group_by_worksheet(tables).items():
+        min_row, max_row = row_range(layout or {}, sheet_tables)
+        result.update(load_worksheet_tables(
+            reader.iter_rows(worksheet_name, min_row, max_row), sheet_tables,
+            min_row
+        ))
+    return result
+
+
+def group_by_worksheet(tables):
+    """Return a dict mapping each worksheet name to the list of tables on
+    that worksheet, preserving the order of `tables`."""
+    result = {}
+    for table in tables:
+        result.setdefault(table.worksheet_name, []).append(table)
+    return result
+
+
+def load_worksheet_tables(row_iter, tables, first_row=1):
+    """Load every table in `tables` from a worksheet using a single pass over
+    `row_iter`, which generates a tuple of values for every row starting with
+    row `first_row`. Return a dict mapping each table to its RecordSet.
+
+    Each table sees the same rows it would see if it scanned the worksheet by
+    itself: its marker is the first row whose first non-blank cell matches
+    `table_marker`, the next row is its header, and its data ends at the first
+    row that is blank within `start_col:stop_col`, which is recorded as
+    `end_row`."""
+    start = perf_counter()
+    read_timings = dict(seconds=0)
+    if HOOKS:
+        row_iter = timed(row_iter, read_timings)
+    searching = list(tables)  # Tables still looking for their marker
+    marked = []  # (table, marker_row, marker_col) expecting a header next
+    collecting = {}  # Maps table -> (fields, list of value tuples)
+    result = {}
+    row_number = first_row - 1
+    for row_number, row in enumerate(row_iter, first_row):
+        for table, (fields, tuples) in list(collecting.items()):
+            values = row[table.start_col:table.stop_col]
+            if any(values):
+                values = table.select_values(values)
+                if values is not None:
+                    tuples.append(values)
+                else:
+                    table.filtered_rows.append(row_number)
+            else:  # end of data
+                del collecting[table]
+                table.end_row = row_number
+                result[table] = table.make_record_set(fields, tuples)
+        for table, marker_row, marker_col in marked:
+            fields = table.read_header(marker_row, marker_col, row)
+            table.filtered_rows = []
+            collecting[table] = (fields, [])
+        marked = []
+        if searching:
+            col = first_non_blank(row)
+            if col is not None:
+                for table in [t for t in searching
+                              if row[col] == t.table_marker]:
+                    searching.remove(table)
+                    marked.append((table, row_number, col))
+        if not (searching or marked or collecting):
+            break
+    assert not searching, [t.table_marker for t in searching]
+    assert not marked, [t.table_marker for t, _, _ in marked]
+    for table, (fields, tuples) in collecting.items():  # data ran to the end
+        result[table] = table.make_record_set(fields, tuples)
+    if HOOKS:
+        emit_scan_events(tables, result, row_number - first_row + 1,
+                         perf_counter() - start, read_timings['seconds'])
+    return result
+
+
+def locate_tables(row_iter, tables):
+    """Find `tables` in a worksheet as `load_worksheet_tables` does, setting
+    their positions and `end_row`, without reading their data."""
+    searching = list(tables)
+    marked = []
+    collecting = []
+    for row_number, row in enumerate(row_iter, 1):
+        for table in list(collecting):
+            if not any(row[table.start_col:table.stop_col]):
+                collecting.remove(table)
+                table.end_row = row_number
+        for table, marker_row, marker_col in marked:
+            table.read_header(marker_row, marker_col, row)
+            collecting.append(table)
+        marked = []
+        if searching:
+            col = first_non_blank(row)
+            if col is not None:
+                for table in [t for t in searching
+                              if row[col] == t.table_marker]:
+                    searching.remove(table)
+                    marked.append((table, row_number, col))
+        if not (searching or marked or collecting):
+            break
+    assert not searching, [t.table_marker for t in searching]
+    assert not marked, [t.table_marker for t, _, _ in marked]
+
+
+def emit_scan_events(tables, result, rows_scanned, seconds, read_seconds):
+    """Emit a 'table_loaded' event for each of `tables` and a
+    'worksheet_scanned' event for the scan that loaded them."""
+    for table in tables:
+        emit('table_loaded', table=table.name,
+             worksheet=table.worksheet_name,
+             rows_before_marker=table.start_row - 2,
+             rows_loaded=len(result[table]),
+             rows_filtered=len(table.filtered_rows))
+    emit('worksheet_scanned', worksheet=tables[0].worksheet_name,
+         tables=[table.name for table in tables], rows_scanned=rows_scanned,
+         seconds=seconds, read_seconds=read_seconds)
+
+
+def first_non_blank(row):
+    """Return the index of the first value in `row` that is not blank, or
+    None."""
+    for i, value in enumerate(row):
+        if value:
+            return i
+    return None
+
+
 def iter_tuples(row_iter, start_col, stop_col):
-    """Generate records from an Excel row iterator. Note that any row
-    that is completely blank within the range `start_col:stop_col` marks
+    """Generate records from an iterator of row value tuples. Note that any
+    row that is completely blank within the range `start_col:stop_col` marks
     the end of data."""
     for row in row_iter:
-        values = tuple(c.value for c in row[start_col:stop_col])
+        values = tuple(row[start_col:stop_col])
         if not any(values):
             break  # end of data
         yield values
 
 
-def convert_date(value, datetime_format):
-    """If value has strftime (date or datetime), convert to string using
-    strftime format. Otherwise return value unchanged."""
-    if hasattr(value, 'strftime'):
-        value = value.strftime(datetime_format)
-    return value
+def default_table_name(class_name):
+    """Return the snake case table name for a table class name, always
+    ending with '_table'."""
+    name = camel_to_snake(class_name)
+    name = re.sub(r'^table_', '', name)
+    name = re.sub(r'_table$', '', name)
+    return name + '_table'
@@ -0,0 +1,302 @@
+"""A fast worksheet reader that streams the sheet XML out of the xlsx archive
+and yields plain tuples of cell values without constructing openpyxl cell
+objects. Values are converted the same way openpyxl converts them in
+read-only, data-only mode."""
+
+from posixpath import dirname, join, normpath
+from xml.etree.ElementTree import XMLParser, iterparse, parse
+from zipfile import ZipFile
+
+from openpyxl.styles.numbers import (builtin_format_code, is_date_format,
+                                     is_timedelta_format)
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import (CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900,
+                                     from_excel, from_ISO8601)
+
+RELATIONSHIPS_NS = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+                    'relationships')
+PACKAGE_RELATIONSHIPS_NS = ('http://schemas.openxmlformats.org/package/2006/'
+                            'relationships')
+CHUNK_SIZE = 2**16
+COLUMN_NUMBERS = {}  # Cache of column letters -> 1-based column number
+
+
+class XmlReader:
+    """Reads worksheets directly from the XML inside an xlsx file. Has the
+    same interface as `OpenpyxlReader`."""
+    def __init__(self, workbook_path):
+        self.archive = ZipFile(workbook_path)
+        workbook_root = self.parse('xl/workbook.xml')
+        self.ns = namespace(workbook_root.tag)
+        targets = self.read_relationships('xl/_rels/workbook.xml.rels')
+        self.sheet_paths = {
+            sheet.get('name'): targets[sheet.get(f'{{{RELATIONSHIPS_NS}}}id')]
+            for sheet in workbook_root.iter(self.ns + 'sheet')
+        }
+        properties = workbook_root.find(self.ns + 'workbookPr')
+        date1904 = properties is not None and properties.get('date1904')
+        self.epoch = (CALENDAR_MAC_1904 if date1904 in ('1', 'true')
+                      else CALENDAR_WINDOWS_1900)
+        self.part_paths = {target.rpartition('/')[2]: target
+                           for target in targets.values()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def __getattr__(self, name):
+        """Read the shared strings and styles on first use, so that opening a
+        reader for `worksheet_signatures` is quick. Afterwards they are plain
+        attributes."""
+        if name == 'shared_strings':
+            self.shared_strings = self.read_shared_strings(
+                self.part_paths.get('sharedStrings.xml')
+            )
+        elif name in ('date_formats', 'timedelta_formats'):
+            self.date_formats, self.timedelta_formats = \
+                self.read_date_formats(self.part_paths.get('styles.xml'))
+        else:
+            raise AttributeError(name)
+        return getattr(self, name)
+
+    def worksheet_signatures(self):
+        """Return a dict mapping the name of each worksheet to a value that
+        changes whenever the values read from the worksheet may change: the
+        CRCs of its XML and of the shared strings and styles that it refers
+        to, and the date epoch. Only the archive directory is read."""
+        crcs = {info.filename: info.CRC for info in self.archive.infolist()}
+        shared = (crcs.get(self.part_paths.get('sharedStrings.xml')),
+                  crcs.get(self.part_paths.get('styles.xml')), self.epoch)
+        return {name: (crcs.get(path),) + shared
+                for name, path in self.sheet_paths.items()}
+
+    def iter_rows(self, worksheet_name, min_row=1, max_row=None):
+        """Generate a tuple of values for every row of the worksheet,
+        including blank rows, from `min_row` to `max_row` (by default the
+        last). Cells of earlier rows are not converted, and parsing stops
+        after `max_row`."""
+        if worksheet_name not in self.sheet_paths:
+            raise KeyError(f'Worksheet {worksheet_name} does not exist.')
+        target = RowBuilder(self, min_row, max_row)
+        parser = XMLParser(target=target)
+        with self.archive.open(self.sheet_paths[worksheet_name]) as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                parser.feed(chunk)
+                yield from target.pop_rows()
+                if target.done:
+                    return
+            parser.close()
+        yield from target.pop_rows()
+
+    def convert(self, text, data_type, style_id):
+        """Convert the text of a <v> element to a Python value."""
+        if text is None:
+            return None
+        if data_type == 'n':
+            if '.' in text or 'E' in text or 'e' in text:
+                value = float(text)
+            else:
+                value = int(text)
+            if style_id and int(style_id) in self.date_formats:
+                timedelta = int(style_id) in self.timedelta_formats
+                try:
+                    value = from_excel(value, self.epoch, timedelta=timedelta)
+                except (OverflowError, ValueError):
+                    value = '#VALUE!'
+            return value
+        if data_type == 's':
+            return self.shared_strings[int(text)]
+        if data_type == 'b':
+            return bool(int(text))
+        if data_type == 'd':
+            return from_ISO8601(text)
+        return text  # 'str' and 'e'
+
+    def text_content(self, element):
+        """Return the plain text of a string item (<si> or <is>), ignoring
+        formatting and phonetic runs."""
+        ns = self.ns
+        snippets = [element.findtext(ns + 't') or '']
+        for run in element.iterfind(ns + 'r'):
+            snippets.append(run.findtext(ns + 't') or '')
+        return ''.join(snippets)
+
+    def read_shared_strings(self, path):
+        if path is None:
+            return []
+        result = []
+        with self.archive.open(path) as source:
+            for _, element in iterparse(source):
+                if element.tag == self.ns + 'si':
+                    text = self.text_content(element)
+                    result.append(text.replace('x005F_', ''))
+                    element.clear()
+        return result
+
+    def read_date_formats(self, path):
+        """Return the sets of style indexes that format numbers as dates and
+        as durations."""
+        date_formats, timedelta_formats = set(), set()
+        if path is None:
+            return date_formats, timedelta_formats
+        root = self.parse(path)
+        custom_formats = {int(f.get('numFmtId')): f.get('formatCode')
+                          for f in root.iter(self.ns + 'numFmt')}
+        cell_xfs = root.find(self.ns + 'cellXfs')
+        xfs = [] if cell_xfs is None else cell_xfs.iterfind(self.ns + 'xf')
+        for index, xf in enumerate(xfs):
+            format_id = int(xf.get('numFmtId', 0))
+            fmt = custom_formats.get(format_id)
+            if fmt is None:
+                fmt = builtin_format_code(format_id)
+            if is_date_format(fmt):
+                date_formats.add(index)
+            if is_timedelta_format(fmt):
+                timedelta_formats.add(index)
+        return date_formats, timedelta_formats
+
+    def read_relationships(self, path):
+        """Return a dict mapping relationship ids to archive paths."""
+        base = dirname(dirname(path))
+        result = {}
+        for relationship in self.parse(path).iter(
+                f'{{{PACKAGE_RELATIONSHIPS_NS}}}Relationship'):
+            target = relationship.get('Target')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = normpath(join(base, target))
+            result[relationship.get('Id')] = target
+        return result
+
+    def parse(self, path):
+        """Return the root element of an XML file in the archive."""
+        with self.archive.open(path) as source:
+            return parse(source).getroot()
+
+
+class RowBuilder:
+    """Parser target that converts the <row> elements of a worksheet into
+    tuples of values as the XML is fed in, without building elements. Only
+    rows from `min_row` to `max_row` (if given) are produced."""
+    def __init__(self, reader, min_row=1, max_row=None):
+        self.reader = reader
+        self.min_row, self.stop_row = min_row, max_row
+        ns = reader.ns
+        self.row_tag, self.cell_tag = ns + 'row', ns + 'c'
+        self.value_tag, self.inline_tag = ns + 'v', ns + 'is'
+        self.text_tag, self.phonetic_tag = ns + 't', ns + 'rPh'
+        self.dimension_tag = ns + 'dimension'
+        self.rows = []  # Rows completed but not yet popped
+        self.width = self.max_row = None
+        self.blank_row = ()
+        self.row_number = 0
+        self.done = False
+        self.skipping = False  # In a row before min_row
+        self.cells = []
+        self.column = 0
+        self.data_type = self.style_id = self.value_text = None
+        self.inline = None  # Text snippets of an inline string
+        self.snippets = None  # Text of the current <v> or <t> element
+        self.phonetic = False
+
+    def pop_rows(self):
+        """Return and forget the rows completed so far."""
+        result, self.rows = self.rows, []
+        return result
+
+    def start(self, tag, attrib):
+        if self.done or (self.skipping and tag != self.row_tag):
+            return
+        if tag == self.cell_tag:
+            reference = attrib.get('r')
+            self.column = (column_number(reference) if reference
+                           else self.column + 1)
+            self.data_type = attrib.get('t', 'n')
+            self.style_id = attrib.get('s')
+            self.value_text = self.inline = None
+        elif tag == self.value_tag:
+            self.snippets = []
+        elif tag == self.text_tag:
+            if not self.phonetic:
+                self.snippets = []
+        elif tag == self.inline_tag:
+            self.inline = []
+        elif tag == self.phonetic_tag:
+            self.phonetic = True
+        elif tag == self.row_tag:
+            index = int(attrib.get('r', self.row_number + 1))
+            if ((self.max_row is not None and index > self.max_row)
+                    or (self.stop_row is not None and index > self.stop_row)):
+                self.done = True
+                return
+            while self.row_number < index - 1:  # missing rows
+                self.row_number += 1
+                if self.row_number >= self.min_row:
+                    self.rows.append(self.blank_row)
+            self.row_number = index
+            self.skipping = index < self.min_row
+            self.cells = []
+            self.column = 0
+        elif tag == self.dimension_tag and attrib.get('ref'):
+            _, _, self.width, self.max_row = range_boundaries(attrib['ref'])
+            self.blank_row = (None,) * self.width
+
+    def data(self, text):
+        if self.snippets is not None:
+            self.snippets.append(text)
+
+    def end(self, tag):
+        if self.done or self.skipping:
+            return
+        if tag == self.value_tag:
+            self.value_text = ''.join(self.snippets)
+            self.snippets = None
+        elif tag == self.text_tag:
+            if self.snippets is not None:
+                self.inline.append(''.join(self.snippets))
+                self.snippets = None
+        elif tag == self.phonetic_tag:
+            self.phonetic = False
+        elif tag == self.cell_tag:
+            if self.data_type == 'inlineStr':
+                value = None if self.inline is None else ''.join(self.inline)
+            else:
+                value = self.reader.convert(self.value_text or None,
+                                            self.data_type, self.style_id)
+            self.cells.append((self.column, value))
+        elif tag == self.row_tag:
+            cells = self.cells
+            row_width = self.width or (cells[-1][0] if cells else 0)
+            values = [None] * row_width
+            for column, value in cells:
+                if column > row_width:
+                    break
+                values[column - 1] = value
+            self.rows.append(tuple(values))
+
+    def close(self):
+        pass
+
+
+def namespace(tag):
+    """Return the '{namespace}' prefix of an element tag."""
+    return tag[:tag.index('}') + 1] if tag.startswith('{') else ''
+
+
+def column_number(reference):
+    """Return the 1-based column number of a cell reference such as 'AB12'."""
+    letters = reference.rstrip('0123456789')
+    try:
+        return COLUMN_NUMBERS[letters]
+    except KeyError:
+        result = 0
+        for letter in letters.upper():
+            result = result * 26 + ord(letter) - 64
+        COLUMN_NUMBERS[letters] = result
+        return result
@@ -8,6 +8,10 @@ REQUIREMENTS = [
     'openpyxl',
 ]
 
+EXTRA_REQUIREMENTS = {
+    'numpy': ['numpy'],  # faster ColumnarRecordSet
+}
+
 SETUP_REQUIREMENTS = [
     'pytest-runner',
 ]
@@ -33,8 +37,11 @@ setup(
         'Programming Language :: Python :: 3.7',
     ],
     keywords='excel',  # Optional
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),  # Required
+    packages=find_packages(  # Required
+        exclude=['benchmarks', 'contrib', 'docs', 'tests']
+    ),
     install_requires=REQUIREMENTS,  # Optional
+    extras_require=EXTRA_REQUIREMENTS,
     tests_require=TEST_REQUIREMENTS,
     setup_requires=SETUP_REQUIREMENTS,
     python_requires='~=3.6',
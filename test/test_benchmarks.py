@@ -0,0 +1,32 @@
+"""Tests for the benchmarks package."""
+
+import json
+
+from benchmarks.generate import (FILTER_INTERVAL, SyntheticWorkbook,
+                                 generate_workbook)
+from benchmarks.suite import BENCHMARKS, compare, run
+
+
+def test_generate_workbook(tmp_path):
+    generate_workbook(tmp_path, 2 * FILTER_INTERVAL + 10)
+    workbook = SyntheticWorkbook(dict(SyntheticWorkbook=str(tmp_path)))
+    tables = (workbook.first_table, workbook.second_table,
+              workbook.third_table)
+    assert [len(table) for table in tables] == [36, 37, 37]
+    for table in tables:
+        assert table.fields[:5] == ('key_a', 'key_b', 'key_c', 'label',
+                                    'jan_19')
+        assert 'Total' not in [record.key_b for record in table]
+
+
+def test_run_and_compare(tmp_path):
+    results = run(tmp_path, sizes=[30], repeat=1)
+    assert [(r['benchmark'], r['rows']) for r in results['results']] == [
+        (name, 30) for name in BENCHMARKS
+    ]
+    assert all(r['seconds'] >= 0 and r['peak_bytes'] >= 0
+               for r in results['results'])
+    path = tmp_path / 'results.json'
+    path.write_text(json.dumps(results))
+    assert compare(path, path) == [(name, 30, 1.0, 1.0)
+                                   for name in BENCHMARKS]
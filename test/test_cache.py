@@ -0,0 +1,176 @@
+"""Tests for pipexl.cache."""
+
+import os
+import shutil
+
+import pytest
+
+from pipexl import TableCache
+from pipexl.cache import CACHE_SUFFIX
+import pipexl.workbook
+
+from .test_main import (TEST_RECORDS, JOIN_RECORDS, LazyWorkbookForTesting,
+                        WorkbookforTesting)
+
+
+@pytest.fixture
+def cached_model(tmp_path):
+    """Return a model class using a fresh cache and a config pointing at a
+    private copy of the test workbook."""
+    shutil.copy('test/resources/book_a.xlsx', tmp_path)
+
+    class CachedWorkbook(WorkbookforTesting):
+        cache = TableCache(tmp_path / 'cache')
+        InputTableForTesting = WorkbookforTesting.InputTableForTesting
+        JoinTable = WorkbookforTesting.JoinTable
+
+    config = dict(CachedWorkbook=str(tmp_path))
+    return CachedWorkbook, config
+
+
+def no_openpyxl(*args, **kwargs):
+    raise AssertionError('openpyxl should not be used on a warm start')
+
+
+def test_warm_start_skips_openpyxl(cached_model, monkeypatch):
+    model_class, config = cached_model
+    cold = model_class(config)
+    monkeypatch.setattr(pipexl.workbook, 'load_workbook', no_openpyxl)
+    warm = model_class(config)
+    for expected in (TEST_RECORDS, JOIN_RECORDS):
+        cold_records = getattr(cold, expected.source.name)
+        warm_records = getattr(warm, expected.source.name)
+        assert warm_records.fields == cold_records.fields == expected.fields
+        assert warm_records.astuples() == expected.astuples()
+        assert vars(warm_records.grand_total) == vars(expected.grand_total)
+        for attribute in ('start_row', 'stop_col', 'end_row',
+                          'header_fields', 'filtered_rows'):
+            assert getattr(warm_records.source, attribute) == \
+                getattr(expected.source, attribute)
+        assert warm_records.source_rows(range(len(expected))) == \
+            expected.source_rows(range(len(expected)))
+    assert warm.test_table.find_duplicates('key_a') == \
+        TEST_RECORDS.find_duplicates('key_a')
+
+
+def test_changed_workbook_is_reloaded(cached_model, tmp_path, monkeypatch):
+    model_class, config = cached_model
+    model_class(config)
+    workbook_path = tmp_path / 'book_a.xlsx'
+    stat = workbook_path.stat()
+    os.utime(workbook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    calls = []
+    original = pipexl.workbook.load_workbook
+    monkeypatch.setattr(pipexl.workbook, 'load_workbook',
+                        lambda *args, **kwargs: calls.append(args)
+                        or original(*args, **kwargs))
+    model_class(config)
+    model_class(config)
+    assert len(calls) == 1
+
+
+def test_eviction(cached_model):
+    model_class, config = cached_model
+    model_class(config)
+    cache = model_class.cache
+    entries = list(cache.directory.glob('*' + CACHE_SUFFIX))
+    assert len(entries) == 2
+    cache.max_bytes = max(p.stat().st_size for p in entries)
+    cache.evict()
+    assert len(list(cache.directory.glob('*' + CACHE_SUFFIX))) == 1
+    cache.clear()
+    assert not list(cache.directory.glob('*' + CACHE_SUFFIX))
+
+
+def test_entries_deleted_by_another_process(cached_model, monkeypatch):
+    model_class, config = cached_model
+    model_class(config)
+    cache = model_class.cache
+    entries = list(cache.directory.glob('*' + CACHE_SUFFIX))
+    gone = cache.directory / ('gone' + CACHE_SUFFIX)
+
+    class Directory:
+        def glob(self, pattern):
+            return entries + [gone]
+
+    monkeypatch.setattr(cache, 'directory', Directory())
+    cache.max_bytes = 0
+    cache.evict()
+    assert not any(entry.exists() for entry in entries)
+    cache.clear()
+
+
+def test_predicates_in_cache_key(tmp_path):
+    shutil.copy('test/resources/book_a.xlsx', tmp_path)
+    cache = TableCache(tmp_path / 'cache')
+    config = {}
+    for threshold in (50, 70):
+        class ThresholdWorkbook(WorkbookforTesting):
+            class InputTableForTesting(
+                    WorkbookforTesting.InputTableForTesting):
+                predicate_fields = ('value_a',)
+                predicate = staticmethod(lambda value: value > threshold)
+        ThresholdWorkbook.cache = cache
+        config['ThresholdWorkbook'] = str(tmp_path)
+        records = ThresholdWorkbook(config).test_table
+        assert records.astuples() == [r for r in TEST_RECORDS.astuples()
+                                      if r[TEST_RECORDS.fields.index(
+                                          'value_a')] > threshold]
+    marker = object()
+
+    class UncachedWorkbook(WorkbookforTesting):
+        cache = TableCache(tmp_path / 'uncached')
+
+        class InputTableForTesting(WorkbookforTesting.InputTableForTesting):
+            predicate_fields = ('value_a',)
+            predicate = staticmethod(lambda value: value is not marker)
+
+    UncachedWorkbook(dict(UncachedWorkbook=str(tmp_path)))
+    assert not UncachedWorkbook.cache.directory.exists()
+
+
+def test_warm_start_keeps_declared_schema(tmp_path):
+    shutil.copy('test/resources/book_a.xlsx', tmp_path)
+
+    class SchemaWorkbook(WorkbookforTesting):
+        cache = TableCache(tmp_path / 'cache')
+
+        class InputTableForTesting(WorkbookforTesting.InputTableForTesting):
+            predicate_fields = ('jan_19',)
+            predicate = staticmethod(lambda value: value is None)
+            schema = dict(jan_19='text')  # Blank in every row kept
+            intern_fields = ('key_a',)
+
+    config = dict(SchemaWorkbook=str(tmp_path))
+    cold = SchemaWorkbook(config).test_table
+    warm = SchemaWorkbook(config).test_table
+    assert len(list(SchemaWorkbook.cache.directory.glob(
+        '*' + CACHE_SUFFIX))) == 1
+    assert warm.schema == cold.schema
+    assert warm.schema.kinds['jan_19'] == 'text'
+    assert vars(warm.grand_total) == vars(cold.grand_total)
+    assert 'jan_19' not in vars(warm.grand_total)
+
+
+def test_pushed_down_query_is_cached(tmp_path, monkeypatch):
+    shutil.copy('test/resources/book_a.xlsx', tmp_path)
+
+    class CachedLazyWorkbook(LazyWorkbookForTesting):
+        cache = TableCache(tmp_path / 'cache')
+        InputTableForTesting = WorkbookforTesting.InputTableForTesting
+
+    config = dict(CachedLazyWorkbook=str(tmp_path))
+    expected = [(r.key_a,) for r in TEST_RECORDS if r.value_a > 50]
+    with CachedLazyWorkbook(config) as workbook:
+        query = workbook.query('test_table').where(
+            value_a=lambda value: value > 50
+        )
+        assert query.select('key_a').collect().astuples() == expected
+    assert len(list(CachedLazyWorkbook.cache.directory.glob(
+        '*' + CACHE_SUFFIX))) == 1
+    monkeypatch.setattr(pipexl.workbook, 'load_workbook', no_openpyxl)
+    with CachedLazyWorkbook(config) as workbook:
+        query = workbook.query('test_table').where(
+            value_a=lambda value: value > 50
+        )
+        assert query.select('key_a').collect().astuples() == expected
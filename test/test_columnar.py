@@ -0,0 +1,145 @@
+"""Tests for pipexl.columnar."""
+
+import pytest
+
+from pipexl import ColumnarRecordSet, RecordSet
+import pipexl.columnar
+
+
+FIELDS = ('key_a', 'key_b', 'count', 'amount', 'label')
+TUPLES = [
+    ('x', 'p', 1, 1.5, 'SO 1 Qp'),
+    ('x', 'q', None, 2.25, 'h6 6 hT'),
+    ('y', 'p', 3, None, 'Ww 5 zh'),
+    ('x', 'Total', 4, 3.75, None),
+    ('y', 'q', 5, 4.0, 'mz 5 0z'),
+]
+FILTERS = dict(key_b='Total')
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    """Run each test with and without NumPy."""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pipexl.columnar, 'numpy', None)
+    return request.param
+
+
+def make_pair(**kwargs):
+    return tuple(cls('thing', FIELDS, TUPLES, **kwargs)
+                 for cls in (RecordSet, ColumnarRecordSet))
+
+
+def as_tuples(records):
+    return [r.astuple for r in records]
+
+
+def test_records_match_record_set(backend):
+    row_set, column_set = make_pair(normalize_fields=('label',),
+                                    filters=FILTERS)
+    assert len(column_set) == len(row_set) == 4
+    assert as_tuples(column_set) == as_tuples(row_set)
+    assert column_set[1] == column_set[-3]
+    assert vars(column_set[1]) == vars(row_set[1])
+    assert as_tuples(column_set[1:3]) == as_tuples(row_set[1:3])
+    assert column_set.column('count') == [1, None, 3, 5]
+
+
+def test_grand_total_matches_record_set(backend):
+    row_set, column_set = make_pair(filters=FILTERS)
+    assert column_set.grand_total.fields == ('count', 'amount')
+    assert vars(column_set.grand_total) == vars(row_set.grand_total)
+
+
+def test_sum_by_matches_record_set(backend):
+    row_set, column_set = make_pair()
+    for key_fields in (('key_a',), ('key_b', 'key_a'), ('key_b',)):
+        column_sums = column_set.sum_by(*key_fields)
+        row_sums = row_set.sum_by(*key_fields)
+        assert isinstance(column_sums, ColumnarRecordSet)
+        assert column_sums.fields == row_sums.fields
+        assert as_tuples(column_sums) == pytest.approx(as_tuples(row_sums))
+
+
+def test_rollup_matches_record_set(backend):
+    row_set, column_set = make_pair()
+    column_rollup = column_set.rollup('key_b', 'key_a')
+    row_rollup = row_set.rollup('key_b', 'key_a')
+    assert [r.fields for r in column_rollup] == [r.fields for r in row_rollup]
+    for column_sums, row_sums in zip(column_rollup, row_rollup):
+        assert as_tuples(column_sums) == pytest.approx(as_tuples(row_sums))
+
+
+def test_make_index_matches_record_set(backend):
+    row_set, column_set = make_pair()
+    for key_fields in (('key_a',), ('key_a', 'key_b')):
+        column_index = column_set.make_index(*key_fields)
+        row_index = row_set.make_index(*key_fields)
+        assert list(column_index) == list(row_index)
+        for key, records in row_index.items():
+            assert as_tuples(column_index[key]) == as_tuples(records)
+
+
+def test_empty(backend):
+    column_set = ColumnarRecordSet('thing', FIELDS, [])
+    assert len(column_set) == 0
+    assert list(column_set) == []
+    assert vars(column_set.grand_total) == dict.fromkeys(FIELDS, 0)
+
+
+def test_workbook_table(backend):
+    from test.test_main import CONFIG, TEST_RECORDS, WorkbookforTesting
+
+    class ColumnarWorkbook(WorkbookforTesting):
+        class InputTableForTesting(WorkbookforTesting.InputTableForTesting):
+            record_set_class = ColumnarRecordSet
+
+    config = dict(CONFIG, ColumnarWorkbook=CONFIG['WorkbookforTesting'])
+    records = ColumnarWorkbook(config).test_table
+    assert isinstance(records, ColumnarRecordSet)
+    assert records.source.start_row == TEST_RECORDS.source.start_row
+    assert as_tuples(records) == as_tuples(TEST_RECORDS)
+    assert vars(records.grand_total) == pytest.approx(
+        vars(TEST_RECORDS.grand_total)
+    )
+
+
+@pytest.mark.parametrize('key_fields', [('key_a',), ('key_b', 'key_a')])
+def test_dictionary_encoding(backend, monkeypatch, key_fields):
+    tuples = [(f'key {i % 3}', f'b {i % 2}', None if i % 5 else 'n', i, 1.5)
+              for i in range(40)]
+    fields = ('key_a', 'key_b', 'note', 'count', 'amount')
+    encoded = ColumnarRecordSet('thing', fields, tuples)
+    assert isinstance(encoded._columns['key_a'],
+                      pipexl.columnar.CategoricalColumn)
+    assert encoded._columns['note'].categories == ['n', None]
+    monkeypatch.setattr(ColumnarRecordSet, 'category_ratio', 0)
+    plain = ColumnarRecordSet('thing', fields, tuples)
+    assert isinstance(plain._columns['key_a'], pipexl.columnar.ObjectColumn)
+    assert encoded == plain
+    assert encoded.column('note') == plain.column('note')
+    assert as_tuples(encoded.sum_by(*key_fields)) == \
+        as_tuples(plain.sum_by(*key_fields))
+    encoded_index = encoded.make_index(*key_fields)
+    plain_index = plain.make_index(*key_fields)
+    assert list(encoded_index) == list(plain_index)
+    for key, records in plain_index.items():
+        assert as_tuples(encoded_index[key]) == as_tuples(records)
+
+
+def test_large_and_mixed_numbers_match_record_set(backend):
+    tuples = [('x', 2 ** 62, 1), ('x', 2 ** 62, 1.5), ('y', 1, None)]
+    row_set, column_set = (
+        cls('thing', ('key', 'big', 'mixed'), tuples)
+        for cls in (RecordSet, ColumnarRecordSet)
+    )
+    assert column_set.grand_total.big == 2 ** 63 + 1
+    assert vars(column_set.grand_total) == vars(row_set.grand_total)
+    assert as_tuples(column_set.sum_by('key')) == as_tuples(
+        row_set.sum_by('key')
+    )
+    assert [type(value) for value in column_set.column('mixed')] == [
+        int, float, type(None)
+    ]
@@ -0,0 +1,58 @@
+"""Tests for diffs between versions of record sets."""
+
+import pytest
+
+from pipexl import ColumnarRecordSet, RecordSet, RecordSetDelta
+
+FIELDS = ('key', 'group', 'label', 'amount', 'units')
+OLD = [('a', 'x', 'one', 1, 1), ('b', 'x', 'two', 2, 1),
+       ('c', 'y', 'three', 3, 1), ('d', 'z', 'four', 4.5, 1),
+       ('e', 'y', 'five', None, 1)]
+NEW = [('b', 'x', 'two', 20, 1), ('a', 'x', 'one', 1, 1),
+       ('c', 'y', 'three', 3, 1), ('e', 'y', 'FIVE', None, 1),
+       ('f', 'w', 'six', 6, 2)]
+
+
+@pytest.mark.parametrize('record_set_class', [RecordSet, ColumnarRecordSet])
+def test_delta(record_set_class):
+    old = record_set_class('thing', FIELDS, OLD)
+    new = record_set_class('thing', FIELDS, NEW)
+    delta = RecordSetDelta(old, new, 'key')
+    assert delta
+    assert isinstance(delta.added, record_set_class)
+    assert delta.added.record_class is new.record_class
+    assert delta.added.astuples() == [('f', 'w', 'six', 6, 2)]
+    assert delta.removed.astuples() == [('d', 'z', 'four', 4.5, 1)]
+    assert delta.changed_from.astuples() == [('b', 'x', 'two', 2, 1),
+                                             ('e', 'y', 'five', None, 1)]
+    assert delta.changed_to.astuples() == [('b', 'x', 'two', 20, 1),
+                                           ('e', 'y', 'FIVE', None, 1)]
+    assert not RecordSetDelta(old, old, 'key', 'group')
+    for key_fields in (('group',), ('group', 'key')):
+        subtotals = delta.update_sum_by(old.sum_by(*key_fields), *key_fields)
+        assert subtotals.astuples() == new.sum_by(*key_fields).astuples()
+        assert subtotals.record_class is new.sum_by(*key_fields).record_class
+
+
+def test_delta_falls_back_when_fields_change():
+    old = RecordSet('thing', FIELDS, OLD)
+    new = RecordSet('thing', FIELDS, NEW + [('g', 'w', 'seven', 7, 'n/a')])
+    delta = RecordSetDelta(old, new, 'key')
+    assert delta.update_sum_by(old.sum_by('group'), 'group') == \
+        new.sum_by('group')
+
+
+def test_duplicate_keys():
+    old = RecordSet('thing', FIELDS, OLD)
+    with pytest.raises(ValueError, match='2 records of thing have duplicate'):
+        RecordSetDelta(old, RecordSet('thing', FIELDS, OLD + OLD[:1]), 'key')
+
+
+def test_changes_are_found_by_value():
+    fields = ('k', 'n')
+    old = RecordSet('thing', fields, [('a', -1), ('b', float('nan'))])
+    new = RecordSet('thing', fields, [('a', -2), ('b', float('nan'))])
+    assert hash(-1) == hash(-2)
+    delta = RecordSetDelta(old, new, 'k')
+    assert delta.changed_from.astuples() == [('a', -1)]
+    assert delta.changed_to.astuples() == [('a', -2)]
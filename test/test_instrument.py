@@ -0,0 +1,62 @@
+"""Tests for pipexl.instrument."""
+
+import json
+
+from pipexl import Profile, RecordSet
+from pipexl.instrument import HOOKS, add_hook, emit, remove_hook
+
+from .test_main import CONFIG, WorkbookforTesting
+
+
+def test_hooks():
+    events = []
+    emit('ignored')  # No hooks
+    add_hook(events.append)
+    try:
+        emit('something', count=3)
+    finally:
+        remove_hook(events.append)
+    emit('ignored')
+    assert events == [dict(event='something', count=3)]
+    assert not HOOKS
+
+
+def test_profile(tmp_path):
+    with Profile() as profile:
+        workbook = WorkbookforTesting(CONFIG)
+        workbook.test_table.sum_by('key_a')
+    assert not HOOKS
+    events = {}
+    for event in profile.events:
+        events.setdefault(event['event'], []).append(event)
+    assert [e['table'] for e in events['table_loaded']] == [
+        'test_table', 'join_table'
+    ]
+    test_table_event = events['table_loaded'][0]
+    assert test_table_event['rows_before_marker'] == 4
+    assert test_table_event['rows_loaded'] == len(workbook.test_table) == 10
+    assert test_table_event['rows_filtered'] == 2
+    scan, = events['worksheet_scanned']
+    assert scan['rows_scanned'] == 45
+    assert 0 < scan['read_seconds'] < scan['seconds']
+    loaded, = events['workbook_loaded']
+    assert loaded['bytes_read'] > 0 and loaded['cached'] == []
+    sum_by, = events['sum_by']
+    assert sum_by['key_fields'] == ['key_a']
+    assert (sum_by['records'], sum_by['groups']) == (10, 6)
+    assert [e['record_type'] for e in events['record_set_built']] == [
+        'test_table', 'join_table', 'test_table_by_key_a'
+    ]
+    assert profile.summary()['sum_by']['count'] == 1
+    path = tmp_path / 'profile.json'
+    profile.save(path)
+    assert json.loads(path.read_text())['events'][0]['event'] == \
+        'record_set_built'
+
+
+def test_profile_memory():
+    with Profile(trace_memory=True) as profile:
+        RecordSet('thing', ('key', 'amount'), [('a', 1), ('b', 2)])
+    event, = profile.events
+    assert event['records'] == 2
+    assert event['peak_bytes'] > 0
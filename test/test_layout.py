@@ -0,0 +1,92 @@
+"""Tests for pipexl.layout."""
+
+import os
+import shutil
+
+import pytest
+
+from pipexl import InputWorkbookModel, LayoutIndex, Profile, XmlReader
+
+from .test_main import CONFIG, TEST_RECORDS, JOIN_RECORDS, WorkbookforTesting
+
+
+@pytest.fixture
+def indexed_models(tmp_path):
+    """Return model classes for book_a.xlsx that share a LayoutIndex."""
+    index = LayoutIndex(tmp_path / 'layout')
+
+    class FirstTableWorkbook(InputWorkbookModel):
+        name_pattern = WorkbookforTesting.name_pattern
+        layout_index = index
+        InputTableForTesting = WorkbookforTesting.InputTableForTesting
+
+    class BothTablesWorkbook(WorkbookforTesting):
+        layout_index = index
+        reader_class = XmlReader
+        InputTableForTesting = WorkbookforTesting.InputTableForTesting
+        JoinTable = WorkbookforTesting.JoinTable
+
+    return FirstTableWorkbook, BothTablesWorkbook
+
+
+def scanned_rows(model_class, config):
+    """Return the model loaded from `config` and the number of rows that were
+    scanned to load it."""
+    with Profile() as profile:
+        model = model_class(config)
+    return model, sum(event['rows_scanned'] for event in profile.events
+                      if event['event'] == 'worksheet_scanned')
+
+
+def test_loads_read_only_indexed_rows(indexed_models):
+    first_table_workbook, both_tables_workbook = indexed_models
+    config = {name: CONFIG['WorkbookforTesting']
+              for name in ('FirstTableWorkbook', 'BothTablesWorkbook')}
+    for expected_rows in (19, 15):  # First the whole scan, then rows 5-19
+        model, rows = scanned_rows(first_table_workbook, config)
+        assert rows == expected_rows
+        assert model.test_table.astuples() == TEST_RECORDS.astuples()
+        assert model.test_table.source.start_row == 6
+        assert model.test_table.source.end_row == 19
+    for expected_rows in (45, 41):  # join_table is not indexed at first
+        model, rows = scanned_rows(both_tables_workbook, config)
+        assert rows == expected_rows
+        assert model.test_table.astuples() == TEST_RECORDS.astuples()
+        assert model.join_table.astuples() == JOIN_RECORDS.astuples()
+    layout = first_table_workbook.layout_index.get(model.workbook_path)
+    assert layout['sheet_a']['join_table_marker'] == dict(
+        marker_row=27, marker_col=3, stop_col=8, end_row=None,
+        header_fields=['key_a', 'key_b', 'key_c', 'detail_a', 'detail_b'],
+    )
+
+
+def test_describe(indexed_models, monkeypatch):
+    _, both_tables_workbook = indexed_models
+    config = dict(BothTablesWorkbook=CONFIG['WorkbookforTesting'])
+    description = WorkbookforTesting.describe(CONFIG)
+    assert both_tables_workbook.describe(config) == description
+    assert [d['table'] for d in description] == ['test_table', 'join_table']
+    assert description[0]['marker_row'] == 5
+    assert description[0]['columns'] == 'C:I'
+    assert description[0]['end_row'] == 19
+    assert description[1]['header_fields'] == JOIN_RECORDS.fields
+
+    def fail(*args):
+        raise AssertionError('the workbook should not be read')
+    monkeypatch.setattr(both_tables_workbook, 'reader_class', fail)
+    assert both_tables_workbook.describe(config) == description
+
+
+def test_changed_workbook_is_indexed_again(indexed_models, tmp_path):
+    first_table_workbook, _ = indexed_models
+    shutil.copy('test/resources/book_a.xlsx', tmp_path)
+    config = dict(FirstTableWorkbook=str(tmp_path))
+    model = first_table_workbook(config)
+    index = first_table_workbook.layout_index
+    assert index.get(model.workbook_path)
+    stat = os.stat(model.workbook_path)
+    os.utime(model.workbook_path, ns=(stat.st_atime_ns,
+                                      stat.st_mtime_ns + 10**9))
+    assert index.get(model.workbook_path) == {}
+    index.clear()
+    assert not list(index.directory.iterdir())
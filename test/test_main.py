@@ -1,9 +1,13 @@
 """Tests for top level pipexl package."""
 
+import os
+
+from openpyxl import Workbook, load_workbook
 import pytest
 
 from pipexl import InputTable, InputWorkbookModel
 from pipexl.recordset import add_tuples
+import pipexl.workbook
 
 
 class WorkbookforTesting(InputWorkbookModel):
@@ -188,6 +192,99 @@ def test_summation_by_summable_key():
     ]
 
 
+def test_single_pass_matches_separate_loads():
+    """Tables sharing a worksheet are loaded in one pass with the same results
+    as loading each table by itself."""
+    workbook = load_workbook(WORKBOOK.workbook_path,
+                             read_only=True,
+                             data_only=True)
+    for table_class, records in (
+            (WorkbookforTesting.InputTableForTesting, TEST_RECORDS),
+            (WorkbookforTesting.JoinTable, JOIN_RECORDS),
+    ):
+        table = table_class()
+        separate = table.load(workbook)
+        assert separate.fields == records.fields
+        assert [r.astuple for r in separate] == [r.astuple for r in records]
+        assert (table.start_row, table.start_col, table.stop_col) == (
+            records.source.start_row,
+            records.source.start_col,
+            records.source.stop_col,
+        )
+    workbook.close()
+
+
+class LazyWorkbookForTesting(WorkbookforTesting):
+    """Same tables as WorkbookforTesting, loaded on first access."""
+    lazy = True
+    InputTableForTesting = WorkbookforTesting.InputTableForTesting
+    JoinTable = WorkbookforTesting.JoinTable
+
+
+def test_lazy_loading():
+    config = dict(LazyWorkbookForTesting=CONFIG['WorkbookforTesting'])
+    with LazyWorkbookForTesting(config) as workbook:
+        assert 'join_table' not in vars(workbook)
+        join_records = workbook.join_table
+        assert join_records.astuples() == JOIN_RECORDS.astuples()
+        assert workbook.join_table is join_records
+        assert 'test_table' not in vars(workbook)
+        assert workbook._reader is not None
+    assert workbook._reader is None
+    assert workbook.test_table.astuples() == TEST_RECORDS.astuples()
+    workbook.close()
+    assert LazyWorkbookForTesting.join_table is WorkbookforTesting.JoinTable
+
+
+class ProjectedWorkbookForTesting(InputWorkbookModel):
+    """Loads part of the test table."""
+    name_pattern = 'book_?.xlsx'
+
+    class InputTableForTesting(InputTable):
+        worksheet_name = 'sheet_a'
+        name = 'test_table'
+        table_marker = 'test_table_marker'
+        required_fields = ('key_a', 'value_b', 'jan_19')
+        normalize_fields = ('value_b',)
+        filters = dict(key_b='Total')
+        predicate_fields = ('value_a', 'feb_19')
+        predicate = staticmethod(lambda value_a, feb_19: value_a > 50
+                                 and feb_19 is not None)
+
+
+def test_projection_and_predicate():
+    config = dict(ProjectedWorkbookForTesting=CONFIG['WorkbookforTesting'])
+    records = ProjectedWorkbookForTesting(config).test_table
+    assert records.fields == ('key_a', 'value_b', 'jan_19')
+    assert records.astuples() == [
+        (r.key_a, r.value_b, r.jan_19) for r in TEST_RECORDS
+        if r.value_a > 50 and r.feb_19 is not None
+    ]
+    assert records.source.stop_col == TEST_RECORDS.source.stop_col
+
+
+class NormalizedWorkbookForTesting(InputWorkbookModel):
+    """Loads the test table with a custom normalizer."""
+    name_pattern = 'book_?.xlsx'
+
+    class InputTableForTesting(InputTable):
+        worksheet_name = 'sheet_a'
+        name = 'test_table'
+        table_marker = 'test_table_marker'
+        normalize_fields = ('key_a', 'value_b')
+        normalizers = dict(key_a=str.upper)
+        filters = dict(key_b='Total')
+
+
+def test_normalizers():
+    config = dict(NormalizedWorkbookForTesting=CONFIG['WorkbookforTesting'])
+    records = NormalizedWorkbookForTesting(config).test_table
+    assert [r.key_a for r in records] == [r.key_a.upper()
+                                          for r in TEST_RECORDS]
+    assert [r.value_b for r in records] == [r.value_b for r in TEST_RECORDS]
+    assert records.source.definition() != TEST_RECORDS.source.definition()
+
+
 @pytest.mark.parametrize("test_input_1,test_input_2,expected", [
     ((), (), ()),  # degenerate case
     ((1,), (2,), (3,)),  # degenerate case
@@ -203,3 +300,131 @@ def test_add_tuples(test_input_1, test_input_2, expected):
             add_tuples(test_input_1, test_input_2)
     else:
         assert add_tuples(test_input_1, test_input_2) == expected
+
+
+def test_lazy_query_pushdown():
+    config = dict(LazyWorkbookForTesting=CONFIG['WorkbookforTesting'])
+    with LazyWorkbookForTesting(config) as workbook:
+        query = workbook.query('test_table').where(
+            value_a=lambda value: value > 50
+        )
+        result = query.select('key_a', 'value_b').collect()
+        assert result.source.predicate_fields == ('value_a',)
+        assert result.source.required_fields == ('key_a', 'value_b')
+        assert result.astuples() == [(r.key_a, r.value_b)
+                                     for r in TEST_RECORDS if r.value_a > 50]
+        result = query.select('key_a', 'feb_19').collect()
+        assert result.fields == ('key_a', 'feb_19')
+        assert result.astuples() == [(r.key_a, r.feb_19) for r in TEST_RECORDS
+                                     if r.value_a > 50]
+        assert 'test_table' not in vars(workbook)
+        normalized = workbook.query('test_table').where(value_b='so_1_qp')
+        assert normalized.collect().astuples() == [
+            r for r in TEST_RECORDS if r.value_b == 'so_1_qp'
+        ]
+        assert workbook.query('join_table').sum_by('key_a') == \
+            JOIN_RECORDS.sum_by('key_a')
+
+
+def test_source_rows():
+    duplicates = TEST_RECORDS.find_duplicates('key_a')
+    assert duplicates.fields == ('key_a', 'position', 'row')
+    assert [record.position for record in duplicates] == [1, 2, 5, 6, 7, 8]
+    assert TEST_RECORDS.source.filtered_rows  # Rows hit by the filter
+    positions = range(len(TEST_RECORDS))
+    rows = TEST_RECORDS.source_rows(positions)
+    assert [record.row for record in duplicates] == [
+        rows[record.position] for record in duplicates
+    ]
+    workbook = load_workbook(WORKBOOK.workbook_path,
+                             read_only=True,
+                             data_only=True)
+    sheet_rows = list(workbook['sheet_a'].iter_rows(values_only=True))
+    key_col = (TEST_RECORDS.source.start_col
+               + TEST_RECORDS.fields.index('key_a'))
+    assert [sheet_rows[row - 1][key_col] for row in rows] == [
+        record.key_a for record in TEST_RECORDS
+    ]
+    workbook.close()
+
+
+class ReloadedWorkbookForTesting(InputWorkbookModel):
+    name_pattern = 'book_*.xlsx'
+
+    class TableA(InputTable):
+        worksheet_name = 'sheet_a'
+        table_marker = 'marker_a'
+
+    class TableB(InputTable):
+        worksheet_name = 'sheet_b'
+        table_marker = 'marker_b'
+
+
+class PartitionedReloadedWorkbookForTesting(ReloadedWorkbookForTesting):
+    partitioned = True
+    TableA = ReloadedWorkbookForTesting.TableA
+    TableB = ReloadedWorkbookForTesting.TableB
+
+
+def write_reloaded_workbook(path, amount_a, amount_b):
+    """Write a workbook for ReloadedWorkbookForTesting, with a later mtime
+    than any earlier version."""
+    workbook = Workbook()
+    workbook.active.title = 'sheet_a'
+    workbook.create_sheet('sheet_b')
+    for worksheet_name, amount in (('sheet_a', amount_a),
+                                   ('sheet_b', amount_b)):
+        worksheet = workbook[worksheet_name]
+        worksheet.append(['marker' + worksheet_name[-2:]])
+        worksheet.append(['key', 'amount'])
+        worksheet.append(['x', amount])
+    workbook.save(path)
+    mtime = os.stat(path).st_mtime_ns + 10**9 * len(os.listdir(path.parent))
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_reload(tmp_path):
+    config = dict(ReloadedWorkbookForTesting=str(tmp_path),
+                  PartitionedReloadedWorkbookForTesting=str(tmp_path))
+    write_reloaded_workbook(tmp_path / 'book_1.xlsx', 1, 2)
+    workbook = ReloadedWorkbookForTesting(config)
+    partitioned = PartitionedReloadedWorkbookForTesting(config)
+    a_table = workbook.a_table
+    assert workbook.reload(config) == []
+    write_reloaded_workbook(tmp_path / 'book_1.xlsx', 1, 3)
+    assert workbook.reload(config) == ['b_table']
+    assert workbook.a_table is a_table
+    assert workbook.b_table.astuples() == [('x', 3)]
+    # A new workbook with the same worksheets does not need reading.
+    write_reloaded_workbook(tmp_path / 'book_2.xlsx', 1, 3)
+    assert workbook.reload(config) == []
+    assert workbook.workbook_path.endswith('book_2.xlsx')
+    assert workbook.a_table is a_table
+    write_reloaded_workbook(tmp_path / 'book_3.xlsx', 4, 3)
+    assert next(workbook.watch(config, interval=0)) == ['a_table']
+    assert workbook.a_table.astuples() == [('x', 4)]
+
+    partition_a = partitioned.a_table.partitions[0]
+    assert sorted(partitioned.reload(config)) == ['a_table', 'b_table']
+    assert partitioned.a_table.partitions[0] is partition_a
+    assert partitioned.a_table.astuples() == [('x', 1)] * 2 + [('x', 4)]
+    assert partitioned.b_table.astuples() == [('x', 3)] * 3
+    assert partitioned.reload(config) == []
+
+
+def test_watch(tmp_path, monkeypatch):
+    config = dict(ReloadedWorkbookForTesting=str(tmp_path))
+    book_1 = tmp_path / 'book_1.xlsx'
+    write_reloaded_workbook(book_1, 1, 2)
+    workbook = ReloadedWorkbookForTesting(config)
+    polls = []
+    # Run between polls: replace the workbook, leaving the directory empty
+    # for one poll, then leave the new version alone.
+    actions = [book_1.unlink,
+               lambda: write_reloaded_workbook(book_1, 1, 5),
+               lambda: None, lambda: None]
+    monkeypatch.setattr(pipexl.workbook, 'sleep',
+                        lambda interval: polls.append(actions.pop(0)()))
+    assert next(workbook.watch(config, interval=0)) == ['b_table']
+    assert len(polls) == 3  # Empty, new, then stable
+    assert workbook.b_table.astuples() == [('x', 5)]
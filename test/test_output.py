@@ -0,0 +1,87 @@
+"""Tests for pipexl.output."""
+
+from openpyxl import load_workbook
+import pytest
+
+from pipexl import (InputTable, InputWorkbookModel, OutputTable,
+                    OutputWorkbookModel, PipelineFailure)
+
+from .test_main import TEST_RECORDS
+
+
+class OutputWorkbookForTesting(OutputWorkbookModel):
+    name_pattern = 'output_book_{num:03}.xlsx'
+
+    class Results(OutputTable):
+        worksheet_name = 'results'
+        table_marker = 'results_marker'
+        fields = ('kind', 'key', 'amount')
+
+
+class ResultsWorkbook(InputWorkbookModel):
+    """Model for reading back OutputWorkbookForTesting."""
+    name_pattern = 'output_book_*.xlsx'
+
+    class Results(InputTable):
+        worksheet_name = 'results'
+        table_marker = 'results_marker'
+
+    class Messages(InputTable):
+        worksheet_name = 'metadata'
+        table_marker = 'messages'
+
+    class Sources(InputTable):
+        worksheet_name = 'metadata'
+        table_marker = 'sources'
+
+
+ROWS = [(kind, f'key_{i}', i * 0.5) for i in range(50) for kind in 'xy']
+
+
+def test_write_and_read_back(tmp_path):
+    config = dict(OutputWorkbookForTesting=str(tmp_path),
+                  ResultsWorkbook=str(tmp_path))
+    with OutputWorkbookForTesting(config, TEST_RECORDS) as output:
+        for values in ROWS[:-1]:
+            output.results_table.add_tuple(values)
+        output.results_table.add_tuples(ROWS[-1:])
+        output.write_records(TEST_RECORDS.sum_by('key_a'))
+        output.record_warning('a warning')
+        output.record_error('an error')
+        with pytest.raises(ValueError):
+            output.results_table.add_tuple(('x', 'key'))
+    assert output.workbook_path == str(tmp_path / 'output_book_001.xlsx')
+    assert output.results_table.row_count == len(ROWS)
+    results = ResultsWorkbook(config)
+    assert results.results_table.astuples() == ROWS
+    assert [vars(r) for r in results.messages_table] == [
+        dict(level='error', message='an error'),
+        dict(level='warning', message='a warning'),
+    ]
+    assert results.sources_table.astuples() == [
+        ('test_table', 10, 'sheet_a', 'test_table_marker', 6)
+    ]
+    workbook = load_workbook(output.workbook_path, read_only=True)
+    assert workbook.sheetnames == ['results', 'test_table_by_key_a',
+                                   'metadata']
+    rows = list(workbook['test_table_by_key_a'].values)
+    assert rows[0] == TEST_RECORDS.sum_by('key_a').fields
+    for row, values in zip(rows[1:], TEST_RECORDS.sum_by('key_a').astuples()):
+        assert row == pytest.approx(values)  # Excel keeps 15 digits
+    assert len(rows) == 7
+    workbook.close()
+    with OutputWorkbookForTesting(config) as output:
+        assert output.workbook_path == str(tmp_path / 'output_book_002.xlsx')
+
+
+def test_fail(tmp_path):
+    config = dict(OutputWorkbookForTesting=str(tmp_path),
+                  ResultsWorkbook=str(tmp_path))
+    with pytest.raises(PipelineFailure):
+        with OutputWorkbookForTesting(config) as output:
+            output.results_table.add_tuple(('x', 'key', 1))
+            output.fail('bad keys')
+    results = ResultsWorkbook(config)
+    assert results.results_table.astuples() == [('x', 'key', 1)]
+    assert results.messages_table.astuples() == [('error', 'bad keys')]
+    assert results.sources_table.astuples() == []
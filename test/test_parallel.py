@@ -0,0 +1,150 @@
+"""Tests for loading in worker processes and from asyncio."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+
+from openpyxl import Workbook
+import pytest
+
+from pipexl import (InputTable, InputWorkbookModel, aload_models,
+                    load_models)
+import pipexl.workbook
+
+from .test_main import CONFIG, TEST_RECORDS, JOIN_RECORDS, WorkbookforTesting
+
+
+class TwoSheetWorkbook(InputWorkbookModel):
+    """Model for a generated workbook with a table on each of two sheets."""
+    name_pattern = 'two_sheets.xlsx'
+    max_workers = 2
+
+    class FirstTable(InputTable):
+        worksheet_name = 'first'
+        table_marker = 'first_marker'
+        filters = dict(key='Total')
+
+    class SecondTable(InputTable):
+        worksheet_name = 'second'
+        table_marker = 'second_marker'
+
+
+class SerialTwoSheetWorkbook(TwoSheetWorkbook):
+    max_workers = 1
+    FirstTable = TwoSheetWorkbook.FirstTable
+    SecondTable = TwoSheetWorkbook.SecondTable
+
+
+class SlowWorkbook(SerialTwoSheetWorkbook):
+    """Takes a while to load."""
+    def __init__(self, config=None):
+        time.sleep(0.5)
+        super().__init__(config)
+
+
+@pytest.fixture
+def config(tmp_path):
+    workbook = Workbook()
+    for worksheet_name, offset in (('first', 0), ('second', 2)):
+        sheet = workbook.create_sheet(worksheet_name)
+        for _ in range(offset):
+            sheet.append([])
+        sheet.append([None, worksheet_name + '_marker'])
+        sheet.append([None, 'key', 'Amount'])
+        for i in range(20):
+            sheet.append([None, f'key_{i % 3}', i * 1.5])
+        sheet.append([None, 'Total', 999])
+    workbook.save(tmp_path / 'two_sheets.xlsx')
+    return dict(TwoSheetWorkbook=str(tmp_path),
+                SerialTwoSheetWorkbook=str(tmp_path))
+
+
+def test_parallel_sheets_match_serial(config):
+    parallel = TwoSheetWorkbook(config)
+    serial = SerialTwoSheetWorkbook(config)
+    for name in ('first_table', 'second_table'):
+        expected = getattr(serial, name)
+        records = getattr(parallel, name)
+        assert records.fields == expected.fields == ('key', 'amount')
+        assert records.astuples() == expected.astuples()
+        assert vars(records.grand_total) == vars(expected.grand_total)
+        assert records.source is not expected.source
+        assert records.source.__getstate__() == expected.source.__getstate__()
+    assert parallel.first_table.source.start_row == 2
+    assert parallel.second_table.source.start_row == 4
+
+
+def test_load_models(config):
+    config = dict(config, **CONFIG)
+    book_a, two_sheets = load_models([WorkbookforTesting, TwoSheetWorkbook],
+                                     config, max_workers=2)
+    assert isinstance(book_a, WorkbookforTesting)
+    assert isinstance(two_sheets, TwoSheetWorkbook)
+    assert book_a.workbook_path == WorkbookforTesting(config).workbook_path
+    for expected in (TEST_RECORDS, JOIN_RECORDS):
+        records = getattr(book_a, expected.source.name)
+        assert records.astuples() == expected.astuples()
+        assert records.normalize_fields == expected.normalize_fields
+        assert records.source.start_row == expected.source.start_row
+    assert len(two_sheets.second_table) == 21
+
+
+def test_aload(config):
+    model = asyncio.run(SerialTwoSheetWorkbook.aload(config))
+    assert isinstance(model, SerialTwoSheetWorkbook)
+    assert model.first_table.astuples() == \
+        SerialTwoSheetWorkbook(config).first_table.astuples()
+
+
+@pytest.mark.parametrize('executor_class', [ThreadPoolExecutor,
+                                            ProcessPoolExecutor])
+def test_aload_models(config, executor_class):
+    config = dict(config, **CONFIG)
+    with executor_class(2) as executor:
+        book_a, two_sheets = asyncio.run(aload_models(
+            [WorkbookforTesting, SerialTwoSheetWorkbook], config,
+            executor=executor, max_concurrency=1
+        ))
+    assert book_a.test_table.astuples() == TEST_RECORDS.astuples()
+    assert len(two_sheets.second_table) == 21
+
+
+def test_aload_models_timeout(config):
+    config = dict(config, SlowWorkbook=config['TwoSheetWorkbook'])
+    models = asyncio.run(aload_models(
+        [SerialTwoSheetWorkbook, SlowWorkbook], config, timeout=0.2,
+        return_exceptions=True
+    ))
+    assert isinstance(models[0], SerialTwoSheetWorkbook)
+    assert isinstance(models[1], asyncio.TimeoutError)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(SlowWorkbook.aload(config, timeout=0.2))
+
+
+def test_aload_cancel(config):
+    config = dict(config, SlowWorkbook=config['TwoSheetWorkbook'])
+
+    async def cancel_load():
+        task = asyncio.ensure_future(SlowWorkbook.aload(config))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancel_load())
+
+
+def no_pool(*args, **kwargs):
+    raise AssertionError('a worker should not start a pool')
+
+
+def test_build_in_worker_is_serial(config, monkeypatch):
+    monkeypatch.setattr(pipexl.workbook, 'ProcessPoolExecutor', no_pool)
+    model = TwoSheetWorkbook.build_in_worker(config)
+    assert '_serial' not in vars(model)
+    assert model.second_table.astuples() == \
+        SerialTwoSheetWorkbook(config).second_table.astuples()
+    records, = TwoSheetWorkbook.load_partition(
+        model.workbook_path, [TwoSheetWorkbook.FirstTable], serial=True
+    )
+    assert records.astuples() == model.first_table.astuples()
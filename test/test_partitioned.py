@@ -0,0 +1,72 @@
+"""Tests for pipexl.partitioned."""
+
+import shutil
+
+import pytest
+
+from pipexl import PartitionedRecordSet, RecordSet
+
+from .test_main import TEST_RECORDS, JOIN_RECORDS, WorkbookforTesting
+
+
+class PartitionedWorkbook(WorkbookforTesting):
+    """Loads every workbook matching book_?.xlsx."""
+    partitioned = True
+    InputTableForTesting = WorkbookforTesting.InputTableForTesting
+    JoinTable = WorkbookforTesting.JoinTable
+
+
+class ParallelPartitionedWorkbook(PartitionedWorkbook):
+    max_workers = 2
+    InputTableForTesting = WorkbookforTesting.InputTableForTesting
+    JoinTable = WorkbookforTesting.JoinTable
+
+
+@pytest.fixture
+def config(tmp_path):
+    """A directory with two copies of the test workbook."""
+    for name in ('book_a.xlsx', 'book_b.xlsx'):
+        shutil.copy('test/resources/book_a.xlsx', tmp_path / name)
+    return dict(PartitionedWorkbook=str(tmp_path),
+                ParallelPartitionedWorkbook=str(tmp_path))
+
+
+@pytest.mark.parametrize("model_class", [PartitionedWorkbook,
+                                         ParallelPartitionedWorkbook])
+def test_partitioned_model(config, model_class):
+    workbook = model_class(config)
+    assert [p.rsplit('/', 1)[-1] for p in workbook.workbook_paths] == [
+        'book_a.xlsx', 'book_b.xlsx'
+    ]
+    for expected in (TEST_RECORDS, JOIN_RECORDS):
+        records = getattr(workbook, expected.source.name)
+        assert isinstance(records, PartitionedRecordSet)
+        assert records.partition_names == workbook.workbook_paths
+        assert records.fields == expected.fields
+        assert records.astuples() == expected.astuples() * 2
+        assert len(records) == 2 * len(expected)
+        assert [s.start_row for s in records.sources] == \
+            [expected.source.start_row] * 2
+    records = workbook.test_table
+    assert records.locate(len(TEST_RECORDS)) == (1, 0)
+    assert records[len(TEST_RECORDS)].astuple == TEST_RECORDS[0].astuple
+    assert vars(records.grand_total) == pytest.approx(
+        {k: 2 * v for k, v in vars(TEST_RECORDS.grand_total).items()}
+    )
+
+
+def test_sum_by_and_make_index():
+    partitions = [
+        RecordSet('thing', ('key', 'amount', 'label'),
+                  [('x', 1, 'a'), ('y', 2, 'b')]),
+        RecordSet('thing', ('key', 'amount', 'label'),
+                  [('y', 3, 'c'), ('z', None, 'd'), ('x', 4, 'e')]),
+    ]
+    records = PartitionedRecordSet(partitions, ['first', 'second'])
+    assert records.sum_by('key').astuples() == [
+        ('x', 5), ('y', 5), ('z', 0)
+    ]
+    index = records.make_index('key')
+    assert [r.label for r in index['x']] == ['a', 'e']
+    assert list(records.iter_with_partition())[2] == (1, partitions[1][0])
+    assert vars(records.grand_total) == dict(amount=10)
@@ -0,0 +1,223 @@
+"""Tests for pipexl.recordset."""
+
+from datetime import datetime
+import pickle
+
+import pytest
+
+from pipexl import ColumnarRecordSet, RecordSet
+from pipexl.recordset import make_record_class
+
+FIELDS = ('key', 'amount', '_note')
+
+
+def test_record_access():
+    record_class = make_record_class('thing', FIELDS)
+    record = record_class('x', 1.5, None)
+    assert record.key == record['key'] == record[0] == 'x'
+    assert record._note is None
+    assert record.fields == FIELDS
+    assert record.astuple == ('x', 1.5, None)
+    assert vars(record) == dict(key='x', amount=1.5, _note=None)
+    assert record == record_class(key='x', amount=1.5, _note=None)
+    assert repr(record) == "thing(key='x', amount=1.5, _note=None)"
+    with pytest.raises(KeyError):
+        record['count']  # Not the tuple method
+    with pytest.raises(KeyError):
+        record['fields']
+    with pytest.raises(AttributeError):
+        record.key = 'y'
+    with pytest.raises(TypeError):
+        record_class._make(('x', 1.5))
+
+
+def test_records_are_compact():
+    record = make_record_class('thing', FIELDS)('x', 1.5, None)
+    assert not hasattr(record, '__weakref__')
+    assert '__dict__' not in type(record).__slots__
+    assert record.__class__.__dict__['__slots__'] == ()
+
+
+def test_record_classes_are_cached():
+    assert make_record_class('thing', FIELDS) is \
+        make_record_class('thing', list(FIELDS))
+    assert make_record_class('thing', FIELDS) is not \
+        make_record_class('other', FIELDS)
+    records = RecordSet('thing', FIELDS, [('x', 1, None), ('y', 2, None)])
+    assert records.record_class is make_record_class('thing', FIELDS)
+    assert records.sum_by('key').record_class is \
+        records.sum_by('key').record_class
+
+
+def test_records_pickle():
+    records = RecordSet('thing', FIELDS, [('x', 1, None), ('y', 2, None)])
+    assert pickle.loads(pickle.dumps(records[1])) == records[1]
+    assert pickle.loads(pickle.dumps(records[1])).__class__ is \
+        records.record_class
+
+
+ORDERS = RecordSet('order', ('key', 'region', 'amount'), [
+    ('a', 'north', 1), ('b', 'south', 2), ('c', 'north', 3), ('a', 'east', 4),
+])
+PRICES = RecordSet('price', ('key', 'region', 'price'), [
+    ('a', 'north', 10), ('b', 'south', 20), ('b', 'south', 21),
+    ('d', 'west', 40),
+])
+
+
+@pytest.mark.parametrize('extra_prices', [0, 5])  # Either side smaller
+def test_join(extra_prices):
+    left = ORDERS
+    right = RecordSet('price', PRICES.fields,
+                      PRICES + [('z', 'west', 0)] * extra_prices)
+    inner = left.join(right, on='key')
+    assert inner.fields == ('key', 'region', 'amount', 'region_2', 'price')
+    assert inner.record_class.__name__ == 'order_join_price'
+    assert inner.astuples() == [
+        ('a', 'north', 1, 'north', 10), ('b', 'south', 2, 'south', 20),
+        ('b', 'south', 2, 'south', 21), ('a', 'east', 4, 'north', 10),
+    ]
+    assert inner.grand_total.amount == 9
+    left_join = left.join(right, on=('key', 'region'), how='left')
+    assert left_join.fields == ('key', 'region', 'amount', 'price')
+    assert left_join.astuples() == [
+        ('a', 'north', 1, 10), ('b', 'south', 2, 20), ('b', 'south', 2, 21),
+        ('c', 'north', 3, None), ('a', 'east', 4, None),
+    ]
+    anti = left.join(right, on=('key', 'region'), how='anti')
+    assert anti.fields == left.fields
+    assert anti.astuples() == [('c', 'north', 3), ('a', 'east', 4)]
+
+
+def test_join_index_is_cached():
+    lookup = RecordSet('price', PRICES.fields, PRICES)
+    ORDERS.join(lookup, on='key')
+    index = lookup._cached_index(('key',))
+    ORDERS.join(lookup, on='key', how='anti')
+    assert lookup._cached_index(('key',)) is index
+    lookup.append(lookup.record_class('e', 'east', 50))
+    assert lookup._cached_index(('key',)) is not index
+    assert ORDERS.join(lookup, on='key', how='anti').astuples() == [
+        ('c', 'north', 3)
+    ]
+    small = RecordSet('thing', ('k', 'n'), [('x', 1), ('y', 2)])
+    big = RecordSet('other', ('k', 'm'), [('x', 20), ('y', 10)])
+    big.join(small, 'k')
+    small.sort(reverse=True)
+    assert big.join(small, 'k').astuples() == [('x', 20, 1), ('y', 10, 2)]
+    small[0] = small.record_class('x', 3)
+    assert big.join(small, 'k', how='anti').astuples() == [('y', 10)]
+
+
+def test_grouping_sets():
+    records = RecordSet('thing', ('key_1', 'key_2', 'label', 'x', 'y'), [
+        ('a', 'p', 'one', 1, 0.5), ('b', 'q', 'two', 2, None),
+        ('a', 'q', 'three', None, 1.5), ('a', 'p', 'four', 4, 2.5),
+    ])
+    by_1, by_2, by_both = records.grouping_sets('key_1', ('key_2',),
+                                                ('key_1', 'key_2'))
+    assert by_1 == records.sum_by('key_1')
+    assert by_1.record_class is records.sum_by('key_1').record_class
+    assert by_2 == records.sum_by('key_2')
+    assert by_both == records.sum_by('key_1', 'key_2')
+    assert by_both.astuples() == [('a', 'p', 5, 3.0), ('a', 'q', 0, 1.5),
+                                  ('b', 'q', 2, 0)]
+    assert records.rollup('key_1', 'key_2') == [by_1, by_both]
+
+
+def test_intern_fields():
+    tuples = [(''.join(['k', 'e', 'y']), i) for i in range(3)]
+    assert tuples[0][0] is not tuples[1][0]
+    records = RecordSet('thing', ('key', 'amount'), tuples,
+                        intern_fields=('key',))
+    assert records[0].key is records[1].key is records[2].key
+    assert records.astuples() == tuples
+
+
+def test_intern_fields_keeps_other_values():
+    tuples = [(True, 1.0), (1, 1), (0, 0.0), (False, 0)]
+    records = RecordSet('thing', ('a', 'b'), tuples, intern_fields=('a', 'b'))
+    assert [tuple(map(type, t)) for t in records.astuples()] == [
+        tuple(map(type, t)) for t in tuples
+    ]
+
+
+def test_each_value_is_normalized_once():
+    calls = []
+
+    def normalizer(value):
+        calls.append(value)
+        return value.upper()
+
+    records = RecordSet('thing', ('key', 'label'),
+                        [('a', 'Foo Bar'), ('b', 'Foo Bar'), ('a', 'x?')],
+                        normalize_fields=('key', 'label'),
+                        normalizers=dict(key=normalizer))
+    assert records.astuples() == [('A', 'foo_bar'), ('B', 'foo_bar'),
+                                  ('A', 'is_x')]
+    assert calls == ['a', 'b']
+
+
+def test_query():
+    records = RecordSet('thing', ('key_1', 'key_2', 'label', 'x', 'y'), [
+        ('a', 'p', 'one', 1, 0.5), ('b', 'q', 'two', 2, None),
+        ('a', 'q', 'three', None, 1.5), ('a', 'p', 'four', 4, 2.5),
+    ])
+    query = records.where(key_1='a').select('key_2', 'label', 'y')
+    assert query.steps[-1] == ('select', ('key_2', 'label', 'y'))
+    result = query.where(lambda r: r.y > 1).collect()
+    assert isinstance(result, RecordSet)
+    assert result.fields == ('key_2', 'label', 'y')
+    assert result.astuples() == [('q', 'three', 1.5), ('p', 'four', 2.5)]
+    assert result.grand_total.y == 4.0
+    assert [r.label for r in query] == ['one', 'three', 'four']
+    where = records.where(x=lambda x: x is not None)
+    assert where.sum_by('key_1') == where.collect().sum_by('key_1')
+    assert where.sum_by('key_1').astuples() == [('a', 5, 3.0), ('b', 2, 0)]
+    assert where.select('key_1', 'label', 'y').sum_by('key_1').astuples() \
+        == [('a', 3.0), ('b', 0)]
+
+
+def test_key_validation():
+    assert ORDERS.find_duplicates('key').astuples() == [('a', 0, None),
+                                                        ('a', 3, None)]
+    assert PRICES.find_duplicates('key', 'region').astuples() == [
+        ('b', 'south', 1, None), ('b', 'south', 2, None)
+    ]
+    missing = ORDERS.anti_join_keys(PRICES, 'key')
+    assert missing.record_class.__name__ == 'order_keys_not_in_price'
+    assert missing.astuples() == [('c', 2, None)]
+    assert PRICES.anti_join_keys(ORDERS, 'key', 'region').astuples() == [
+        ('d', 'west', 3, None)
+    ]
+    small = RecordSet('thing', ('k', 'n'), [('x', 1), ('y', 2)])
+    big = RecordSet('other', ('k', 'm'), [('x', 20), ('y', 10)])
+    assert not small.anti_join_keys(big, 'k')
+    small[0] = small.record_class('q', 1)
+    assert small.anti_join_keys(big, 'k').astuples() == [('q', 0, None)]
+
+
+@pytest.mark.parametrize('record_set_class', [RecordSet, ColumnarRecordSet])
+def test_melt_and_pivot(record_set_class):
+    records = record_set_class('sales', ('key', 'kind', 'jan_19', 'feb_19'), [
+        ('a', 'x', 1, 2), ('b', 'y', None, 4), ('a', 'z', 5, None),
+    ])
+    melted = records.melt(('key', 'kind'), date_format='%b-%y')
+    assert isinstance(melted, record_set_class)
+    assert melted.fields == ('key', 'kind', 'variable', 'value')
+    january = datetime(2019, 1, 1)
+    assert melted.astuples() == [
+        ('a', 'x', january, 1), ('b', 'y', january, None),
+        ('a', 'z', january, 5), ('a', 'x', datetime(2019, 2, 1), 2),
+        ('b', 'y', datetime(2019, 2, 1), 4), ('a', 'z', datetime(2019, 2, 1),
+                                              None),
+    ]
+    assert records.melt('key', ['feb_19']).astuples() == [
+        ('a', 'feb_19', 2), ('b', 'feb_19', 4), ('a', 'feb_19', None),
+    ]
+    pivoted = melted.pivot(('key', 'kind'), 'variable', 'value')
+    assert pivoted.fields == records.fields
+    assert pivoted.astuples() == records.astuples()
+    by_key = melted.pivot('key', 'variable', 'value')
+    assert by_key.astuples() == [('a', 6, 2), ('b', None, 4)]
+    assert by_key.grand_total.astuple == (6, 6)
@@ -0,0 +1,96 @@
+"""Tests for schema inference and declared schemas."""
+
+from datetime import datetime
+
+import pytest
+
+from pipexl import (ColumnarRecordSet, InputTable, InputWorkbookModel,
+                    PartitionedRecordSet, RecordSet, SchemaError)
+from pipexl.schema import Schema
+
+FIELDS = ('key', 'amount', 'day', 'flag', 'blank', 'note')
+TUPLES = [
+    ('a', 1, datetime(2019, 1, 1), True, None, 'x'),
+    ('b', 2.5, None, False, None, 3),
+    ('c', None, datetime(2019, 1, 3), True, None, None),
+]
+EXPECTED = Schema(dict(key='text', amount='numeric', day='date',
+                       flag='boolean', blank='empty', note='mixed'),
+                  nullable=('amount', 'day', 'blank', 'note'))
+
+
+@pytest.mark.parametrize('record_set_class', [RecordSet, ColumnarRecordSet])
+def test_inferred_schema(record_set_class):
+    records = record_set_class('thing', FIELDS, TUPLES)
+    assert records.schema == EXPECTED
+    assert records.grand_total.fields == ('amount', 'flag', 'blank')
+    assert records.grand_total.astuple == (3.5, 2, 0)
+    partitioned = PartitionedRecordSet([records, RecordSet('thing', FIELDS, [
+        ('d', 4, 'not a date', 1, None, 'y'),
+    ])])
+    assert partitioned.schema.kinds['day'] == 'mixed'
+    assert partitioned.schema.kinds['flag'] == 'numeric'
+    assert partitioned.grand_total.fields == ('amount', 'flag', 'blank')
+
+
+def test_declared_schema():
+    records = RecordSet('thing', FIELDS, TUPLES,
+                        schema=dict(blank='text', amount='numeric'))
+    assert records.schema.kinds['blank'] == 'text'
+    assert records.grand_total.fields == ('amount', 'flag')
+    with pytest.raises(SchemaError) as info:
+        RecordSet('thing', FIELDS, TUPLES,
+                  schema=dict(note='text', flag='numeric', day='text'))
+    assert info.value.violations == [
+        ('note', 1, 3),
+        ('day', 0, datetime(2019, 1, 1)), ('day', 2, datetime(2019, 1, 3)),
+    ]
+
+
+class SchemaWorkbookForTesting(InputWorkbookModel):
+    name_pattern = 'book_?.xlsx'
+
+    class InputTableForTesting(InputTable):
+        worksheet_name = 'sheet_a'
+        name = 'test_table'
+        table_marker = 'test_table_marker'
+        filters = dict(key_b='Total')
+        schema = dict(value_a='numeric', key_a='numeric')
+
+
+def test_table_schema():
+    config = dict(SchemaWorkbookForTesting='test/resources')
+    with pytest.raises(SchemaError) as info:
+        SchemaWorkbookForTesting(config)
+    violations = info.value.violations
+    assert {field for field, _, _ in violations} == {'key_a'}
+    assert [position for _, position, _ in violations] == list(
+        range(len(violations))
+    )
+    assert str(info.value).startswith(
+        f'{len(violations)} values of test_table do not match the schema: '
+        "key_a[0]='"
+    )
+
+
+class ProjectedSchemaWorkbookForTesting(InputWorkbookModel):
+    name_pattern = 'book_?.xlsx'
+    lazy = True
+
+    class InputTableForTesting(InputTable):
+        worksheet_name = 'sheet_a'
+        name = 'test_table'
+        table_marker = 'test_table_marker'
+        filters = dict(key_b='Total')
+        schema = dict(value_a='numeric', key_a='text')
+        required_fields = ('key_a', 'value_c')
+
+
+def test_schema_of_projected_table():
+    config = dict(ProjectedSchemaWorkbookForTesting='test/resources')
+    with ProjectedSchemaWorkbookForTesting(config) as workbook:
+        selected = workbook.query('test_table').select('value_c').collect()
+        assert selected.schema.kinds == dict(value_c='numeric')
+        records = workbook.test_table
+        assert records.fields == ('key_a', 'value_c')
+        assert records.schema.kinds == dict(key_a='text', value_c='numeric')
@@ -0,0 +1,83 @@
+"""Tests for pipexl.streaming."""
+
+from itertools import islice
+
+import pytest
+
+from pipexl import RecordSet, RecordStream, SchemaError, XmlReader
+
+from .test_main import TEST_RECORDS, JOIN_RECORDS, WorkbookforTesting
+
+WORKBOOK_PATH = 'test/resources/book_a.xlsx'
+SUM_BY = (('key_a',), ('key_a', 'key_b'))
+
+
+@pytest.mark.parametrize("table_class,expected", [
+    (WorkbookforTesting.InputTableForTesting, TEST_RECORDS),
+    (WorkbookforTesting.JoinTable, JOIN_RECORDS),
+])
+def test_stream_from_workbook(table_class, expected):
+    with XmlReader(WORKBOOK_PATH) as reader:
+        stream = table_class().stream(reader, sum_by=SUM_BY)
+        assert stream.fields == expected.fields
+        assert stream.record_count == 0
+        assert [r.astuple for r in stream] == expected.astuples()
+    assert stream.record_count == len(expected)
+    assert stream.source.start_row == expected.source.start_row
+    assert vars(stream.grand_total) == vars(expected.grand_total)
+    for key_fields in SUM_BY:
+        subtotals = stream.subtotals(*key_fields)
+        summed = expected.sum_by(*key_fields)
+        assert subtotals.record_class.__name__ == \
+            summed.record_class.__name__
+        assert subtotals.fields == summed.fields
+        assert subtotals.astuples() == summed.astuples()
+
+
+def test_grand_total_is_incremental():
+    stream = RecordStream('thing', ('key', 'amount', 'note'), [
+        ('x', 1, None), ('y', None, 2), ('x', 3, 'text'),
+    ], sum_by=[('key',)])
+    records = iter(stream)
+    next(records)
+    assert vars(stream.grand_total) == dict(amount=1, note=0)
+    next(records)
+    assert vars(stream.grand_total) == dict(amount=1, note=2)
+    stream.consume()
+    assert stream.record_count == 3
+    assert vars(stream.grand_total) == dict(amount=4)
+    assert stream.subtotals('key').astuples() == [('x', 4), ('y', 0)]
+    assert stream.subtotals('key').astuples() == RecordSet(
+        'thing', ('key', 'amount', 'note'),
+        [('x', 1, None), ('y', None, 2), ('x', 3, 'text')]
+    ).sum_by('key').astuples()
+
+
+def test_declared_schema():
+    tuples = [('x', 1, None, 'a'), ('y', None, '2', 'b'), ('x', 3, '4', 'c')]
+    stream = RecordStream('thing', ('key', 'amount', 'code', 'note'), tuples,
+                          sum_by=[('key',)],
+                          schema=dict(amount='numeric', code='text'))
+    stream.consume()
+    assert vars(stream.grand_total) == dict(amount=4)
+    assert stream.subtotals('key').astuples() == [('x', 4), ('y', 0)]
+    tuples = [('x', 1, 2), ('y', 'n', None), ('z', 3, 4)]
+    stream = RecordStream('thing', ('key', 'amount', 'code'), tuples,
+                          schema=dict(amount='numeric', code='text'))
+    records = iter(stream)
+    assert [record.key for record in islice(records, 3)] == ['x', 'y', 'z']
+    with pytest.raises(SchemaError) as info:
+        next(records)
+    assert info.value.violations == [
+        ('amount', 1, 'n'), ('code', 0, 2), ('code', 2, 4),
+    ]
+
+
+def test_declared_schema_of_table():
+    class TextValueTable(WorkbookforTesting.InputTableForTesting):
+        schema = dict(value_a='text')
+
+    with XmlReader(WORKBOOK_PATH) as reader:
+        stream = TextValueTable().stream(reader)
+        with pytest.raises(SchemaError, match=r'value_a\[0\]='):
+            stream.consume()
@@ -2,7 +2,8 @@
 
 import pytest
 
-from pipexl.util import camel_to_snake, normalize_name
+from pipexl.recordset import FieldConditions
+from pipexl.util import camel_to_snake, function_signature, normalize_name
 
 
 @pytest.mark.parametrize("test_input,expected", [
@@ -48,3 +49,33 @@ def test_normalize_name(test_input, expected):
     """Parameterized test for the various normalization cases. Everything
     should evaluate to a legal Python name."""
     assert normalize_name(test_input) == expected
+
+
+def test_normalize_name_is_cached():
+    normalize_name.cache_clear()
+    assert normalize_name('Foo Bar?') == normalize_name('Foo Bar?')
+    info = normalize_name.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def make_threshold(threshold):
+    return lambda value: value > threshold
+
+
+def test_function_signature():
+    assert function_signature(lambda v: v > 50) != \
+        function_signature(lambda v: v > 70)
+    assert function_signature(make_threshold(1)) == \
+        function_signature(make_threshold(1))
+    assert function_signature(make_threshold(1)) != \
+        function_signature(make_threshold(2))
+    assert function_signature(lambda v, limit=1: v > limit) != \
+        function_signature(lambda v, limit=2: v > limit)
+    assert function_signature(normalize_name)
+    marker = object()
+    with pytest.raises(TypeError):
+        function_signature(lambda v: v is marker)
+    assert function_signature(FieldConditions(dict(a=make_threshold(1)))) \
+        == function_signature(FieldConditions(dict(a=make_threshold(1))))
+    assert function_signature(FieldConditions(dict(a=make_threshold(1)))) \
+        != function_signature(FieldConditions(dict(a=make_threshold(2))))
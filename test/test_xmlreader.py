@@ -0,0 +1,99 @@
+"""Tests for pipexl.xmlreader."""
+
+from datetime import date, datetime, time
+from pathlib import Path
+
+from openpyxl import Workbook
+import pytest
+
+from pipexl import OpenpyxlReader, XmlReader
+
+from .test_main import CONFIG, TEST_RECORDS, JOIN_RECORDS, WorkbookforTesting
+
+RESOURCES = Path('test/resources')
+
+
+def read_all(reader_class, workbook_path, worksheet_name):
+    with reader_class(workbook_path) as reader:
+        return [tuple(row) for row in reader.iter_rows(worksheet_name)]
+
+
+@pytest.fixture
+def mixed_workbook(tmp_path):
+    """A workbook with a variety of value types and gaps."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'mixed'
+    sheet['B2'] = 'text'
+    sheet['C2'] = 42
+    sheet['D2'] = 4.25
+    sheet['E2'] = True
+    sheet['F2'] = datetime(2019, 1, 1)
+    sheet['G2'] = date(2019, 2, 28)
+    sheet['H2'] = time(13, 30)
+    sheet['I2'] = 0.125
+    sheet['I2'].number_format = '0.0%'
+    sheet['C5'] = 'after gap'
+    sheet['AB7'] = -1e-05
+    sheet['A8'] = '=1+1'
+    workbook.create_sheet('other')['A1'] = 'other'
+    path = tmp_path / 'mixed.xlsx'
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("workbook_name,worksheet_name", [
+    ('book_a.xlsx', 'sheet_a'),
+    ('input_book_a.xlsx', 'Sheet1'),
+    ('input_book_b.xlsx', 'input_sheet'),
+])
+def test_rows_match_openpyxl(workbook_name, worksheet_name):
+    workbook_path = RESOURCES / workbook_name
+    assert (read_all(XmlReader, workbook_path, worksheet_name)
+            == read_all(OpenpyxlReader, workbook_path, worksheet_name))
+
+
+def test_value_types_match_openpyxl(mixed_workbook):
+    for worksheet_name in ('mixed', 'other'):
+        rows = read_all(XmlReader, mixed_workbook, worksheet_name)
+        expected = read_all(OpenpyxlReader, mixed_workbook, worksheet_name)
+        assert rows == expected
+        assert [list(map(type, r)) for r in rows] == \
+            [list(map(type, r)) for r in expected]
+
+
+def test_missing_worksheet(mixed_workbook):
+    with XmlReader(mixed_workbook) as reader:
+        with pytest.raises(KeyError):
+            list(reader.iter_rows('missing'))
+
+
+def test_model_record_sets_match():
+    class XmlWorkbook(WorkbookforTesting):
+        reader_class = XmlReader
+        InputTableForTesting = WorkbookforTesting.InputTableForTesting
+        JoinTable = WorkbookforTesting.JoinTable
+
+    config = dict(XmlWorkbook=CONFIG['WorkbookforTesting'])
+    workbook = XmlWorkbook(config)
+    for expected in (TEST_RECORDS, JOIN_RECORDS):
+        records = getattr(workbook, expected.source.name)
+        assert records.fields == expected.fields
+        assert records.astuples() == expected.astuples()
+        assert records.source.start_row == expected.source.start_row
+        assert records.source.start_col == expected.source.start_col
+        assert records.source.stop_col == expected.source.stop_col
+
+
+def test_inline_strings_match_openpyxl(tmp_path):
+    """Write-only workbooks store strings inline rather than shared."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('inline')
+    sheet.append(['marker'])
+    sheet.append([None, 'key', 1.5, datetime(2019, 3, 1)])
+    sheet.append([])
+    sheet.append(['', 'last'])
+    path = tmp_path / 'inline.xlsx'
+    workbook.save(path)
+    assert (read_all(XmlReader, path, 'inline')
+            == read_all(OpenpyxlReader, path, 'inline'))